@@ -0,0 +1,499 @@
+"""
+Micro-benchmarks of the follow and joystick hot paths.
+
+Usage:
+    python benchmarks/bench.py                        # run everything and print the report
+    python benchmarks/bench.py -k follow              # only the benchmarks whose name contains "follow"
+    python benchmarks/bench.py --save rpi5            # store the results as baselines/rpi5.json
+    python benchmarks/bench.py --compare rpi5         # compare against baselines/rpi5.json
+    python benchmarks/bench.py --pcmd_link            # PCMD rate and latency, per-call vs Olympe piloting loop
+
+Every benchmark reports the best time per operation over several repeats, as µs/op and ops/s,
+where an operation is the unit shown in the report (a joystick event, a follow tick, ...).
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import math
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+DEFAULT_REPEAT = 5  # measurements per benchmark, the best one is kept
+REGRESSION_THRESHOLD = 0.10  # relative slowdown flagged in the comparison
+
+ORIGIN = (48.8566, 2.3522)  # reference position of the geometry benchmarks
+METERS_PER_DEGREE = 111320.0  # rough meridian length, only used to lay out test positions
+
+# name -> (setup returning (function to time, operations per call), unit)
+BENCHMARKS: Dict[str, Tuple[Callable[[], Tuple[Callable[[], object], int]], str]] = {}
+
+
+def benchmark(name: str, unit: str):
+    def register(setup):
+        BENCHMARKS[name] = (setup, unit)
+        return setup
+
+    return register
+
+
+def position_pairs(count: int = 100):
+    """Leader/follower positions a few to a few hundred meters apart, all around the leader."""
+    pairs = []
+    for i in range(count):
+        angle = 2 * math.pi * i / count
+        distance = 5.0 + 3.0 * i
+        lat, lon = ORIGIN
+        dlat = distance * math.cos(angle) / METERS_PER_DEGREE
+        dlon = distance * math.sin(angle) / (METERS_PER_DEGREE * math.cos(math.radians(lat)))
+        pairs.append((lat, lon, lat + dlat, lon + dlon))
+    return pairs
+
+
+# Geometry
+
+
+def _follow_point_setup(backend_name: str):
+    from geometry import make_backend
+    from utils import compute_follow_point
+
+    geometry = make_backend(backend_name)
+    pairs = position_pairs()
+
+    def run():
+        for lead_lat, lead_lon, foll_lat, foll_lon in pairs:
+            compute_follow_point(lead_lat, lead_lon, foll_lat, foll_lon, 5.0, geometry)
+
+    return run, len(pairs)
+
+
+def _separation_setup(backend_name: str):
+    from geometry import make_backend
+
+    geometry = make_backend(backend_name)
+    pairs = position_pairs()
+
+    def run():
+        for lead_lat, lead_lon, foll_lat, foll_lon in pairs:
+            geometry.separation_and_bearing(lead_lat, lead_lon, foll_lat, foll_lon)
+
+    return run, len(pairs)
+
+
+@benchmark("compute_follow_point[enu]", "call")
+def follow_point_enu():
+    return _follow_point_setup("enu")
+
+
+@benchmark("compute_follow_point[geodesic]", "call")
+def follow_point_geodesic():
+    return _follow_point_setup("geodesic")
+
+
+@benchmark("separation_and_bearing[enu]", "call")
+def separation_enu():
+    return _separation_setup("enu")
+
+
+@benchmark("separation_and_bearing[geodesic]", "call")
+def separation_geodesic():
+    return _separation_setup("geodesic")
+
+
+@benchmark("PositionData()", "object")
+def position_data():
+    from utils import PositionData
+
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    count = 100
+
+    def run():
+        for _ in range(count):
+            PositionData(48.8566, 2.3522, 35.0)
+
+    return run, count
+
+
+# Joystick
+
+
+def silent_controller(connecting_using_ds4drv: bool = False):
+    """PS4 controller bound to no device, whose actions do nothing, to time the dispatch alone."""
+    from pyPS4Controller.controller import Actions, Controller
+
+    class SilentController(Controller):
+        pass
+
+    for name in dir(Actions):
+        if name.startswith("on_"):
+            setattr(SilentController, name, lambda self, *args: None)
+    return SilentController(interface="/dev/null", connecting_using_ds4drv=connecting_using_ds4drv)
+
+
+def check_dispatch_tables() -> bool:
+    """Compare the controller dispatch table with the event mappings; prints and returns False on a mismatch."""
+    consistent = True
+    for connecting_using_ds4drv in (False, True):
+        for (button_type, button_id, value), entry, expected in silent_controller(connecting_using_ds4drv).dispatch_table_mismatches():
+            consistent = False
+            print(
+                f"Dispatch table mismatch (ds4drv={connecting_using_ds4drv}) type {button_type} id {button_id} value {value}: "
+                f"table {entry}, mapping {expected}"
+            )
+    return consistent
+
+
+def joystick_events():
+    """One (overflow, value, button_type, button_id) event per press/release of every button and per position of every axis."""
+    events = []
+    for button_id in range(13):
+        for value in (1, 0):
+            events.append(((value, 1, button_id), 0, 0, 0))
+    for axis_id in range(8):
+        for value in (-32767, -16000, 0, 16000, 32767):
+            events.append(((value, 2, axis_id), 0, 0, 0))
+    return events
+
+
+@benchmark("Controller.__handle_event", "event")
+def handle_event():
+    controller = silent_controller()
+    handle = controller._Controller__handle_event
+    events = joystick_events()
+
+    def run():
+        for overflow, value, button_type, button_id in events:
+            handle(button_id, button_type, value, overflow, False)
+
+    return run, len(events)
+
+
+@benchmark("Controller._read_batch", "event")
+def read_batch():
+    from pyPS4Controller.controller import MAX_BATCH_EVENTS
+
+    controller = silent_controller()
+    events = (joystick_events() * MAX_BATCH_EVENTS)[:MAX_BATCH_EVENTS]
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        for (value, button_type, button_id), _, _, _ in events:
+            f.write(controller.event_struct.pack(0, 0, 0, value, button_type, button_id))
+    fd = os.open(f.name, os.O_RDONLY)
+    os.unlink(f.name)
+
+    def run():
+        os.lseek(fd, 0, os.SEEK_SET)
+        controller._read_batch(fd)
+
+    return run, len(events)
+
+
+@benchmark("MyController stick to PCMD", "event")
+def stick_to_pcmd():
+    from controller import MyController
+
+    class NullCommander:
+        async def set_pcmds(self, roll, pitch, yaw, gaz):
+            pass
+
+    async def build():
+        controller = MyController(drone=NullCommander(), interface="/dev/null", connecting_using_ds4drv=False)
+        controller.close()  # the pump is not needed, only the setpoint conversion is timed
+        await asyncio.sleep(0)
+        return controller
+
+    controller = asyncio.new_event_loop().run_until_complete(build())
+    values = list(range(-32767, 32768, 1311))
+    sticks = (controller.on_R3_up, controller.on_R3_right, controller.on_L3_up, controller.on_L3_left)
+
+    def run():
+        for value in values:
+            for stick in sticks:
+                stick(value)
+
+    return run, len(values) * len(sticks)
+
+
+# Follow loops, against simulated commanders on a virtual clock
+
+FOLLOW_TICKS = 1000
+FOLLOW_RATE_HZ = 20.0
+
+
+def _follow_setup(make_loop):
+    from commanders.sim_commander import SimulatedCommander
+    from simulation import run_simulation, straight_line
+
+    lat, lon = ORIGIN
+
+    async def scenario():
+        leader = SimulatedCommander("leader", lat, lon, trajectory=straight_line(5.0, altitude=20.0))
+        follower = SimulatedCommander("follower", lat - 7.0 / METERS_PER_DEGREE, lon, alt=22.0)
+        task = asyncio.create_task(make_loop(leader, follower))
+        await asyncio.sleep(FOLLOW_TICKS / FOLLOW_RATE_HZ)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    return lambda: run_simulation(scenario()), FOLLOW_TICKS
+
+
+@benchmark("follow_loop tick", "tick")
+def follow_tick():
+    from utils import follow_loop
+
+    return _follow_setup(
+        lambda leader, follower: follow_loop(
+            leader, follower, interval=1.0 / FOLLOW_RATE_HZ, adaptive_rate=False, dry_run=False
+        )
+    )
+
+
+@benchmark("velocity_follow_loop tick", "tick")
+def velocity_follow_tick():
+    from utils import velocity_follow_loop
+
+    return _follow_setup(lambda leader, follower: velocity_follow_loop(leader, follower, rate_hz=FOLLOW_RATE_HZ))
+
+
+# PCMD link, in real time against a fake Olympe drone
+
+LINK_RTT_S = 0.05  # time the fake drone takes to acknowledge a command
+OLYMPE_PILOTING_PERIOD_S = 0.025  # period of Olympe's piloting loop
+STICK_RATE_HZ = 100.0  # rate at which the desired setpoint changes
+PCMD_CALLER_RATE_HZ = 50.0  # rate of the loop calling set_pcmds, like velocity_follow_loop
+PCMD_LINK_SECONDS = 3.0
+
+
+class FakeOlympeDrone:
+    """
+    Olympe drone acknowledging every command after LINK_RTT_S, with a piloting loop sending the
+    current setpoint every OLYMPE_PILOTING_PERIOD_S on its own thread. Records every PCMD sent.
+    """
+
+    class Sent:
+        def wait(self):
+            time.sleep(LINK_RTT_S)
+            return self
+
+        def success(self):
+            return True
+
+        def cancel(self):
+            pass
+
+    def __init__(self):
+        self.sent = []  # (time, (roll, pitch)) of every PCMD put on the link
+        self.setpoint = (0, 0)
+        self.stop = threading.Event()
+
+    def __call__(self, message):
+        # PCMD is replaced by a plain tuple of its arguments, see pcmd_link
+        self.sent.append((time.perf_counter(), (message[1], message[2])))
+        return self.Sent()
+
+    def start_piloting(self):
+        threading.Thread(target=self._piloting_loop, daemon=True).start()
+        return True
+
+    def stop_piloting(self):
+        self.stop.set()
+        return True
+
+    def piloting(self, roll, pitch, yaw, gaz, piloting_time):
+        self.setpoint = (roll, pitch)
+        return True
+
+    def _piloting_loop(self):
+        while not self.stop.wait(OLYMPE_PILOTING_PERIOD_S):
+            self.sent.append((time.perf_counter(), self.setpoint))
+
+
+def _setpoint(i: int) -> Tuple[int, int]:
+    """Unique (roll, pitch) of the i-th desired setpoint."""
+    return i % 201 - 100, i // 201 - 100
+
+
+def pcmd_link(streaming: bool) -> dict:
+    """
+    Call `set_pcmds` of an Olympe commander at PCMD_CALLER_RATE_HZ for PCMD_LINK_SECONDS with the
+    latest of the setpoints changing at STICK_RATE_HZ. Measures the rate the caller achieves, the
+    PCMD rate on the link, and the latency from a setpoint change to the first PCMD at least as recent.
+    """
+    from commanders import olympe_commander
+    from commanders.olympe_async import OlympeAdapter
+    from scheduler import PeriodicScheduler
+
+    drone = FakeOlympeDrone()
+    scheduler = PeriodicScheduler(PCMD_CALLER_RATE_HZ)
+
+    async def scenario() -> float:
+        commander = olympe_commander.OlympeCommander("fake", pcmd_streaming=streaming)
+        commander.drone = drone
+        commander.olympe = OlympeAdapter(drone)
+        commander.telemetry.publish("flying_state", "hovering")
+        if streaming:
+            await commander._start_piloting()
+
+        start = time.perf_counter()
+        while time.perf_counter() - start < PCMD_LINK_SECONDS:
+            latest = int((time.perf_counter() - start) * STICK_RATE_HZ)
+            await commander.set_pcmds(*_setpoint(latest), 0, 0)
+            await scheduler.wait_next()
+        await commander.commands.close()
+        drone.stop_piloting()
+        commander.olympe.shutdown()
+        return start
+
+    # The fake drone records the PCMD arguments instead of an Olympe message, for this run only
+    original_pcmd = olympe_commander.PCMD
+    olympe_commander.PCMD = lambda *args: args
+    try:
+        start = asyncio.run(scenario())
+    finally:
+        olympe_commander.PCMD = original_pcmd
+    index = {_setpoint(i): i for i in range(int(PCMD_LINK_SECONDS * STICK_RATE_HZ) + 1)}
+    latencies = []
+    first_unsent = 0
+    for sent_at, setpoint in drone.sent:
+        i = index.get(setpoint, -1)
+        while first_unsent <= i:
+            latencies.append(sent_at - (start + first_unsent / STICK_RATE_HZ))
+            first_unsent += 1
+    latencies.sort()
+    return {
+        "calls_per_s": scheduler.ticks / PCMD_LINK_SECONDS,
+        "pcmd_per_s": len(drone.sent) / PCMD_LINK_SECONDS,
+        "p50_ms": latencies[len(latencies) // 2] * 1e3,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1e3,
+        "max_ms": latencies[-1] * 1e3,
+    }
+
+
+def report_pcmd_link() -> None:
+    try:
+        import olympe  # noqa: F401
+    except ImportError:
+        print("PCMD link: skipped, olympe is not installed")
+        return
+
+    print(
+        f"PCMD link: {LINK_RTT_S * 1e3:.0f}ms acknowledgements, setpoint changing at {STICK_RATE_HZ:.0f} Hz, "
+        f"set_pcmds called at {PCMD_CALLER_RATE_HZ:.0f} Hz for {PCMD_LINK_SECONDS:.0f}s"
+    )
+    header = f"{'transport':<10} {'calls/s':>8} {'PCMD/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, streaming in (("per-call", False), ("piloting", True)):
+        result = pcmd_link(streaming)
+        print(
+            f"{name:<10} {result['calls_per_s']:>8.1f} {result['pcmd_per_s']:>8.1f} "
+            f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['max_ms']:>8.1f}"
+        )
+
+
+# Runner
+
+
+def measure(setup, repeat: int) -> float:
+    """Best time per operation in seconds."""
+    run, operations = setup()
+    timer = timeit.Timer(run)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / (number * operations)
+
+
+def machine_info() -> dict:
+    return {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "system": platform.platform(),
+        "python": platform.python_version(),
+    }
+
+
+def report(results: dict, baseline: dict | None) -> bool:
+    """Print the results table; returns True if any benchmark regressed past REGRESSION_THRESHOLD."""
+    regressed = False
+    header = f"{'benchmark':<36} {'unit':<7} {'µs/op':>10} {'ops/s':>12}"
+    if baseline is not None:
+        header += f" {'baseline':>10} {'change':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        line = f"{name:<36} {result['unit']:<7} {result['us_per_op']:>10.3f} {result['ops_per_s']:>12,.0f}"
+        if baseline is not None:
+            previous = baseline["results"].get(name)
+            if previous is None:
+                line += f" {'-':>10} {'new':>8}"
+            else:
+                change = result["us_per_op"] / previous["us_per_op"] - 1.0
+                line += f" {previous['us_per_op']:>10.3f} {change:>+8.1%}"
+                if change > REGRESSION_THRESHOLD:
+                    line += "  REGRESSION"
+                    regressed = True
+        print(line)
+    return regressed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the drone-coordination hot paths")
+    parser.add_argument("-k", dest="filter", help="only run the benchmarks whose name contains this string")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="measurements per benchmark")
+    parser.add_argument("--save", metavar="NAME", help="store the results as baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="compare against baselines/NAME.json")
+    parser.add_argument(
+        "--pcmd_link", action="store_true", help="compare the Olympe PCMD transports in real time against a fake drone (needs olympe)"
+    )
+    args = parser.parse_args()
+
+    # Per-tick log messages are part of the cost, but must not reach a handler
+    logging.disable(logging.WARNING)
+
+    if args.pcmd_link:
+        report_pcmd_link()
+        return 0
+
+    # Timing a controller whose dispatch table disagrees with its mapping would be meaningless
+    if not check_dispatch_tables():
+        return 1
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads((BASELINE_DIR / f"{args.compare}.json").read_text())
+        print(f"Baseline {args.compare}: {baseline['machine']['system']}, Python {baseline['machine']['python']}")
+
+    results = {}
+    for name, (setup, unit) in BENCHMARKS.items():
+        if args.filter and args.filter not in name:
+            continue
+        seconds = measure(setup, args.repeat)
+        results[name] = {"unit": unit, "us_per_op": seconds * 1e6, "ops_per_s": 1.0 / seconds}
+
+    regressed = report(results, baseline)
+
+    if args.save:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        path = BASELINE_DIR / f"{args.save}.json"
+        document = {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "machine": machine_info(),
+            "results": results,
+        }
+        path.write_text(json.dumps(document, indent=2) + "\n")
+        print(f"Saved {path}")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
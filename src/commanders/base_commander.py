@@ -1,5 +1,15 @@
 import abc
-from typing import Tuple
+import asyncio
+from typing import NamedTuple, Optional, Tuple
+
+
+class PositionSample(NamedTuple):
+    """A position fix and the monotonic time (event loop clock) at which it was measured."""
+
+    lat: float
+    lon: float
+    alt: float
+    timestamp: float
 
 
 class BaseCommander(abc.ABC):
@@ -32,6 +42,26 @@ class BaseCommander(abc.ABC):
         """
         pass
 
+    async def get_position_sample(self) -> PositionSample:
+        """
+        Retrieve the current position together with its source timestamp.
+        Commanders that cache telemetry override this to report when the fix was received.
+        """
+        lat, lon, alt = await self.get_position()
+        return PositionSample(lat, lon, alt, asyncio.get_running_loop().time())
+
+    def get_velocity(self) -> Optional[Tuple[float, float, float]]:
+        """
+        Latest (north, east, down) velocity in m/s, or None if unknown.
+        """
+        return None
+
+    def get_attitude(self) -> Optional[Tuple[float, float, float]]:
+        """
+        Latest (roll, pitch, yaw) in radians, yaw clockwise from north, or None if unknown.
+        """
+        return None
+
     @abc.abstractmethod
     async def goto_position(self, latitude: float, longitude: float, altitude: float) -> None:
         """
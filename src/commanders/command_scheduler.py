@@ -0,0 +1,166 @@
+import asyncio
+import collections
+import enum
+import logging
+import time
+from typing import Any, Awaitable, Callable, Deque, List, Optional
+
+from metrics import REGISTRY
+
+logger = logging.getLogger()
+
+
+class Priority(enum.IntEnum):
+    """Command classes, most urgent first."""
+
+    EMERGENCY = 0  # motor cut
+    FLIGHT = 1  # takeoff, land, drop procedure
+    NAVIGATION = 2  # goto
+    STREAMING = 3  # PCMD
+
+
+# Classes where a new command supersedes the pending or in-flight one of the same class: only the
+# latest stick input or target matters. Emergencies and flight phases are never dropped and run in
+# submission order, so a takeoff, landing or drop procedure always completes its own cleanup.
+COALESCED = {Priority.NAVIGATION, Priority.STREAMING}
+
+
+class CommandPreempted(Exception):
+    """The command was interrupted by a more urgent one before completing."""
+
+
+class _Command:
+    __slots__ = ("priority", "send", "future", "submitted_ns")
+
+    def __init__(self, priority: Priority, send: Callable[[], Awaitable[Any]], future: asyncio.Future):
+        self.priority = priority
+        self.send = send
+        self.future = future
+        self.submitted_ns = time.perf_counter_ns()
+
+
+class CommandScheduler:
+    """
+    Single writer of a commander's link: commands run one at a time, the most urgent class first.
+
+    A command of a class in COALESCED supersedes the older pending or in-flight command of its
+    class, whose submitter gets None. A command preempts the in-flight command of a less urgent
+    class, whose submitter gets CommandPreempted. Other classes run in submission order, so safety
+    commands wait only for the commands of their own class, however many PCMDs or gotos are queued.
+    """
+
+    def __init__(self, commander: str):
+        self.commander = commander
+        self.pending: List[Deque[_Command]] = [collections.deque() for _ in Priority]
+        self.inflight: Optional[_Command] = None
+        self._inflight_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        classes = [p.name.lower() for p in Priority]
+        self.queue_time = [
+            REGISTRY.histogram("drone_command_queue_seconds", "Time a command waited for the link", commander=commander, priority=name)
+            for name in classes
+        ]
+        self.superseded = [
+            REGISTRY.counter("drone_commands_superseded_total", "Commands replaced by a newer one of their class", commander=commander, priority=name)
+            for name in classes
+        ]
+        self.preempted = [
+            REGISTRY.counter("drone_commands_preempted_total", "Commands interrupted by a more urgent one", commander=commander, priority=name)
+            for name in classes
+        ]
+
+    async def submit(self, priority: Priority, send: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `send()` when the link is free for its priority class.
+
+        Returns:
+            Result of `send()`, or None if a newer command of the same class superseded it
+
+        Raises:
+            CommandPreempted: a more urgent command interrupted it
+        """
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run(), name=f"{self.commander}-commands")
+
+        command = _Command(priority, send, asyncio.get_running_loop().create_future())
+        queue = self.pending[priority]
+        if priority in COALESCED:
+            while queue:
+                self._resolve(queue.popleft(), None)
+                self.superseded[priority].inc()
+        queue.append(command)
+
+        inflight = self.inflight
+        if inflight is not None and (inflight.priority > priority or (inflight.priority == priority and priority in COALESCED)):
+            self._inflight_task.cancel()
+        self._wakeup.set()
+        return await command.future
+
+    def busy(self, priority: Priority) -> bool:
+        """True if a command more urgent than `priority` is pending or in flight."""
+        inflight = self.inflight
+        return (inflight is not None and inflight.priority < priority) or self._preempted_by_class(priority)
+
+    async def close(self) -> None:
+        """Stop the writer, failing the pending commands."""
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        for queue in self.pending:
+            while queue:
+                command = queue.popleft()
+                if not command.future.done():
+                    command.future.set_exception(CommandPreempted("Command scheduler closed"))
+
+    def _next(self) -> Optional[_Command]:
+        for queue in self.pending:
+            while queue:
+                command = queue.popleft()
+                if not command.future.done():  # skip the ones whose submitter gave up
+                    return command
+        return None
+
+    async def _run(self) -> None:
+        while True:
+            command = self._next()
+            if command is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            self.queue_time[command.priority].record_ns(time.perf_counter_ns() - command.submitted_ns)
+            task = asyncio.ensure_future(command.send())
+            self.inflight, self._inflight_task = command, task
+            try:
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            finally:
+                self.inflight, self._inflight_task = None, None
+
+            if not task.cancelled():
+                if task.exception() is not None:
+                    if not command.future.done():
+                        command.future.set_exception(task.exception())
+                else:
+                    self._resolve(command, task.result())
+            elif self._preempted_by_class(command.priority):
+                self.preempted[command.priority].inc()
+                if not command.future.done():
+                    command.future.set_exception(CommandPreempted(f"{command.priority.name} command preempted"))
+            else:
+                self.superseded[command.priority].inc()
+                self._resolve(command, None)
+
+    def _preempted_by_class(self, priority: Priority) -> bool:
+        """True if a more urgent command is waiting (rather than a newer one of the same class)."""
+        return any(self.pending[p] for p in Priority if p < priority)
+
+    @staticmethod
+    def _resolve(command: _Command, result: Any) -> None:
+        if not command.future.done():
+            command.future.set_result(result)
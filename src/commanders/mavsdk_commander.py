@@ -1,24 +1,61 @@
+import asyncio
 import logging
-from typing import Tuple
+import math
+import time
+from typing import Optional, Tuple, Union
 
+from log_pipeline import PER_TICK
 from mavsdk import System
+from mavsdk.action import ActionError
+from mavsdk.offboard import OffboardError, PositionGlobalYaw, VelocityBodyYawspeed
+from metrics import REGISTRY
+from scheduler import PeriodicScheduler
 
-from .base_commander import BaseCommander
+from .base_commander import BaseCommander, PositionSample
+from .command_scheduler import CommandPreempted, CommandScheduler, Priority
+from .telemetry import TelemetryHub, TelemetrySample
 
 MAX_CONNECTION_ATTEMPTS = 3
 CONNECTION_TIMEOUT = 10  # seconds
 JOYSTICK_DEADZONE = 0.1
 UPDATE_RATE = 0.05  # seconds (20 Hz)
 MAX_VELOCITY = 5.0  # m/s
+MAX_VERTICAL_VELOCITY = 1.5  # m/s, WPNAV_SPEED_DN of mav.parm
+MAX_YAW_RATE = 90.0  # deg/s
+MAVSDK_SERVER_PORT = 50051  # gRPC port of the mavsdk_server started for the drone, one per commander
 
 logger = logging.getLogger()
 
+SETPOINT_SEND_TIME = REGISTRY.histogram("drone_command_ack_seconds", "Time from sending a command to its acknowledgement", commander="mavsdk", command="setpoint")
+SETPOINT_FAILURES = REGISTRY.counter("drone_command_failures_total", "Commands that failed or were not acknowledged", commander="mavsdk", command="setpoint")
+SETPOINTS_HELD = REGISTRY.counter("drone_pcmd_stream_held_total", "Setpoints ignored while a more urgent command used the link", commander="mavsdk")
+
+Setpoint = Union[VelocityBodyYawspeed, PositionGlobalYaw]
+
+
+def _scale(percent: int, maximum: float) -> float:
+    """Joystick-like percentage in [-100, 100] to a fraction of `maximum`."""
+    return max(-1.0, min(1.0, percent / 100.0)) * maximum
+
 
 class MAVSDKCommander(BaseCommander):
-    def __init__(self, address: str):
+    def __init__(self, address: str, server_port: int = MAVSDK_SERVER_PORT):
+        """
+        Args:
+            address: MAVSDK connection string of the drone
+            server_port: gRPC port of its mavsdk_server, each drone of the process needs its own
+        """
         super().__init__(address)
-        self.drone = System()
+        self.drone = System(port=server_port)
         self.connection_string = address
+        self.telemetry = TelemetryHub()
+        # Single writer of the action plugin: flight phases, then the offboard mode switch
+        self.commands = CommandScheduler("mavsdk")
+        # Offboard setpoint sent every UPDATE_RATE by the stream task once offboard mode is started
+        self.setpoint: Setpoint = VelocityBodyYawspeed(0.0, 0.0, 0.0, 0.0)
+        self.landing = False  # no offboard restart until the drone is on the ground or takes off again
+        self._offboard_start: Optional[asyncio.Future] = None
+        self._stream: Optional[asyncio.Task] = None
 
     async def connect(self) -> None:
         """Connect to the drone with multiple retry attempts.
@@ -26,10 +63,10 @@ class MAVSDKCommander(BaseCommander):
         Returns:
             bool: True if connection successful, False otherwise
         """
-        logger.debug(f"Attempting to connect to drone at {self.connection_string}")
+        logger.debug("Attempting to connect to drone at %s", self.connection_string)
         try:
             await self.drone.connect(system_address=self.connection_string)
-            logger.debug(f"Connected to drone at {self.connection_string}")
+            logger.debug("Connected to drone at %s", self.connection_string)
             async for state in self.drone.core.connection_state():
                 if state.is_connected:
                     logger.debug("-- Connected to drone with MAVSDK!")
@@ -39,29 +76,159 @@ class MAVSDKCommander(BaseCommander):
                 if health.is_global_position_ok and health.is_home_position_ok:
                     logger.debug("-- Global position estimate OK")
                     break
+            self._start_telemetry()
         except Exception as e:
-            logger.error(f"Error connecting to drone: {e}")
+            logger.error("Error connecting to drone: %s", e)
+
+    def _start_telemetry(self) -> None:
+        """Open the long-lived telemetry streams feeding `self.telemetry`."""
+        telemetry = self.drone.telemetry
+        self.telemetry.start(
+            {
+                "position": telemetry.position,
+                "velocity": telemetry.velocity_ned,
+                "attitude": telemetry.attitude_euler,
+                "health": telemetry.health,
+                "battery": telemetry.battery,
+                "in_air": telemetry.in_air,
+            }
+        )
+        logger.debug("[MAVSDK] Telemetry hub started")
 
     async def disconnect(self) -> None:
-        raise NotImplementedError("not implemented for MAVSDKCommander")
+        await self._stop_offboard()
+        await self.commands.close()
+        await self.telemetry.stop()
+
+    @property
+    def in_the_air(self) -> bool:
+        """True while the drone reports being in the air."""
+        sample = self.telemetry.latest("in_air")
+        return sample is not None and bool(sample.value)
 
     async def get_position(self) -> Tuple[float, float, float]:
-        lat = lon = alt = 500.0  # fallback dummy values
-        async for pos in self.drone.telemetry.position():
-            lat = pos.latitude_deg
-            lon = pos.longitude_deg
-            alt = pos.absolute_altitude_m
-            break
-        return (lat, lon, alt)
+        sample = await self.get_position_sample()
+        return (sample.lat, sample.lon, sample.alt)
+
+    async def get_position_sample(self) -> PositionSample:
+        sample = self.telemetry.latest("position")
+        if sample is None:
+            # Only the very first call, before the stream delivered anything, has to wait
+            sample = await self.telemetry.wait_for("position")
+        pos = sample.value
+        return PositionSample(pos.latitude_deg, pos.longitude_deg, pos.absolute_altitude_m, sample.timestamp)
+
+    def get_velocity(self) -> Optional[Tuple[float, float, float]]:
+        sample = self.telemetry.latest("velocity")
+        if sample is None:
+            return None
+        vel = sample.value
+        return (vel.north_m_s, vel.east_m_s, vel.down_m_s)
+
+    def get_attitude(self) -> Optional[Tuple[float, float, float]]:
+        sample = self.telemetry.latest("attitude")
+        if sample is None:
+            return None
+        att = sample.value
+        return (math.radians(att.roll_deg), math.radians(att.pitch_deg), math.radians(att.yaw_deg))
+
+    def get_telemetry(self, topic: str) -> TelemetrySample | None:
+        """Latest cached sample of `topic` (position, velocity, attitude, health or battery)."""
+        return self.telemetry.latest(topic)
+
+    async def _submit(self, priority: Priority, send) -> None:
+        try:
+            await self.commands.submit(priority, send)
+        except CommandPreempted as e:
+            log = logger.warning if priority <= Priority.FLIGHT else logger.debug
+            log("[MAVSDK] %s", e)
+
+    async def _set_setpoint(self, setpoint: Setpoint) -> None:
+        """Replace the streamed setpoint, switching to offboard mode on the first one."""
+        if not self.in_the_air:
+            self.landing = False
+            return
+        if self.landing or self.commands.busy(Priority.NAVIGATION):
+            SETPOINTS_HELD.inc()
+            return
+        self.setpoint = setpoint
+        if self._stream is None:
+            # Concurrent callers wait for the same mode switch
+            if self._offboard_start is None or self._offboard_start.done():
+                self._offboard_start = asyncio.ensure_future(self._submit(Priority.NAVIGATION, self._start_offboard))
+            await asyncio.shield(self._offboard_start)
+
+    async def _start_offboard(self) -> None:
+        try:
+            # PX4 and ArduPilot refuse the mode switch before they received a setpoint
+            await self._send_setpoint(self.setpoint)
+            await self.drone.offboard.start()
+        except OffboardError as e:
+            logger.error("[MAVSDK] Could not start offboard mode: %s", e, extra=PER_TICK)
+            return
+        self._stream = asyncio.create_task(self._stream_setpoints(), name="mavsdk-offboard")
+        logger.info("[MAVSDK] Offboard mode started")
+
+    async def _stop_offboard(self) -> None:
+        if self._stream is None:
+            return
+        self._stream.cancel()
+        await asyncio.gather(self._stream, return_exceptions=True)
+        self._stream = None
+        try:
+            await self.drone.offboard.stop()
+            logger.info("[MAVSDK] Offboard mode stopped")
+        except OffboardError as e:
+            logger.warning("[MAVSDK] Could not stop offboard mode: %s", e)
+
+    async def _stream_setpoints(self) -> None:
+        """Send the current setpoint every UPDATE_RATE: the vehicle leaves offboard mode without them."""
+        scheduler = PeriodicScheduler(1.0 / UPDATE_RATE)
+        while True:
+            try:
+                await self._send_setpoint(self.setpoint)
+            except Exception as e:
+                SETPOINT_FAILURES.inc()
+                logger.error("[MAVSDK] Setpoint failed: %s", e, extra=PER_TICK)
+            await scheduler.wait_next()
+
+    async def _send_setpoint(self, setpoint: Setpoint) -> None:
+        start = time.perf_counter_ns()
+        if isinstance(setpoint, PositionGlobalYaw):
+            await self.drone.offboard.set_position_global(setpoint)
+        else:
+            await self.drone.offboard.set_velocity_body(setpoint)
+        SETPOINT_SEND_TIME.record_ns(time.perf_counter_ns() - start)
 
     async def goto_position(self, latitude: float, longitude: float, altitude: float) -> None:
-        raise NotImplementedError("not implemented for MAVSDKCommander")
+        """Stream a position setpoint, altitude above mean sea level, keeping the current heading."""
+        attitude = self.get_attitude()
+        yaw = math.degrees(attitude[2]) if attitude is not None else 0.0
+        await self._set_setpoint(PositionGlobalYaw(latitude, longitude, altitude, yaw, PositionGlobalYaw.AltitudeType.AMSL))
 
     async def land(self) -> None:
-        raise NotImplementedError("not implemented for MAVSDKCommander")
+        await self._submit(Priority.FLIGHT, self._land)
+
+    async def _land(self) -> None:
+        self.landing = True
+        await self._stop_offboard()
+        try:
+            await self.drone.action.land()
+            logger.info("[MAVSDK] Landing successful")
+        except ActionError as e:
+            logger.error("[MAVSDK] Landing failed : %s", e)
 
     async def takeoff(self) -> None:
-        raise NotImplementedError("not implemented for MAVSDKCommander")
+        await self._submit(Priority.FLIGHT, self._takeoff)
+
+    async def _takeoff(self) -> None:
+        try:
+            await self.drone.action.arm()
+            await self.drone.action.takeoff()
+            self.landing = False
+            logger.info("[MAVSDK] Takeoff successful")
+        except ActionError as e:
+            logger.error("[MAVSDK] Takeoff failed : %s", e)
 
     async def prepare_for_drop(self) -> None:
         raise NotImplementedError("not implemented for MAVSDKCommander")
@@ -69,5 +236,23 @@ class MAVSDKCommander(BaseCommander):
     async def set_camera_angle(self, angle: float) -> None:
         raise NotImplementedError("not implemented for MAVSDKCommander")
 
-    async def set_pcmds(self, roll: int, pitch: int, yaw: int, gaz: int) -> None:
-        raise NotImplementedError("not implemented for MAVSDKCommander")
+    async def set_pcmds(self, roll: int | None, pitch: int | None, yaw: int | None, gaz: int | None) -> None:
+        """
+        Stream a body-frame velocity setpoint from joystick-like percentages in [-100, 100], with
+        the signs of Olympe's PCMD: pitch forward and roll right (MAX_VELOCITY at 100), gaz up
+        (MAX_VERTICAL_VELOCITY at 100) and yaw clockwise (MAX_YAW_RATE at 100).
+        """
+        if roll is None or pitch is None or yaw is None or gaz is None:
+            return
+        if self._stream is None and roll == pitch == yaw == gaz == 0 and self.in_the_air:
+            # Centred sticks outside offboard mode: the vehicle already holds its position in its
+            # current mode, switching to offboard would only arm the offboard-loss failsafe
+            return
+        await self._set_setpoint(
+            VelocityBodyYawspeed(
+                _scale(pitch, MAX_VELOCITY),
+                _scale(roll, MAX_VELOCITY),
+                -_scale(gaz, MAX_VERTICAL_VELOCITY),
+                _scale(yaw, MAX_YAW_RATE),
+            )
+        )
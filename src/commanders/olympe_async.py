@@ -0,0 +1,49 @@
+import asyncio
+import concurrent.futures
+import functools
+import logging
+from typing import Any, Callable
+
+import olympe
+
+OLYMPE_WORKERS = 4  # a long expectation (e.g. the drop procedure) must not starve PCMD or landing
+
+logger = logging.getLogger()
+
+
+class OlympeAdapter:
+    """
+    Awaitable front-end for the blocking Olympe API.
+
+    Olympe's `connect()` and `expectation.wait()` block the calling thread until the drone
+    answers. The adapter runs them on a small dedicated thread pool so the asyncio event loop
+    (telemetry, follow logic, command prompt) keeps running while the drone acknowledges.
+    """
+
+    def __init__(self, drone: olympe.Drone, workers: int = OLYMPE_WORKERS):
+        self.drone = drone
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="olympe")
+
+    async def run(self, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run any blocking callable on the Olympe worker threads and await its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(function, *args, **kwargs))
+
+    async def send(self, expectation) -> bool:
+        """
+        Send an Olympe message (or chained expectation) and await its outcome.
+
+        Returns:
+            True if the expectation succeeded, False if it failed or timed out
+        """
+        pending = self.drone(expectation)
+        try:
+            return await self.run(lambda: pending.wait().success())
+        except asyncio.CancelledError:
+            # Nobody is waiting for the answer anymore: stop Olympe from tracking it
+            pending.cancel()
+            raise
+
+    def shutdown(self) -> None:
+        """Stop the worker threads once all pending calls have returned."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,80 +1,231 @@
 import asyncio
 import logging
-from typing import Tuple
+import time
+from typing import Optional, Tuple
 
 import olympe
+from log_pipeline import PER_TICK
+from metrics import REGISTRY
 from olympe.messages.ardrone3.Piloting import PCMD, Emergency, Landing, TakeOff, UserTakeOff, moveTo
-from olympe.messages.ardrone3.PilotingState import FlyingStateChanged, PositionChanged
+from olympe.messages.ardrone3.PilotingState import AttitudeChanged, FlyingStateChanged, PositionChanged, SpeedChanged
 
 MAX_RETRY = 3
 TIME_OUT_DROP = 15
+STATE_HISTORY_SIZE = 64  # samples kept per telemetry topic
+UNAVAILABLE_COORDINATE = 500.0  # value reported by Parrot drones when there is no GPS fix
+AIRBORNE_STATES = {"takingoff", "hovering", "flying", "landing", "emergency_landing"}
+PILOTING_TIME = 0.0  # seconds Olympe's piloting loop keeps sending a setpoint, 0 until the next update
 
 olympe.log.update_config({"loggers": {"olympe": {"level": "ERROR"}}})
 logger = logging.getLogger()
 
-from .base_commander import BaseCommander
+from .base_commander import BaseCommander, PositionSample
+from .command_scheduler import CommandPreempted, CommandScheduler, Priority
+from .olympe_async import OlympeAdapter
+from .telemetry import StateSnapshot, TelemetryHub
+
+PCMD_ACK_TIME = REGISTRY.histogram("drone_command_ack_seconds", "Time from sending a command to its acknowledgement", commander="olympe", command="pcmd")
+GOTO_ACK_TIME = REGISTRY.histogram("drone_command_ack_seconds", "Time from sending a command to its acknowledgement", commander="olympe", command="goto")
+PCMD_FAILURES = REGISTRY.counter("drone_command_failures_total", "Commands that failed or were not acknowledged", commander="olympe", command="pcmd")
+GOTO_FAILURES = REGISTRY.counter("drone_command_failures_total", "Commands that failed or were not acknowledged", commander="olympe", command="goto")
+PCMD_STREAM_UPDATES = REGISTRY.counter("drone_pcmd_stream_updates_total", "Setpoints handed to Olympe's piloting loop", commander="olympe")
+PCMD_STREAM_HELD = REGISTRY.counter("drone_pcmd_stream_held_total", "Setpoints ignored while a more urgent command used the link", commander="olympe")
+
+
+class StateListener(olympe.EventListener):
+    """Push Olympe state events into a telemetry hub (runs on Olympe's own thread)."""
+
+    def __init__(self, drone: olympe.Drone, telemetry: TelemetryHub):
+        self.drone = drone
+        self.telemetry = telemetry
+        super().__init__(drone)
+
+    @olympe.listen_event(PositionChanged())
+    def on_position_changed(self, event, scheduler):
+        self.publish_position(event.args)
+
+    @olympe.listen_event(SpeedChanged())
+    def on_speed_changed(self, event, scheduler):
+        self.publish_speed(event.args)
+
+    @olympe.listen_event(AttitudeChanged())
+    def on_attitude_changed(self, event, scheduler):
+        self.publish_attitude(event.args)
+
+    @olympe.listen_event(FlyingStateChanged())
+    def on_flying_state_changed(self, event, scheduler):
+        self.publish_flying_state(event.args)
+
+    def publish_position(self, args) -> None:
+        if args["latitude"] == UNAVAILABLE_COORDINATE or args["longitude"] == UNAVAILABLE_COORDINATE:
+            return
+        self.telemetry.publish("position", (float(args["latitude"]), float(args["longitude"]), float(args["altitude"])))
+
+    def publish_speed(self, args) -> None:
+        # Parrot reports speeds in the NED frame
+        self.telemetry.publish("velocity", (float(args["speedX"]), float(args["speedY"]), float(args["speedZ"])))
+
+    def publish_attitude(self, args) -> None:
+        self.telemetry.publish("attitude", (float(args["roll"]), float(args["pitch"]), float(args["yaw"])))
+
+    def publish_flying_state(self, args) -> None:
+        self.telemetry.publish("flying_state", args["state"].name)
+
+    def seed(self) -> None:
+        """Fill the hub with the states Olympe already knows about before the listener was subscribed."""
+        # get_state returns the arguments dict of the last received message
+        for message, publish in (
+            (PositionChanged, self.publish_position),
+            (SpeedChanged, self.publish_speed),
+            (AttitudeChanged, self.publish_attitude),
+            (FlyingStateChanged, self.publish_flying_state),
+        ):
+            try:
+                publish(self.drone.get_state(message))
+            except Exception:
+                pass  # state not received yet, the listener will catch it
 
 
 class OlympeCommander(BaseCommander):
-    def __init__(self, address: str):
+    def __init__(self, address: str, pcmd_streaming: bool = True):
+        """
+        Args:
+            address: IP address of the drone
+            pcmd_streaming: Stream PCMDs with Olympe's fixed-rate piloting loop; otherwise every
+                `set_pcmds` sends one PCMD and waits for its acknowledgement
+        """
         super().__init__(address)
         self.drone = olympe.Drone(self.address)
+        self.olympe = OlympeAdapter(self.drone)
+        self.telemetry = TelemetryHub(history_size=STATE_HISTORY_SIZE)
+        self.state_listener = StateListener(self.drone, self.telemetry)
+        # Single writer of the link: emergency, then flight phases, then goto, then PCMD
+        self.commands = CommandScheduler("olympe")
+        self.pcmd_streaming = pcmd_streaming
+        self.piloting = False  # Olympe's piloting loop is running
 
-        self.in_the_air = False
+    @property
+    def in_the_air(self) -> bool:
+        """True while the drone reports an airborne flying state."""
+        sample = self.telemetry.latest("flying_state")
+        return sample is not None and sample.value in AIRBORNE_STATES
 
     async def connect(self) -> None:
         for attempt in range(1, MAX_RETRY + 1):
-            logger.debug(f"[Olympe] Attempting to connect to {self.address} (Attempt {attempt}/{MAX_RETRY})")
-            if self.drone.connect():
-                logger.debug(f"[Olympe] Connected to {self.address}")
+            logger.debug("[Olympe] Attempting to connect to %s (Attempt %s/%s)", self.address, attempt, MAX_RETRY)
+            if await self.olympe.run(self.drone.connect):
+                logger.debug("[Olympe] Connected to %s", self.address)
+                self.state_listener.subscribe()
+                self.state_listener.seed()
+                if self.pcmd_streaming:
+                    await self._start_piloting()
                 return
             else:
-                logger.debug(f"[Olympe] Connection attempt {attempt} failed.")
+                logger.debug("[Olympe] Connection attempt %s failed.", attempt)
                 await asyncio.sleep(2)
 
         raise TimeoutError(f"[OLympe] Failed to connect to {self.address} after {MAX_RETRY} attempts.")
 
     async def disconnect(self) -> None:
-        self.drone.disconnect()
-        logger.debug(f"[Olympe] Disconnected from {self.address}")
+        await self.commands.close()
+        if self.piloting:
+            self.piloting = False
+            await self.olympe.run(self.drone.stop_piloting)
+        self.state_listener.unsubscribe()
+        await self.olympe.run(self.drone.disconnect)
+        logger.debug("[Olympe] Disconnected from %s", self.address)
 
     async def get_position(self) -> Tuple[float, float, float]:
-        state = self.drone.get_state(PositionChanged)
-        lat = state.args["latitude"]
-        lon = state.args["longitude"]
-        alt = state.args["altitude"]
-        return (float(lat), float(lon), float(alt))
+        sample = self.telemetry.latest("position")
+        if sample is None:
+            sample = await self.telemetry.wait_for("position")
+        return sample.value
+
+    async def get_position_sample(self) -> PositionSample:
+        sample = self.telemetry.latest("position")
+        if sample is None:
+            sample = await self.telemetry.wait_for("position")
+        return PositionSample(*sample.value, sample.timestamp)
+
+    def get_velocity(self) -> Optional[Tuple[float, float, float]]:
+        """Latest (north, east, down) speed in m/s, or None if the drone has not reported it yet."""
+        sample = self.telemetry.latest("velocity")
+        return None if sample is None else sample.value
+
+    def get_attitude(self) -> Optional[Tuple[float, float, float]]:
+        """Latest (roll, pitch, yaw) in radians, or None if the drone has not reported it yet."""
+        sample = self.telemetry.latest("attitude")
+        return None if sample is None else sample.value
+
+    def get_state_snapshot(self) -> StateSnapshot:
+        """Latest timestamped position, velocity, attitude and flying state, without blocking."""
+        latest = self.telemetry.latest
+        return StateSnapshot(latest("position"), latest("velocity"), latest("attitude"), latest("flying_state"))
+
+    async def _start_piloting(self) -> None:
+        self.piloting = bool(await self.olympe.run(self.drone.start_piloting))
+        if not self.piloting:
+            logger.warning("[Olympe] Could not start the piloting loop, sending PCMDs one by one")
+
+    async def _submit(self, priority: Priority, send) -> None:
+        if self.piloting and priority < Priority.STREAMING:
+            # The piloting loop bypasses the scheduler: center the sticks so that it cannot fight
+            # the command (positive gaz cancels a landing, any stick cancels a moveTo)
+            self.drone.piloting(0, 0, 0, 0, PILOTING_TIME)
+        try:
+            await self.commands.submit(priority, send)
+        except CommandPreempted as e:
+            # Expected for PCMDs and gotos, worth noticing for the flight phases
+            log = logger.warning if priority <= Priority.FLIGHT else logger.debug
+            log("[Olympe] %s", e)
 
     async def goto_position(self, latitude: float, longitude: float, altitude: float) -> None:
-        self.drone(moveTo(latitude, longitude, altitude, 0.0)).wait().success()
+        await self._submit(Priority.NAVIGATION, lambda: self._goto_position(latitude, longitude, altitude))
+
+    async def _goto_position(self, latitude: float, longitude: float, altitude: float) -> None:
+        start = time.perf_counter_ns()
+        try:
+            if not await self.olympe.send(moveTo(latitude, longitude, altitude, 0.0)):
+                GOTO_FAILURES.inc()
+        except Exception:
+            GOTO_FAILURES.inc()
+            raise
+        # Not recorded when superseded by a newer goto (cancelled)
+        GOTO_ACK_TIME.record_ns(time.perf_counter_ns() - start)
 
     async def land(self) -> None:
+        await self._submit(Priority.FLIGHT, self._land)
+
+    async def _land(self) -> None:
         try:
-            assert self.drone(Landing()).wait().success()
-            self.in_the_air = False
+            assert await self.olympe.send(Landing())
             logger.info("[Olympe] Landing successful")
         except Exception:
             logger.error("[Olympe] Landing failed")
 
     async def takeoff(self) -> None:
+        await self._submit(Priority.FLIGHT, self._takeoff)
+
+    async def _takeoff(self) -> None:
         try:
-            assert self.drone(TakeOff()).wait().success()
-            self.in_the_air = True
+            assert await self.olympe.send(TakeOff())
             logger.info("[Olympe] Takeoff successful")
         except Exception as e:
-            logger.error(f"[Olympe] Takeoff failed : {e}")
+            logger.error("[Olympe] Takeoff failed : %s", e)
 
     async def prepare_for_drop(self) -> None:
+        await self._submit(Priority.FLIGHT, self._prepare_for_drop)
+
+    async def _prepare_for_drop(self) -> None:
         try:
-            dropping_procedure = self.drone(UserTakeOff(1) >> FlyingStateChanged(state="hovering", _timeout=TIME_OUT_DROP)).wait()
-            if dropping_procedure.success():
+            released = await self.olympe.send(UserTakeOff(1) >> FlyingStateChanged(state="hovering", _timeout=TIME_OUT_DROP))
+            if released:
                 logger.info("[Olympe] Drone has been released")
-                self.in_the_air = True
             else:
                 logger.error("[Olympe] Dropping procedure timed out, canceling it")
-                self.drone(UserTakeOff(0)).wait().success()
+                await self.olympe.send(UserTakeOff(0))
         except Exception as e:
-            logger.error(f"[Olympe] Prepare for drop failed {e}")
+            logger.error("[Olympe] Prepare for drop failed %s", e)
 
     async def set_camera_angle(self, angle: float) -> None:
         raise NotImplementedError("set_camera_angle not implemented for OlympeCommander")
@@ -108,16 +259,38 @@ class OlympeCommander(BaseCommander):
 
         if roll is None or pitch is None or yaw is None or gaz is None:
             return
+        elif self.piloting:
+            # Only replace the setpoint, Olympe's piloting loop sends it at a fixed rate
+            if self.commands.busy(Priority.STREAMING):
+                PCMD_STREAM_HELD.inc()
+                return
+            if self.drone.piloting(roll, pitch, yaw, gaz, PILOTING_TIME):
+                PCMD_STREAM_UPDATES.inc()
+            else:
+                PCMD_FAILURES.inc()
+                logger.error("[Olympe] Piloting loop refused setpoint %s", (roll, pitch, yaw, gaz), extra=PER_TICK)
         else:
-            try:
-                assert self.drone(PCMD(1, roll, pitch, yaw, gaz, 0)).wait().success()
-            except Exception as e:
-                logger.error(f"[Olympe] PCMD failed {e}")
+            await self._submit(Priority.STREAMING, lambda: self._send_pcmd(roll, pitch, yaw, gaz))
+
+    async def _send_pcmd(self, roll: int, pitch: int, yaw: int, gaz: int) -> None:
+        start = time.perf_counter_ns()
+        try:
+            assert await self.olympe.send(PCMD(1, roll, pitch, yaw, gaz, 0))
+        except Exception as e:
+            PCMD_FAILURES.inc()
+            logger.error("[Olympe] PCMD failed %s", e)
+        # Not recorded when superseded by a newer PCMD (cancelled)
+        PCMD_ACK_TIME.record_ns(time.perf_counter_ns() - start)
 
     async def emergency(self) -> None:
         """
         /! DO NOT CALL THIS FUNCTION IF YOU ARE NOT SURE OF WHAT YOU ARE DOING /!
 
         Cut out the motors. This cuts immediatly the motors. The drone will fall. This command is sent on a dedicated high priority buffer which will infinitely retry to send it if the command is not delivered.
+
+        It preempts any command in flight on this commander.
         """
+        await self._submit(Priority.EMERGENCY, self._emergency)
+
+    async def _emergency(self) -> None:
         self.drone(Emergency())
@@ -0,0 +1,37 @@
+import importlib
+import logging
+import sys
+import time
+from typing import Dict, Tuple, Type
+
+from .base_commander import BaseCommander
+
+logger = logging.getLogger()
+
+# Commander kind -> (module, class). Modules are only imported when a commander of that kind is
+# first created: mavsdk and olympe are slow to import, and olympe reconfigures logging on import.
+COMMANDERS: Dict[str, Tuple[str, str]] = {
+    "mavsdk": ("mavsdk_commander", "MAVSDKCommander"),
+    "olympe": ("olympe_commander", "OlympeCommander"),
+    "sim": ("sim_commander", "SimulatedCommander"),
+}
+
+
+def get_commander_class(kind: str) -> Type[BaseCommander]:
+    """Commander class registered as `kind`, importing its module on first use."""
+    try:
+        module_name, class_name = COMMANDERS[kind]
+    except KeyError:
+        raise ValueError(f"Unknown commander: {kind} (expected one of {', '.join(COMMANDERS)})") from None
+
+    qualified_name = f"{__package__}.{module_name}"
+    if qualified_name not in sys.modules:
+        start = time.perf_counter()
+        importlib.import_module(qualified_name)
+        logger.debug("Loaded %s commander in %.0fms", kind, (time.perf_counter() - start) * 1e3)
+    return getattr(sys.modules[qualified_name], class_name)
+
+
+def create_commander(kind: str, address: str, **kwargs) -> BaseCommander:
+    """Create a commander of the given kind ("mavsdk", "olympe" or "sim")."""
+    return get_commander_class(kind)(address, **kwargs)
@@ -0,0 +1,314 @@
+import asyncio
+import logging
+import math
+import random
+from typing import Callable, Optional, Tuple
+
+from geometry import LocalTangentPlane
+
+from .base_commander import BaseCommander, PositionSample
+
+SIM_STEP_S = 0.1  # Longest integration step of the kinematic models
+TAKEOFF_ALT_M = 10.0  # Altitude reached by takeoff and prepare_for_drop
+
+# Multirotor limits (roughly a Parrot Anafi)
+MULTIROTOR_MAX_SPEED = 12.0  # m/s horizontal speed at full stick
+MULTIROTOR_MAX_VERTICAL_SPEED = 2.0  # m/s vertical speed at full gaz
+MULTIROTOR_MAX_YAW_RATE = math.radians(90)  # rad/s at full yaw stick
+MULTIROTOR_MAX_ACCEL = 5.0  # m/s²
+MULTIROTOR_GOTO_SPEED = 8.0  # m/s cruise speed of goto_position
+MULTIROTOR_GOTO_GAIN = 1.0  # 1/s, speed per meter to the target when close to it
+
+# Fixed-wing limits
+FIXED_WING_CRUISE_SPEED = 18.0  # m/s
+FIXED_WING_MAX_SPEED = 25.0  # m/s at full throttle
+FIXED_WING_MAX_TURN_RATE = math.radians(20)  # rad/s
+FIXED_WING_MAX_CLIMB = 3.0  # m/s
+FIXED_WING_LOITER_RADIUS = 60.0  # m, circle flown around a reached target
+
+Vector = Tuple[float, float, float]
+Trajectory = Callable[[float], Vector]  # time since start (s) -> (east, north, up) offset from (0, 0, alt)
+
+logger = logging.getLogger()
+
+
+def _approach(current: float, target: float, max_step: float) -> float:
+    return current + max(-max_step, min(max_step, target - current))
+
+
+class KinematicModel:
+    """
+    Point-mass vehicle in a local (east, north, up) frame, with a heading.
+    Subclasses turn the latest command into motion in `step`.
+    """
+
+    def __init__(self, position: Vector, yaw: float = 0.0):
+        self.position = list(position)
+        self.velocity = [0.0, 0.0, 0.0]
+        self.yaw = yaw  # radians, clockwise from north
+        self.flying = position[2] > 0.0
+        self.pcmd: Optional[Tuple[int, int, int, int]] = None
+        self.target: Optional[Vector] = None
+
+    def set_pcmd(self, roll: int, pitch: int, yaw: int, gaz: int) -> None:
+        self.pcmd = (roll, pitch, yaw, gaz)
+        self.target = None
+
+    def set_target(self, target: Vector) -> None:
+        self.target = target
+        self.pcmd = None
+
+    def step(self, dt: float) -> None:
+        raise NotImplementedError
+
+    def _integrate(self, velocity: Vector, dt: float) -> None:
+        for i in range(3):
+            self.position[i] += 0.5 * (self.velocity[i] + velocity[i]) * dt
+            self.velocity[i] = velocity[i]
+        if self.position[2] <= 0.0 and self.velocity[2] <= 0.0:
+            # Touched the ground
+            self.position[2] = 0.0
+            self.velocity = [0.0, 0.0, 0.0]
+            self.flying = self.target is not None and self.target[2] > 0.0
+
+
+class MultirotorModel(KinematicModel):
+    """Hovering vehicle: PCMDs set body-frame velocities, targets are reached at MULTIROTOR_GOTO_SPEED and held."""
+
+    def step(self, dt: float) -> None:
+        if not self.flying:
+            return
+        want = [0.0, 0.0, 0.0]
+        if self.pcmd is not None:
+            roll, pitch, yaw, gaz = self.pcmd
+            forward = pitch / 100 * MULTIROTOR_MAX_SPEED
+            right = roll / 100 * MULTIROTOR_MAX_SPEED
+            sin_yaw, cos_yaw = math.sin(self.yaw), math.cos(self.yaw)
+            want = [forward * sin_yaw + right * cos_yaw, forward * cos_yaw - right * sin_yaw, gaz / 100 * MULTIROTOR_MAX_VERTICAL_SPEED]
+            self.yaw = (self.yaw + yaw / 100 * MULTIROTOR_MAX_YAW_RATE * dt) % (2 * math.pi)
+        elif self.target is not None:
+            delta = [t - p for t, p in zip(self.target, self.position)]
+            horizontal = math.hypot(delta[0], delta[1])
+            speed = min(MULTIROTOR_GOTO_SPEED, MULTIROTOR_GOTO_GAIN * horizontal)
+            if horizontal > 1e-6:
+                want[0] = delta[0] / horizontal * speed
+                want[1] = delta[1] / horizontal * speed
+                self.yaw = math.atan2(delta[0], delta[1]) % (2 * math.pi)
+            want[2] = max(-MULTIROTOR_MAX_VERTICAL_SPEED, min(MULTIROTOR_MAX_VERTICAL_SPEED, MULTIROTOR_GOTO_GAIN * delta[2]))
+
+        max_dv = MULTIROTOR_MAX_ACCEL * dt
+        self._integrate(tuple(_approach(v, w, max_dv) for v, w in zip(self.velocity, want)), dt)
+
+
+class FixedWingModel(KinematicModel):
+    """
+    Vehicle that cannot hover: it always flies at airspeed, turning at a limited rate.
+    PCMDs follow the fixed-wing semantics of PCMD (roll turns, pitch dives, gaz is throttle);
+    targets are flown to, then circled at FIXED_WING_LOITER_RADIUS.
+    """
+
+    def __init__(self, position: Vector, yaw: float = 0.0):
+        super().__init__(position, yaw)
+        self.speed = FIXED_WING_CRUISE_SPEED
+
+    def step(self, dt: float) -> None:
+        if not self.flying:
+            return
+        climb = 0.0
+        turn_rate = 0.0
+        if self.pcmd is not None:
+            roll, pitch, _, gaz = self.pcmd
+            turn_rate = roll / 100 * FIXED_WING_MAX_TURN_RATE
+            climb = -pitch / 100 * FIXED_WING_MAX_CLIMB
+            self.speed = FIXED_WING_CRUISE_SPEED + max(0, gaz) / 100 * (FIXED_WING_MAX_SPEED - FIXED_WING_CRUISE_SPEED)
+        elif self.target is not None:
+            delta = [t - p for t, p in zip(self.target, self.position)]
+            if math.hypot(delta[0], delta[1]) > FIXED_WING_LOITER_RADIUS:
+                error = (math.atan2(delta[0], delta[1]) - self.yaw + math.pi) % (2 * math.pi) - math.pi
+                turn_rate = max(-FIXED_WING_MAX_TURN_RATE, min(FIXED_WING_MAX_TURN_RATE, error / dt if dt > 0 else 0.0))
+            else:
+                turn_rate = self.speed / FIXED_WING_LOITER_RADIUS
+            climb = max(-FIXED_WING_MAX_CLIMB, min(FIXED_WING_MAX_CLIMB, delta[2]))
+
+        self.yaw = (self.yaw + turn_rate * dt) % (2 * math.pi)
+        self._integrate((self.speed * math.sin(self.yaw), self.speed * math.cos(self.yaw), climb), dt)
+
+
+class ScriptedModel(KinematicModel):
+    """Vehicle replaying a trajectory offset by `origin`; commands are ignored."""
+
+    def __init__(self, origin: Vector, trajectory: Trajectory):
+        self.origin = origin
+        self.trajectory = trajectory
+        super().__init__(self.position_at(0.0))
+        self.elapsed = 0.0
+        self.flying = True
+
+    def position_at(self, elapsed: float) -> Vector:
+        offset = self.trajectory(elapsed)
+        return (self.origin[0] + offset[0], self.origin[1] + offset[1], self.origin[2] + offset[2])
+
+    def step(self, dt: float) -> None:
+        self.elapsed += dt
+        position = self.position_at(self.elapsed)
+        if dt > 0:
+            self.velocity = [(new - old) / dt for new, old in zip(position, self.position)]
+            self.yaw = math.atan2(self.velocity[0], self.velocity[1]) % (2 * math.pi)
+        self.position = list(position)
+
+
+MODELS = {
+    "multirotor": MultirotorModel,
+    "fixed_wing": FixedWingModel,
+}
+
+
+class SimulatedCommander(BaseCommander):
+    """
+    In-process drone for tests and tuning, on top of a kinematic model.
+
+    The model is advanced lazily to the event loop time on every call, so the commander runs
+    as well on a real loop as on a virtual clock (see simulation.VirtualClockEventLoop).
+    Link effects are simulated: every request takes `latency` seconds, a fraction `dropout`
+    of them is lost, and reported positions and velocities carry Gaussian noise.
+    """
+
+    def __init__(
+        self,
+        address: str = "sim",
+        lat: float = 48.8566,
+        lon: float = 2.3522,
+        alt: float = 0.0,
+        model: str = "multirotor",
+        trajectory: Optional[Trajectory] = None,
+        latency: float = 0.0,
+        dropout: float = 0.0,
+        position_noise: float = 0.0,
+        velocity_noise: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            lat, lon, alt: Start position; alt is the height above the ground (meters)
+            model: "multirotor" or "fixed_wing"
+            trajectory: Scripted (east, north, up) path; overrides `model`. Its points are offsets from
+                (0, 0, alt), so the `altitude` of the helpers in `simulation` adds to `alt`
+            latency: One-way link delay of every request (seconds)
+            dropout: Probability that a request is lost
+            position_noise: Standard deviation of the reported position (meters)
+            velocity_noise: Standard deviation of the reported velocity (m/s)
+            seed: Seed of the noise and dropout generator
+        """
+        super().__init__(address)
+        self.plane = LocalTangentPlane(lat, lon, 0.0)
+        if trajectory is not None:
+            self.model: KinematicModel = ScriptedModel((0.0, 0.0, alt), trajectory)
+        else:
+            self.model = MODELS[model]((0.0, 0.0, alt))
+        self.latency = latency
+        self.dropout = dropout
+        self.position_noise = position_noise
+        self.velocity_noise = velocity_noise
+        self.random = random.Random(seed)
+        self.camera_angle = 0.0
+        self.commands = 0  # commands sent to this drone, lost ones included
+        self.connected = False
+        self._time: Optional[float] = None
+
+    def advance(self) -> float:
+        """Integrate the model up to the current loop time and return it."""
+        now = asyncio.get_running_loop().time()
+        if self._time is None:
+            self._time = now
+        while self._time < now:
+            dt = min(SIM_STEP_S, now - self._time)
+            self.model.step(dt)
+            self._time += dt
+        return now
+
+    async def _link(self) -> None:
+        """Simulate one trip over the link, raising if the request is lost."""
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        if self.dropout > 0 and self.random.random() < self.dropout:
+            raise TimeoutError(f"[Sim] {self.address} request lost")
+
+    async def _command(self, apply: Callable[[], None]) -> None:
+        self.commands += 1
+        await self._link()
+        self.advance()
+        apply()
+
+    @property
+    def in_the_air(self) -> bool:
+        return self.model.flying
+
+    async def connect(self) -> None:
+        self.connected = True
+        self.advance()
+        logger.debug("[Sim] Connected to %s", self.address)
+
+    async def disconnect(self) -> None:
+        self.connected = False
+        logger.debug("[Sim] Disconnected from %s", self.address)
+
+    async def get_position(self) -> Tuple[float, float, float]:
+        sample = await self.get_position_sample()
+        return (sample.lat, sample.lon, sample.alt)
+
+    async def get_position_sample(self) -> PositionSample:
+        # The fix is taken now and arrives `latency` later
+        timestamp = self.advance()
+        east, north, up = (c + self.random.gauss(0.0, self.position_noise) if self.position_noise else c for c in self.model.position)
+        await self._link()
+        return PositionSample(*self.plane.from_enu(east, north, up), timestamp)
+
+    def get_velocity(self) -> Optional[Tuple[float, float, float]]:
+        self.advance()
+        east, north, up = (v + self.random.gauss(0.0, self.velocity_noise) if self.velocity_noise else v for v in self.model.velocity)
+        return (north, east, -up)
+
+    def get_attitude(self) -> Optional[Tuple[float, float, float]]:
+        self.advance()
+        return (0.0, 0.0, self.model.yaw)
+
+    async def goto_position(self, latitude: float, longitude: float, altitude: float) -> None:
+        await self._command(lambda: self.model.set_target(self.plane.to_enu(latitude, longitude, altitude)))
+
+    async def takeoff(self) -> None:
+        def apply() -> None:
+            self.model.flying = True
+            east, north, _ = self.model.position
+            self.model.set_target((east, north, TAKEOFF_ALT_M))
+
+        await self._command(apply)
+        logger.info("[Sim] %s takeoff", self.address)
+
+    async def land(self) -> None:
+        def apply() -> None:
+            east, north, _ = self.model.position
+            self.model.set_target((east, north, 0.0))
+
+        await self._command(apply)
+        logger.info("[Sim] %s landing", self.address)
+
+    async def prepare_for_drop(self) -> None:
+        # Dropped from the leader: released directly in hover at the current height
+        def apply() -> None:
+            self.model.flying = True
+            self.model.set_target(tuple(self.model.position))
+
+        await self._command(apply)
+        logger.info("[Sim] %s has been released", self.address)
+
+    async def set_camera_angle(self, angle: float) -> None:
+        await self._command(lambda: setattr(self, "camera_angle", angle))
+
+    async def set_pcmds(self, roll: int, pitch: int, yaw: int, gaz: int) -> None:
+        if not self.in_the_air:
+            return
+        try:
+            await self._command(lambda: self.model.set_pcmd(roll, pitch, yaw, gaz))
+        except TimeoutError:
+            # PCMDs are fire-and-forget, a lost one is simply not applied
+            pass
@@ -0,0 +1,148 @@
+import asyncio
+import collections
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional
+
+STREAM_RETRY_DELAY = 1.0  # seconds before restarting a telemetry stream that failed
+SUBSCRIBER_QUEUE_SIZE = 1  # latest-value-wins: a slow consumer only ever sees the newest sample
+
+logger = logging.getLogger()
+
+
+class TelemetrySample(NamedTuple):
+    """A telemetry value together with the (monotonic) time it was received."""
+
+    value: Any
+    timestamp: float
+
+
+class StateSnapshot(NamedTuple):
+    """Latest known state of a drone; each field is None until the drone reported it."""
+
+    position: Optional[TelemetrySample]
+    velocity: Optional[TelemetrySample]
+    attitude: Optional[TelemetrySample]
+    flying_state: Optional[TelemetrySample]
+
+
+class TelemetryHub:
+    """
+    Long-lived telemetry cache shared by every consumer of a drone.
+
+    Producers (MAVSDK streams, Olympe event callbacks, ...) call `publish`, which stores
+    the sample in a latest-value cache and fans it out to async subscribers.
+    Reading the cache with `latest` never awaits and never takes a lock: every topic is
+    a single dict slot holding an immutable `TelemetrySample`, replaced atomically.
+    When `history_size` is set, the last samples of every topic are also kept in a ring buffer.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, history_size: int = 0):
+        self.clock = clock
+        self.history_size = history_size
+        self._latest: Dict[str, TelemetrySample] = {}
+        self._history: Dict[str, collections.deque] = {}
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+
+    def _bind_loop(self) -> None:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread_id = threading.get_ident()
+
+    def start(self, streams: Dict[str, Callable[[], AsyncIterator[Any]]]) -> None:
+        """
+        Start one background task per telemetry stream.
+
+        Args:
+            streams: Mapping of topic name to a factory returning a fresh async iterator
+                     (called again if the stream ends or fails)
+        """
+        self._bind_loop()
+        for topic, factory in streams.items():
+            self._tasks.append(asyncio.create_task(self._pump(topic, factory), name=f"telemetry-{topic}"))
+
+    async def stop(self) -> None:
+        """Cancel every stream task."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _pump(self, topic: str, factory: Callable[[], AsyncIterator[Any]]) -> None:
+        while True:
+            try:
+                async for value in factory():
+                    self.publish(topic, value)
+                logger.warning("[Telemetry] Stream '%s' ended, restarting", topic)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("[Telemetry] Stream '%s' failed: %s", topic, e)
+            await asyncio.sleep(STREAM_RETRY_DELAY)
+
+    def publish(self, topic: str, value: Any, timestamp: Optional[float] = None) -> TelemetrySample:
+        """
+        Store a new sample and notify subscribers. Safe to call from any thread.
+        """
+        sample = TelemetrySample(value, self.clock() if timestamp is None else timestamp)
+        self._latest[topic] = sample
+        if self.history_size:
+            ring = self._history.get(topic)
+            if ring is None:
+                ring = self._history.setdefault(topic, collections.deque(maxlen=self.history_size))
+            ring.append(sample)
+        if self._subscribers.get(topic):
+            if self._loop is None or threading.get_ident() == self._loop_thread_id:
+                self._fan_out(topic, sample)
+            else:
+                self._loop.call_soon_threadsafe(self._fan_out, topic, sample)
+        return sample
+
+    def _fan_out(self, topic: str, sample: TelemetrySample) -> None:
+        for queue in self._subscribers.get(topic, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(sample)
+
+    def latest(self, topic: str) -> Optional[TelemetrySample]:
+        """Return the most recent sample for `topic`, or None if nothing was received yet."""
+        return self._latest.get(topic)
+
+    def history(self, topic: str) -> List[TelemetrySample]:
+        """Return the buffered samples of `topic`, oldest first (empty if history is disabled)."""
+        return list(self._history.get(topic, ()))
+
+    def age(self, topic: str) -> Optional[float]:
+        """Seconds elapsed since the last sample of `topic`, or None if nothing was received yet."""
+        sample = self._latest.get(topic)
+        if sample is None:
+            return None
+        return self.clock() - sample.timestamp
+
+    async def wait_for(self, topic: str) -> TelemetrySample:
+        """Return the cached sample, waiting for the first one if the topic is still empty."""
+        sample = self._latest.get(topic)
+        if sample is not None:
+            return sample
+        subscription = self.subscribe(topic)
+        try:
+            return await subscription.__anext__()
+        finally:
+            await subscription.aclose()
+
+    async def subscribe(self, topic: str) -> AsyncIterator[TelemetrySample]:
+        """
+        Iterate over new samples of `topic`. Slow consumers skip intermediate samples.
+        """
+        self._bind_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(topic, []).append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers[topic].remove(queue)
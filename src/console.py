@@ -0,0 +1,43 @@
+import asyncio
+import sys
+import threading
+from typing import Optional, TextIO
+
+PROMPT = "Enter command (/help for list of commands): "
+
+
+class AsyncLineReader:
+    """
+    Read the lines of a text stream (stdin by default) without blocking the event loop.
+
+    A daemon thread does the blocking reads and hands the lines to the loop, which works for
+    terminals, pipes and files alike and never keeps the process alive on exit.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream if stream is not None else sys.stdin
+        self.lines: asyncio.Queue = asyncio.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._thread = threading.Thread(target=self._read, args=(loop,), name="stdin-reader", daemon=True)
+        self._thread.start()
+
+    def _read(self, loop: asyncio.AbstractEventLoop) -> None:
+        while True:
+            try:
+                line = self.stream.readline()
+            except (OSError, ValueError):
+                line = ""
+            try:
+                loop.call_soon_threadsafe(self.lines.put_nowait, line or None)
+            except RuntimeError:
+                return  # event loop closed
+            if not line:
+                return
+
+    async def readline(self) -> Optional[str]:
+        """Next line without its line ending, or None at end of input."""
+        line = await self.lines.get()
+        return None if line is None else line.rstrip("\r\n")
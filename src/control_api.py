@@ -0,0 +1,276 @@
+"""
+Local control API: JSON-RPC 2.0 over a Unix domain socket, one JSON object per line.
+
+Methods:
+    takeoff_follower, follow, follow_velocity, prepare_for_drop, manual, stop, land
+        The console commands of the same name, without parameters
+    status                          Running mode and follow parameters
+    get_params                      Follow parameters
+    set_params {name: value, ...}   Change follow parameters, applied to a running follow loop
+    subscribe {"drone": "leader" | "follower", "topics": [...], "rate_hz": 5}
+        Stream "telemetry" notifications of the position, velocity and/or attitude of a drone.
+        Returns the subscription id
+    unsubscribe {"subscription": id}
+
+Every command and parameter change goes through the dispatcher shared with the console, so
+concurrent clients are executed one at a time in arrival order.
+
+    $ echo '{"jsonrpc": "2.0", "id": 1, "method": "follow"}' | socat - UNIX-CONNECT:drone-coordination.sock
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import stat
+from typing import Awaitable, Callable, Dict, Optional
+
+from follow_params import FollowParams
+from modes import CommandDispatcher, ModeSupervisor
+from scheduler import PeriodicScheduler
+
+DEFAULT_CONTROL_SOCKET = "drone-coordination.sock"  # empty to disable the API
+MAX_REQUEST_BYTES = 64 * 1024
+MAX_TELEMETRY_RATE_HZ = 50.0
+DEFAULT_TELEMETRY_RATE_HZ = 5.0
+MAX_CLIENT_BUFFER_BYTES = 256 * 1024  # telemetry samples are dropped while a client reads slower than this
+API_COMMANDS = ("takeoff_follower", "follow", "follow_velocity", "prepare_for_drop", "manual", "stop", "land")
+TELEMETRY_TOPICS = ("position", "velocity", "attitude")
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+COMMAND_FAILED = -32000
+
+logger = logging.getLogger()
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class ControlClient:
+    """One connected client and its telemetry subscriptions."""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.subscriptions: Dict[int, asyncio.Task] = {}
+        self.dropped = 0
+
+    def send(self, message: dict) -> bool:
+        """Queue a message without waiting for the client. Returns False if it was dropped."""
+        if self.writer.is_closing():
+            return False
+        if self.writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER_BYTES:
+            self.dropped += 1
+            return False
+        self.writer.write(json.dumps(message).encode() + b"\n")
+        return True
+
+    def close(self) -> None:
+        for task in self.subscriptions.values():
+            task.cancel()
+        self.subscriptions.clear()
+        self.writer.close()
+
+
+class ControlServer:
+    def __init__(
+        self,
+        dispatcher: CommandDispatcher,
+        execute_command: Callable[[str], Awaitable[None]],
+        modes: ModeSupervisor,
+        follow_params: FollowParams,
+        drones: Dict[str, object],
+        path: str = DEFAULT_CONTROL_SOCKET,
+    ):
+        """
+        Args:
+            dispatcher: Dispatcher shared with the console
+            execute_command: Execute a console command such as "/follow" (called through the dispatcher)
+            modes: Supervisor of the running mode, for the status
+            follow_params: Follow parameters used by the follow loop
+            drones: Commanders by name ("leader", "follower") for the telemetry subscriptions
+            path: Path of the Unix socket
+        """
+        self.dispatcher = dispatcher
+        self.execute_command = execute_command
+        self.modes = modes
+        self.follow_params = follow_params
+        self.drones = drones
+        self.path = path
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.clients: set = set()
+        self._subscription_ids = itertools.count(1)
+
+    async def start(self) -> None:
+        await self._remove_stale_socket()
+        # Created owner-only from the start, rather than chmod-ed once anyone could have connected
+        umask = os.umask(0o177)
+        try:
+            self.server = await asyncio.start_unix_server(self._handle_client, self.path, limit=MAX_REQUEST_BYTES)
+        finally:
+            os.umask(umask)
+        logger.info("Control API listening on %s", self.path)
+
+    async def _remove_stale_socket(self) -> None:
+        """
+        Remove the socket left over by a previous session.
+
+        Raises:
+            FileExistsError: the path is not a socket, or another instance is listening on it
+        """
+        try:
+            mode = os.lstat(self.path).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise FileExistsError(f"{self.path} exists and is not a socket")
+        try:
+            _, writer = await asyncio.open_unix_connection(self.path)
+        except OSError:
+            os.unlink(self.path)  # nobody listening
+            return
+        writer.close()
+        raise FileExistsError(f"Another instance is listening on {self.path}")
+
+    async def stop(self) -> None:
+        if self.server is None:
+            return
+        self.server.close()
+        for client in list(self.clients):
+            client.close()
+        await self.server.wait_closed()
+        self.server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        client = ControlClient(writer)
+        self.clients.add(client)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    client.send(_error(None, INVALID_REQUEST, f"Request longer than {MAX_REQUEST_BYTES} bytes"))
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    response = await self._handle_request(client, line)
+                    if response is not None:
+                        client.send(response)
+                        await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.discard(client)
+            client.close()
+
+    async def _handle_request(self, client: ControlClient, line: bytes) -> Optional[dict]:
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return _error(None, PARSE_ERROR, f"Invalid JSON: {e}")
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return _error(None, INVALID_REQUEST, "Expected a JSON-RPC request object")
+
+        request_id = request.get("id")
+        params = request.get("params", {})
+        try:
+            if not isinstance(params, dict):
+                raise RpcError(INVALID_PARAMS, "params must be an object")
+            result = await self._call(client, request["method"], params)
+        except RpcError as e:
+            response = _error(request_id, e.code, str(e))
+        except Exception as e:
+            logger.error("Control API %s failed: %s", request["method"], e)
+            response = _error(request_id, COMMAND_FAILED, str(e))
+        else:
+            response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+        # Requests without id are notifications: no response
+        return response if "id" in request else None
+
+    async def _call(self, client: ControlClient, method: str, params: dict):
+        if method in API_COMMANDS:
+            logger.info("Control API command: %s", method)
+            return await self.dispatcher.submit(lambda: self._execute(method))
+        if method == "status":
+            return {"mode": self.modes.current, "params": self.follow_params.as_dict()}
+        if method == "get_params":
+            return self.follow_params.as_dict()
+        if method == "set_params":
+            return await self.dispatcher.submit(lambda: self._set_params(params))
+        if method == "subscribe":
+            return self._subscribe(client, params)
+        if method == "unsubscribe":
+            task = client.subscriptions.pop(params.get("subscription"), None)
+            if task is None:
+                raise RpcError(INVALID_PARAMS, "Unknown subscription")
+            task.cancel()
+            return True
+        raise RpcError(METHOD_NOT_FOUND, f"Unknown method: {method}")
+
+    # Results are computed in the dispatched action, before the next command can change the state
+
+    async def _execute(self, method: str) -> dict:
+        await self.execute_command("/" + method)
+        return {"mode": self.modes.current}
+
+    async def _set_params(self, params: dict) -> dict:
+        try:
+            self.follow_params.update(**params)
+        except ValueError as e:
+            raise RpcError(INVALID_PARAMS, str(e)) from None
+        logger.info("Control API follow parameters changed: %s", params)
+        return self.follow_params.as_dict()
+
+    def _subscribe(self, client: ControlClient, params: dict) -> int:
+        drone_name = params.get("drone", "leader")
+        drone = self.drones.get(drone_name)
+        if drone is None:
+            raise RpcError(INVALID_PARAMS, f"Unknown drone: {drone_name} (expected one of {', '.join(self.drones)})")
+        topics = params.get("topics", list(TELEMETRY_TOPICS))
+        if not isinstance(topics, list) or not topics or any(topic not in TELEMETRY_TOPICS for topic in topics):
+            raise RpcError(INVALID_PARAMS, f"topics must be a list of {', '.join(TELEMETRY_TOPICS)}")
+        rate_hz = params.get("rate_hz", DEFAULT_TELEMETRY_RATE_HZ)
+        if isinstance(rate_hz, bool) or not isinstance(rate_hz, (int, float)) or not 0 < rate_hz <= MAX_TELEMETRY_RATE_HZ:
+            raise RpcError(INVALID_PARAMS, f"rate_hz must be in (0, {MAX_TELEMETRY_RATE_HZ}]")
+
+        subscription = next(self._subscription_ids)
+        client.subscriptions[subscription] = asyncio.create_task(
+            self._stream_telemetry(client, subscription, drone_name, drone, topics, float(rate_hz)),
+            name=f"telemetry-{subscription}",
+        )
+        return subscription
+
+    async def _stream_telemetry(self, client: ControlClient, subscription: int, drone_name: str, drone, topics, rate_hz: float) -> None:
+        scheduler = PeriodicScheduler(rate_hz)
+        loop = asyncio.get_running_loop()
+        while True:
+            await scheduler.wait_next()
+            params = {"subscription": subscription, "drone": drone_name, "time": loop.time()}
+            if "position" in topics:
+                try:
+                    sample = await asyncio.wait_for(drone.get_position_sample(), timeout=scheduler.period)
+                    params["position"] = [sample.lat, sample.lon, sample.alt]
+                    params["position_time"] = sample.timestamp
+                except Exception:
+                    params["position"] = None
+            if "velocity" in topics:
+                velocity = drone.get_velocity()
+                params["velocity"] = None if velocity is None else list(velocity)
+            if "attitude" in topics:
+                attitude = drone.get_attitude()
+                params["attitude"] = None if attitude is None else list(attitude)
+            if not client.send({"jsonrpc": "2.0", "method": "telemetry", "params": params}) and client.writer.is_closing():
+                return
+
+
+def _error(request_id, code: int, message: str) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
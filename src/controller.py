@@ -1,8 +1,8 @@
-import asyncio
-import threading
+import logging
 
-from commanders.mavsdk_commander import JOYSTICK_DEADZONE
-from commanders.olympe_commander import OlympeCommander
+from commanders.base_commander import BaseCommander
+from metrics import REGISTRY
+from pcmd_pump import DEFAULT_PCMD_RATE_HZ, PcmdPump
 from pyPS4Controller.controller import Controller
 
 # Constants
@@ -10,16 +10,9 @@ JOYSTICK_DEADZONE = 500
 JOYSTICK_SATURATION = 32767
 UPDATE_DEADZONE = 2
 
-# Background asyncio loop
-background_loop = asyncio.new_event_loop()
+logger = logging.getLogger()
 
-
-def run_background_loop(loop):
-    asyncio.set_event_loop(loop)
-    loop.run_forever()
-
-
-threading.Thread(target=run_background_loop, args=(background_loop,), daemon=True).start()
+STICK_UPDATES = REGISTRY.counter("drone_joystick_updates_total", "Stick setpoints handed to the PCMD pump")
 
 
 # Decorator for joystick deadzone
@@ -34,56 +27,66 @@ def apply_joystick_deadzone(function):
 
 
 class MyController(Controller):
-    def __init__(self, drone: OlympeCommander, **kwargs):
+    """
+    PS4 controller bound to a drone commander. Meant to be driven by `listen_async` on the
+    application's event loop: actions return coroutines, which the controller schedules as tasks.
+    """
+
+    def __init__(self, drone: BaseCommander, pcmd_rate_hz: float = DEFAULT_PCMD_RATE_HZ, **kwargs):
         Controller.__init__(self, **kwargs)
         self.commander = drone
         self.current_pcmd = {"roll": 0, "pitch": 0, "yaw": 0, "gaz": 0}
+        self.pcmd_pump = PcmdPump(drone, rate_hz=pcmd_rate_hz)
+        self.pcmd_pump.start()
 
     def _send_pcmds(self):
-        asyncio.run_coroutine_threadsafe(
-            self.commander.set_pcmds(
-                self.current_pcmd.get("roll"),
-                self.current_pcmd.get("pitch"),
-                self.current_pcmd.get("yaw"),
-                self.current_pcmd.get("gaz"),
-            ),
-            background_loop,
+        # The pump sends the newest stick state at a fixed rate, intermediate values are dropped
+        STICK_UPDATES.inc()
+        self.pcmd_pump.update(
+            self.current_pcmd.get("roll"),
+            self.current_pcmd.get("pitch"),
+            self.current_pcmd.get("yaw"),
+            self.current_pcmd.get("gaz"),
         )
 
+    def close(self):
+        """Stop streaming stick commands to the drone."""
+        self.pcmd_pump.stop()
+
     def on_x_press(self):
-        print("on_x_press")
-        asyncio.run_coroutine_threadsafe(self.commander.takeoff(), background_loop)
+        logger.debug("on_x_press")
+        return self.commander.takeoff()
 
     def on_x_release(self):
-        print("on_x_release")
+        logger.debug("on_x_release")
         pass
 
     def on_triangle_press(self):
-        print("on_triangle_press")
+        logger.debug("on_triangle_press")
 
     def on_triangle_release(self):
-        print("on_triangle_release")
+        logger.debug("on_triangle_release")
 
     def on_circle_press(self):
-        print("on_circle_press")
-        asyncio.run_coroutine_threadsafe(self.commander.land(), background_loop)
+        logger.debug("on_circle_press")
+        return self.commander.land()
 
     def on_circle_release(self):
-        print("on_circle_release")
+        logger.debug("on_circle_release")
         pass
 
     def on_square_press(self):
-        print("on_square_press")
-        asyncio.run_coroutine_threadsafe(self.commander.prepare_for_drop(), background_loop)
+        logger.debug("on_square_press")
+        return self.commander.prepare_for_drop()
 
     def on_square_release(self):
-        print("on_square_release")
+        logger.debug("on_square_release")
 
     def on_L1_press(self):
-        print("on_L1_press")
+        logger.debug("on_L1_press")
 
     def on_L1_release(self):
-        print("on_L1_release")
+        logger.debug("on_L1_release")
 
     def on_L2_press(self, value):
         # print("on_L2_press: {}".format(value))
@@ -94,10 +97,10 @@ class MyController(Controller):
         pass
 
     def on_R1_press(self):
-        print("on_R1_press")
+        logger.debug("on_R1_press")
 
     def on_R1_release(self):
-        print("on_R1_release")
+        logger.debug("on_R1_release")
 
     def on_R2_press(self, value):
         # print("on_R2_press: {}".format(value))
@@ -108,22 +111,22 @@ class MyController(Controller):
         pass
 
     def on_up_arrow_press(self):
-        print("on_up_arrow_press")
+        logger.debug("on_up_arrow_press")
 
     def on_up_down_arrow_release(self):
-        print("on_up_down_arrow_release")
+        logger.debug("on_up_down_arrow_release")
 
     def on_down_arrow_press(self):
-        print("on_down_arrow_press")
+        logger.debug("on_down_arrow_press")
 
     def on_left_arrow_press(self):
-        print("on_left_arrow_press")
+        logger.debug("on_left_arrow_press")
 
     def on_left_right_arrow_release(self):
-        print("on_left_right_arrow_release")
+        logger.debug("on_left_right_arrow_release")
 
     def on_right_arrow_press(self):
-        print("on_right_arrow_press")
+        logger.debug("on_right_arrow_press")
 
     @apply_joystick_deadzone
     def on_L3_up(self, value):
@@ -162,10 +165,10 @@ class MyController(Controller):
         self._send_pcmds()
 
     def on_L3_press(self):
-        print("on_L3_press")
+        logger.debug("on_L3_press")
 
     def on_L3_release(self):
-        print("on_L3_release")
+        logger.debug("on_L3_release")
 
     @apply_joystick_deadzone
     def on_R3_up(self, value):
@@ -204,25 +207,25 @@ class MyController(Controller):
         self._send_pcmds()
 
     def on_R3_press(self):
-        print("on_R3_press")
+        logger.debug("on_R3_press")
 
     def on_R3_release(self):
-        print("on_R3_release")
+        logger.debug("on_R3_release")
 
     def on_options_press(self):
-        print("on_options_press")
+        logger.debug("on_options_press")
 
     def on_options_release(self):
-        print("on_options_release")
+        logger.debug("on_options_release")
 
     def on_share_press(self):
-        print("on_share_press")
+        logger.debug("on_share_press")
 
     def on_share_release(self):
-        print("on_share_release")
+        logger.debug("on_share_release")
 
     def on_playstation_button_press(self):
-        print("on_playstation_button_press")
+        logger.debug("on_playstation_button_press")
 
     def on_playstation_button_release(self):
-        print("on_playstation_button_release")
+        logger.debug("on_playstation_button_release")
@@ -0,0 +1,159 @@
+import math
+from typing import Optional, Tuple
+
+from geometry import REANCHOR_DISTANCE_M, LocalTangentPlane
+
+DEFAULT_ACCEL_NOISE = 2.0  # m/s², standard deviation of the unmodelled leader acceleration
+DEFAULT_POSITION_NOISE = 1.5  # m, standard deviation of a GPS position fix
+DEFAULT_VELOCITY_NOISE = 0.5  # m/s, standard deviation of a reported velocity
+INITIAL_VELOCITY_VARIANCE = 25.0  # (m/s)², leader speed unknown before the first velocity measurement
+
+Vector = Tuple[float, float, float]
+
+
+class AxisKalmanFilter:
+    """
+    Constant-velocity Kalman filter along one axis.
+    State is (position, velocity); the covariance is kept as its three distinct terms.
+    """
+
+    def __init__(self, position: float, velocity: float, position_variance: float, velocity_variance: float):
+        self.position = position
+        self.velocity = velocity
+        self.p00 = position_variance
+        self.p01 = 0.0
+        self.p11 = velocity_variance
+
+    def predict(self, dt: float, accel_variance: float) -> None:
+        # White-noise acceleration model
+        dt2 = dt * dt
+        self.position += self.velocity * dt
+        self.p00 += dt * (2.0 * self.p01 + dt * self.p11) + accel_variance * dt2 * dt2 / 4.0
+        self.p01 += dt * self.p11 + accel_variance * dt2 * dt / 2.0
+        self.p11 += accel_variance * dt2
+
+    def update_position(self, measurement: float, variance: float) -> None:
+        innovation = measurement - self.position
+        s = self.p00 + variance
+        k0, k1 = self.p00 / s, self.p01 / s
+        self.position += k0 * innovation
+        self.velocity += k1 * innovation
+        self.p11 -= k1 * self.p01
+        self.p01 -= k0 * self.p01
+        self.p00 -= k0 * self.p00
+
+    def update_velocity(self, measurement: float, variance: float) -> None:
+        innovation = measurement - self.velocity
+        s = self.p11 + variance
+        k0, k1 = self.p01 / s, self.p11 / s
+        self.position += k0 * innovation
+        self.velocity += k1 * innovation
+        self.p00 -= k0 * self.p01
+        self.p01 -= k0 * self.p11
+        self.p11 -= k1 * self.p11
+
+
+class LeaderEstimator:
+    """
+    Tracks the leader in a local tangent plane with one constant-velocity Kalman filter per
+    ENU axis, fusing position fixes and (when available) velocity telemetry.
+    `predict` extrapolates the filtered state to any time, e.g. when a command will reach the follower.
+    """
+
+    def __init__(
+        self,
+        accel_noise: float = DEFAULT_ACCEL_NOISE,
+        position_noise: float = DEFAULT_POSITION_NOISE,
+        velocity_noise: float = DEFAULT_VELOCITY_NOISE,
+    ):
+        self.accel_variance = accel_noise**2
+        self.position_variance = position_noise**2
+        self.velocity_variance = velocity_noise**2
+        self.plane: Optional[LocalTangentPlane] = None
+        self.axes: Optional[Tuple[AxisKalmanFilter, AxisKalmanFilter, AxisKalmanFilter]] = None
+        self.timestamp: Optional[float] = None
+
+    @property
+    def initialized(self) -> bool:
+        return self.axes is not None
+
+    def update(self, timestamp: float, lat: float, lon: float, alt: float, velocity_ned: Optional[Vector] = None) -> None:
+        """
+        Fuse a leader fix taken at `timestamp`, with its optional (north, east, down) velocity in m/s.
+        Fixes that are not newer than the current estimate are ignored.
+        """
+        if self.plane is None:
+            self.plane = LocalTangentPlane(lat, lon, alt)
+        position = self.plane.to_enu(lat, lon, alt)
+        velocity = None if velocity_ned is None else ned_to_enu(velocity_ned)
+
+        if self.axes is None:
+            initial_velocity = velocity or (0.0, 0.0, 0.0)
+            self.axes = tuple(
+                AxisKalmanFilter(position[i], initial_velocity[i], self.position_variance, INITIAL_VELOCITY_VARIANCE) for i in range(3)
+            )
+            self.timestamp = timestamp
+            return
+        if timestamp <= self.timestamp:
+            return
+
+        dt = timestamp - self.timestamp
+        for i, axis in enumerate(self.axes):
+            axis.predict(dt, self.accel_variance)
+            axis.update_position(position[i], self.position_variance)
+            if velocity is not None:
+                axis.update_velocity(velocity[i], self.velocity_variance)
+        self.timestamp = timestamp
+
+        if abs(position[0]) > REANCHOR_DISTANCE_M or abs(position[1]) > REANCHOR_DISTANCE_M:
+            self._reanchor(lat, lon, alt)
+
+    def _reanchor(self, lat: float, lon: float, alt: float) -> None:
+        """Move the tangent plane to the leader, translating the filtered positions accordingly."""
+        old_plane, self.plane = self.plane, LocalTangentPlane(lat, lon, alt)
+        estimate = old_plane.from_enu(*(axis.position for axis in self.axes))
+        for axis, coordinate in zip(self.axes, self.plane.to_enu(*estimate)):
+            axis.position = coordinate
+
+    def predict_enu(self, timestamp: float) -> Tuple[Vector, Vector]:
+        """
+        Returns:
+            Tuple of (east, north, up) position in the estimator plane and (east, north, up) velocity at `timestamp`
+        """
+        dt = timestamp - self.timestamp
+        position = tuple(axis.position + axis.velocity * dt for axis in self.axes)
+        velocity = tuple(axis.velocity for axis in self.axes)
+        return position, velocity
+
+    def predict(self, timestamp: float) -> Tuple[float, float, float]:
+        """
+        Returns:
+            Tuple of (latitude, longitude, altitude) expected for the leader at `timestamp`
+        """
+        position, _ = self.predict_enu(timestamp)
+        return self.plane.from_enu(*position)
+
+
+def ned_to_enu(vector: Vector) -> Vector:
+    north, east, down = vector
+    return east, north, -down
+
+
+def time_to_closest_approach(relative_position: Vector, relative_velocity: Vector) -> Tuple[float, float]:
+    """
+    Closest point of approach of two objects moving at constant velocity.
+
+    Args:
+        relative_position: Position of the second object relative to the first (meters)
+        relative_velocity: Velocity of the second object relative to the first (m/s)
+
+    Returns:
+        Tuple of (time until closest approach in seconds, 0 if they are moving apart; distance at that time in meters)
+    """
+    speed2 = sum(v * v for v in relative_velocity)
+    if speed2 < 1e-9:
+        t_cpa = 0.0
+    else:
+        t_cpa = max(0.0, -sum(p * v for p, v in zip(relative_position, relative_velocity)) / speed2)
+    distance = math.sqrt(sum((p + v * t_cpa) ** 2 for p, v in zip(relative_position, relative_velocity)))
+    return t_cpa, distance
@@ -0,0 +1,93 @@
+from scheduler import FAST_RATE_HZ
+
+# Configuration constants with default values
+DEFAULT_FOLLOW_DIST_M = 5.0  # Target follow distance in meters
+DEFAULT_MIN_DIST_M = 2.0  # Minimum safe distance before stopping follower
+DEFAULT_MAX_DIST_M = 30.0  # Maximum distance before limiting follower movement
+DEFAULT_ALT_OFFSET_M = 2.0  # Altitude offset from leader
+DEFAULT_SMOOTHING = 0.3  # Weight of the previous target in the smoothed follow point
+DEFAULT_COMMAND_LATENCY_S = 0.5  # Expected delay between computing a follow point and the follower acting on it
+
+
+class FollowParams:
+    """
+    Tunable parameters of follow_loop (see its arguments). The loop reads them on every tick, so
+    they can be changed while it runs. `dry_run` is reported but fixed at creation: turning it off
+    from the control API would make a running loop send real commands without the operator knowing.
+    """
+
+    FIELDS = {
+        "interval": float,
+        "min_dist": float,
+        "follow_dist": float,
+        "max_dist": float,
+        "alt_offset": float,
+        "smoothing": float,
+        "prediction": bool,
+        "command_latency": float,
+        "adaptive_rate": bool,
+        "max_rate": float,
+    }
+    READ_ONLY = ("dry_run",)
+
+    def __init__(
+        self,
+        interval: float = 1.0,
+        min_dist: float = DEFAULT_MIN_DIST_M,
+        follow_dist: float = DEFAULT_FOLLOW_DIST_M,
+        max_dist: float = DEFAULT_MAX_DIST_M,
+        alt_offset: float = DEFAULT_ALT_OFFSET_M,
+        smoothing: float = DEFAULT_SMOOTHING,
+        prediction: bool = True,
+        command_latency: float = DEFAULT_COMMAND_LATENCY_S,
+        adaptive_rate: bool = True,
+        max_rate: float = FAST_RATE_HZ,
+        dry_run: bool = True,
+    ):
+        self.interval = interval
+        self.min_dist = min_dist
+        self.follow_dist = follow_dist
+        self.max_dist = max_dist
+        self.alt_offset = alt_offset
+        self.smoothing = smoothing
+        self.prediction = prediction
+        self.command_latency = command_latency
+        self.adaptive_rate = adaptive_rate
+        self.max_rate = max_rate
+        self.dry_run = dry_run
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in (*self.FIELDS, *self.READ_ONLY)}
+
+    def update(self, **changes) -> None:
+        """
+        Change some parameters at once. Nothing is changed if any of them is invalid.
+
+        Raises:
+            ValueError: unknown parameter, wrong type or inconsistent values
+        """
+        values = self.as_dict()
+        for name, value in changes.items():
+            kind = self.FIELDS.get(name)
+            if name in self.READ_ONLY:
+                raise ValueError(f"Follow parameter {name} cannot be changed while the application runs")
+            if kind is None:
+                raise ValueError(f"Unknown follow parameter: {name}")
+            # bool is an int: flags only take booleans, and numbers are never booleans
+            if kind is bool:
+                valid = isinstance(value, bool)
+            else:
+                valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+            if not valid:
+                raise ValueError(f"Follow parameter {name} must be a {kind.__name__}")
+            values[name] = kind(value)
+        if values["interval"] <= 0 or values["max_rate"] <= 0:
+            raise ValueError("interval and max_rate must be positive")
+        if not 0 <= values["min_dist"] < values["max_dist"]:
+            raise ValueError("Expected 0 <= min_dist < max_dist")
+        if values["follow_dist"] < 0 or values["command_latency"] < 0:
+            raise ValueError("follow_dist and command_latency must not be negative")
+        if not 0 <= values["smoothing"] < 1:
+            raise ValueError("smoothing must be in [0, 1)")
+        for name, value in values.items():
+            setattr(self, name, value)
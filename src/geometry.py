@@ -0,0 +1,266 @@
+import abc
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+# WGS84 ellipsoid parameters
+WGS84_A = 6378137.0  # semi-major axis in meters
+WGS84_F = 1 / 298.257223563  # flattening
+WGS84_E2 = WGS84_F * (2 - WGS84_F)  # first eccentricity squared
+
+DEFAULT_BACKEND = "enu"
+REANCHOR_DISTANCE_M = 2000.0  # Re-center the tangent plane when points get this far from its anchor
+
+
+def radii_of_curvature(lat: float) -> Tuple[float, float]:
+    """
+    Meridian and prime vertical radii of curvature of the WGS84 ellipsoid.
+
+    Args:
+        lat: Latitude in degrees
+
+    Returns:
+        Tuple of (meridian_radius, prime_vertical_radius) in meters
+    """
+    sin_lat = math.sin(math.radians(lat))
+    w2 = 1.0 - WGS84_E2 * sin_lat * sin_lat
+    prime_vertical = WGS84_A / math.sqrt(w2)
+    meridian = WGS84_A * (1.0 - WGS84_E2) / (w2 * math.sqrt(w2))
+    return meridian, prime_vertical
+
+
+def _wrap_degrees(delta):
+    """Wrap a longitude difference (scalar or array) to [-180, 180)."""
+    return (delta + 180.0) % 360.0 - 180.0
+
+
+class LocalTangentPlane:
+    """
+    East/North/Up projection around a fixed anchor point.
+
+    The scale factors are computed once from the ellipsoid radii at the anchor, so a
+    conversion is a handful of multiplications. Errors stay at the centimeter level
+    within a few kilometers of the anchor, far below GPS noise.
+    """
+
+    def __init__(self, lat0: float, lon0: float, alt0: float = 0.0):
+        self.lat0 = lat0
+        self.lon0 = lon0
+        self.alt0 = alt0
+        meridian, prime_vertical = radii_of_curvature(lat0)
+        self.north_per_deg = math.radians(1.0) * (meridian + alt0)
+        self.east_per_deg = math.radians(1.0) * (prime_vertical + alt0) * math.cos(math.radians(lat0))
+
+    def to_enu(self, lat: float, lon: float, alt: float = 0.0) -> Tuple[float, float, float]:
+        """Convert a geodetic position to (east, north, up) meters relative to the anchor."""
+        return (
+            _wrap_degrees(lon - self.lon0) * self.east_per_deg,
+            (lat - self.lat0) * self.north_per_deg,
+            alt - self.alt0,
+        )
+
+    def from_enu(self, east: float, north: float, up: float = 0.0) -> Tuple[float, float, float]:
+        """Convert (east, north, up) meters relative to the anchor back to (latitude, longitude, altitude)."""
+        return (
+            self.lat0 + north / self.north_per_deg,
+            _wrap_degrees(self.lon0 + east / self.east_per_deg),
+            self.alt0 + up,
+        )
+
+    def to_enu_batch(self, lats, lons, alts=None) -> np.ndarray:
+        """
+        Convert many geodetic positions at once.
+
+        Args:
+            lats: Latitudes in degrees (array-like of shape (N,))
+            lons: Longitudes in degrees (array-like of shape (N,))
+            alts: Altitudes in meters (array-like of shape (N,), defaults to the anchor altitude)
+
+        Returns:
+            Array of shape (N, 3) holding (east, north, up) in meters
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        enu = np.empty(lats.shape + (3,), dtype=np.float64)
+        enu[..., 0] = _wrap_degrees(lons - self.lon0) * self.east_per_deg
+        enu[..., 1] = (lats - self.lat0) * self.north_per_deg
+        enu[..., 2] = 0.0 if alts is None else np.asarray(alts, dtype=np.float64) - self.alt0
+        return enu
+
+    def from_enu_batch(self, enu) -> np.ndarray:
+        """
+        Convert many (east, north, up) positions at once.
+
+        Args:
+            enu: Array-like of shape (N, 3) in meters
+
+        Returns:
+            Array of shape (N, 3) holding (latitude, longitude, altitude)
+        """
+        enu = np.asarray(enu, dtype=np.float64)
+        lla = np.empty(enu.shape, dtype=np.float64)
+        lla[..., 0] = self.lat0 + enu[..., 1] / self.north_per_deg
+        lla[..., 1] = _wrap_degrees(self.lon0 + enu[..., 0] / self.east_per_deg)
+        lla[..., 2] = self.alt0 + enu[..., 2]
+        return lla
+
+
+class GeometryBackend(abc.ABC):
+    """Interface shared by the geometry backends."""
+
+    name = ""
+
+    @abc.abstractmethod
+    def separation_and_bearing(self, lat1: float, lon1: float, lat2: float, lon2: float) -> Tuple[float, float]:
+        """
+        Returns:
+            Tuple of (distance in meters, bearing in degrees clockwise from north) from point 1 to point 2
+        """
+        pass
+
+    @abc.abstractmethod
+    def destination(self, lat: float, lon: float, bearing: float, distance: float) -> Tuple[float, float]:
+        """
+        Returns:
+            Tuple of (latitude, longitude) reached after `distance` meters along `bearing` degrees
+        """
+        pass
+
+    def follow_point(
+        self,
+        leader_lat: float,
+        leader_lon: float,
+        follower_lat: float,
+        follower_lon: float,
+        distance: float,
+    ) -> Tuple[float, float]:
+        """
+        Returns:
+            Tuple of (latitude, longitude) `distance` meters from the leader, toward the follower
+        """
+        _, bearing = self.separation_and_bearing(leader_lat, leader_lon, follower_lat, follower_lon)
+        return self.destination(leader_lat, leader_lon, bearing, distance)
+
+
+class GeodesicBackend(GeometryBackend):
+    """Exact ellipsoidal computations (Karney's algorithm through geographiclib)."""
+
+    name = "geodesic"
+
+    def __init__(self):
+        # Imported here so that only the users of this backend pay for geographiclib
+        from geographiclib.geodesic import Geodesic
+
+        self.geodesic = Geodesic.WGS84
+        self.inverse_mask = Geodesic.DISTANCE | Geodesic.AZIMUTH
+        self.direct_mask = Geodesic.LATITUDE | Geodesic.LONGITUDE
+
+    def separation_and_bearing(self, lat1: float, lon1: float, lat2: float, lon2: float) -> Tuple[float, float]:
+        inv = self.geodesic.Inverse(lat1, lon1, lat2, lon2, self.inverse_mask)
+        return inv["s12"], inv["azi1"]
+
+    def destination(self, lat: float, lon: float, bearing: float, distance: float) -> Tuple[float, float]:
+        dest = self.geodesic.Direct(lat, lon, bearing, distance, self.direct_mask)
+        return dest["lat2"], dest["lon2"]
+
+
+class TangentPlaneBackend(GeometryBackend):
+    """
+    Planar computations in a cached local tangent plane.
+
+    The plane is anchored at the first point it sees (usually the leader or home position)
+    and re-anchored when the drones move more than `reanchor_distance` meters away from it.
+    """
+
+    name = "enu"
+
+    def __init__(self, reanchor_distance: float = REANCHOR_DISTANCE_M):
+        self.reanchor_distance = reanchor_distance
+        self.plane: Optional[LocalTangentPlane] = None
+
+    def anchor(self, lat: float, lon: float, alt: float = 0.0) -> LocalTangentPlane:
+        """Anchor the tangent plane at the given position (e.g. the home position)."""
+        self.plane = LocalTangentPlane(lat, lon, alt)
+        return self.plane
+
+    def plane_for(self, lat: float, lon: float) -> LocalTangentPlane:
+        """Return the current plane, re-anchoring it at (lat, lon) if it is missing or too far away."""
+        plane = self.plane
+        if plane is None:
+            return self.anchor(lat, lon)
+        east, north, _ = plane.to_enu(lat, lon)
+        if abs(east) > self.reanchor_distance or abs(north) > self.reanchor_distance:
+            return self.anchor(lat, lon)
+        return plane
+
+    def separation_and_bearing(self, lat1: float, lon1: float, lat2: float, lon2: float) -> Tuple[float, float]:
+        plane = self.plane_for(lat1, lon1)
+        east1, north1, _ = plane.to_enu(lat1, lon1)
+        east2, north2, _ = plane.to_enu(lat2, lon2)
+        d_east, d_north = east2 - east1, north2 - north1
+        return math.hypot(d_east, d_north), math.degrees(math.atan2(d_east, d_north))
+
+    def destination(self, lat: float, lon: float, bearing: float, distance: float) -> Tuple[float, float]:
+        plane = self.plane_for(lat, lon)
+        east, north, _ = plane.to_enu(lat, lon)
+        azimuth = math.radians(bearing)
+        dest_lat, dest_lon, _ = plane.from_enu(east + distance * math.sin(azimuth), north + distance * math.cos(azimuth))
+        return dest_lat, dest_lon
+
+    def follow_point(
+        self,
+        leader_lat: float,
+        leader_lon: float,
+        follower_lat: float,
+        follower_lon: float,
+        distance: float,
+    ) -> Tuple[float, float]:
+        plane = self.plane_for(leader_lat, leader_lon)
+        lead_east, lead_north, _ = plane.to_enu(leader_lat, leader_lon)
+        foll_east, foll_north, _ = plane.to_enu(follower_lat, follower_lon)
+        d_east, d_north = foll_east - lead_east, foll_north - lead_north
+        norm = math.hypot(d_east, d_north)
+        if norm == 0.0:
+            # Follower right on top of the leader: no direction to follow, same as a north bearing
+            d_east, d_north, norm = 0.0, 1.0, 1.0
+        scale = distance / norm
+        dest_lat, dest_lon, _ = plane.from_enu(lead_east + d_east * scale, lead_north + d_north * scale)
+        return dest_lat, dest_lon
+
+    def to_enu_batch(self, lats, lons, alts=None) -> np.ndarray:
+        """Convert many geodetic positions to ENU in the current plane (anchored at the first point if needed)."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        plane = self.plane if self.plane is not None else self.anchor(float(lats.flat[0]), float(lons.flat[0]))
+        return plane.to_enu_batch(lats, lons, alts)
+
+    def from_enu_batch(self, enu) -> np.ndarray:
+        """Convert many ENU positions of the current plane back to geodetic coordinates."""
+        if self.plane is None:
+            raise ValueError("Tangent plane has no anchor yet")
+        return self.plane.from_enu_batch(enu)
+
+
+BACKENDS = {
+    GeodesicBackend.name: GeodesicBackend,
+    TangentPlaneBackend.name: TangentPlaneBackend,
+}
+
+
+def make_backend(name: str = DEFAULT_BACKEND) -> GeometryBackend:
+    """Create a geometry backend by name ("enu" or "geodesic")."""
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown geometry backend: {name} (expected one of {', '.join(BACKENDS)})") from None
+
+
+def offset_position(lat: float, lon: float, alt: float, north: float, east: float, down: float) -> Tuple[float, float, float]:
+    """
+    Shift a position by a small NED offset in meters, using the ellipsoid radii at `lat`.
+    """
+    meridian, prime_vertical = radii_of_curvature(lat)
+    dlat = math.degrees(north / meridian)
+    dlon = math.degrees(east / (prime_vertical * math.cos(math.radians(lat))))
+    return lat + dlat, lon + dlon, alt - down
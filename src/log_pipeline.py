@@ -0,0 +1,243 @@
+import logging
+import logging.handlers
+import queue
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_LOG_FILE = "drone-coordination.log"
+DEFAULT_BINARY_LOG_FILE = "drone-coordination.bin"
+PER_TICK_LOG_INTERVAL = 1.0  # seconds between two text records of the same per-tick call site
+LOG_QUEUE_SIZE = 10000  # records waiting for the writer thread before new ones are dropped
+
+# Pass as `extra=` to mark a message logged on every control tick: it is rate-limited in the
+# text logs, or written in full to the binary log when enabled
+PER_TICK = {"per_tick": True}
+
+# Binary log layout, little-endian:
+#   header     BINARY_MAGIC
+#   format     b"F" <H id> <H length> utf-8 format string, once per distinct format string
+#   record     b"R" <d created> <B level> <H format id> <B argument count> arguments
+#   argument   b"d" <d float> | b"q" <q int> | b"s" <H length> utf-8 text
+BINARY_MAGIC = b"DCLOG\x01"
+
+# Define terminal color codes
+TERMINAL_COLORS_CODE = {
+    "DEBUG": "\033[1;34m",
+    "INFO": "\033[1;32m",
+    "WARNING": "\033[1;33m",
+    "ERROR": "\033[1;31m",
+    "RESET": "\033[0m",
+}
+
+
+class TextFormatter(logging.Formatter):
+    """Formatter of the text logs, reporting the per-tick records a RateLimitFilter suppressed."""
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        text = super().formatMessage(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{text} ({suppressed} similar messages suppressed)" if suppressed else text
+
+
+class ColoredFormatter(TextFormatter):
+    def format(self, record):
+        log_message = super().format(record)
+        log_level = record.levelname
+        color_code = TERMINAL_COLORS_CODE.get(log_level, TERMINAL_COLORS_CODE["RESET"])
+        return f"{color_code}{log_message}{TERMINAL_COLORS_CODE['RESET']}"
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves the record untouched: the %-formatting of the message happens on the
+    writer thread, not in the caller. Arguments must therefore not be mutated after the log call.
+    A full queue drops the record instead of blocking the caller.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let through at most one per-tick record per call site every `interval` seconds. The next
+    record let through carries how many were suppressed in between as `record.suppressed`, shown
+    by TextFormatter; the message itself is left untouched for the other handlers.
+    """
+
+    def __init__(self, interval: float = PER_TICK_LOG_INTERVAL):
+        super().__init__()
+        self.interval = interval
+        self.sites: Dict[Tuple[str, int], List] = {}  # call site -> [last emitted time, suppressed count]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "per_tick", False):
+            return True
+        site = self.sites.get((record.pathname, record.lineno))
+        if site is None:
+            self.sites[(record.pathname, record.lineno)] = [record.created, 0]
+            record.suppressed = 0
+            return True
+        if record.created - site[0] < self.interval:
+            site[1] += 1
+            return False
+        record.suppressed = site[1]
+        site[0] = record.created
+        site[1] = 0
+        return True
+
+
+class BinaryLogHandler(logging.Handler):
+    """Writes records in the compact binary layout above; format strings are stored once."""
+
+    def __init__(self, filename: str):
+        super().__init__()
+        self.stream = open(filename, "wb")
+        self.stream.write(BINARY_MAGIC)
+        self.format_ids: Dict[str, int] = {}
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            fmt = str(record.msg)
+            format_id = self.format_ids.get(fmt)
+            if format_id is None:
+                format_id = self.format_ids[fmt] = len(self.format_ids)
+                encoded = fmt.encode()
+                self.stream.write(b"F" + struct.pack("<HH", format_id, len(encoded)) + encoded)
+            args = record.args if isinstance(record.args, tuple) else ()
+            parts = [b"R", struct.pack("<dBHB", record.created, record.levelno, format_id, len(args))]
+            for arg in args:
+                if isinstance(arg, float):
+                    parts.append(b"d" + struct.pack("<d", arg))
+                elif isinstance(arg, int) and -(1 << 63) <= arg < 1 << 63:
+                    parts.append(b"q" + struct.pack("<q", arg))
+                else:
+                    text = str(arg).encode()[:0xFFFF]
+                    parts.append(b"s" + struct.pack("<H", len(text)) + text)
+            self.stream.write(b"".join(parts))
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+    def close(self) -> None:
+        self.stream.close()
+        super().close()
+
+
+def read_binary_log(filename: str) -> Iterator[Tuple[float, str, str]]:
+    """
+    Decode a binary log.
+
+    Returns:
+        Iterator of (creation time, level name, formatted message) tuples
+    """
+    with open(filename, "rb") as f:
+        data = f.read()
+    if not data.startswith(BINARY_MAGIC):
+        raise ValueError(f"{filename} is not a binary log")
+    formats: Dict[int, str] = {}
+    offset = len(BINARY_MAGIC)
+    while offset < len(data):
+        kind = data[offset : offset + 1]
+        offset += 1
+        if kind == b"F":
+            format_id, length = struct.unpack_from("<HH", data, offset)
+            offset += 4
+            formats[format_id] = data[offset : offset + length].decode()
+            offset += length
+            continue
+        created, level, format_id, count = struct.unpack_from("<dBHB", data, offset)
+        offset += struct.calcsize("<dBHB")
+        args = []
+        for _ in range(count):
+            arg_type = data[offset : offset + 1]
+            offset += 1
+            if arg_type == b"s":
+                (length,) = struct.unpack_from("<H", data, offset)
+                args.append(data[offset + 2 : offset + 2 + length].decode())
+                offset += 2 + length
+            else:
+                args.append(struct.unpack_from("<" + arg_type.decode(), data, offset)[0])
+                offset += 8
+        fmt = formats[format_id]
+        yield created, logging.getLevelName(level), fmt % tuple(args) if args else fmt
+
+
+class LogPipeline:
+    """
+    Root logger setup where the control path only enqueues records. Formatting, the colored
+    terminal output, the log file and the optional binary log are handled by a writer thread.
+    """
+
+    def __init__(
+        self,
+        level: int = logging.DEBUG,
+        log_file: str = DEFAULT_LOG_FILE,
+        binary_log_file: Optional[str] = None,
+        per_tick_interval: float = PER_TICK_LOG_INTERVAL,
+    ):
+        date_format = "%Y-%m-%d %H:%M:%S"
+        message_format = "%(asctime)s %(levelname)-8s %(message)s"
+
+        stderr_handler = logging.StreamHandler()
+        stderr_handler.setFormatter(ColoredFormatter(message_format, datefmt=date_format))
+        file_handler = logging.FileHandler(log_file)
+        file_handler.setFormatter(TextFormatter(message_format, datefmt=date_format))
+        handlers: List[logging.Handler] = [stderr_handler, file_handler]
+
+        self.queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+        self.queue_handler = DeferredQueueHandler(self.queue)
+        if binary_log_file is None:
+            # Thin out per-tick messages before they are even queued
+            self.queue_handler.addFilter(RateLimitFilter(per_tick_interval))
+        else:
+            # Per-tick messages all go to the binary log, the text logs keep a rate-limited view
+            # (one filter each: a filter's state only holds for the records of its own handler)
+            binary_handler = BinaryLogHandler(binary_log_file)
+            binary_handler.addFilter(lambda record: getattr(record, "per_tick", False))
+            for handler in handlers:
+                handler.addFilter(RateLimitFilter(per_tick_interval))
+            handlers.append(binary_handler)
+
+        self.level = level
+        self.handlers = handlers
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.running = False
+
+    def start(self) -> None:
+        root = logging.getLogger()
+        root.setLevel(self.level)
+        root.addHandler(self.queue_handler)
+        self.listener.start()
+        self.running = True
+
+    def stop(self) -> None:
+        """Flush every queued record and close the outputs."""
+        if not self.running:
+            return
+        self.running = False
+        logging.getLogger().removeHandler(self.queue_handler)
+        self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
+        if self.queue_handler.dropped:
+            print(f"{self.queue_handler.dropped} log records were dropped (queue full)")
+
+
+def setup_logging(binary_log_file: Optional[str] = None, level: int = logging.DEBUG) -> LogPipeline:
+    """Install and start the logging pipeline of the application."""
+    pipeline = LogPipeline(level=level, binary_log_file=binary_log_file)
+    pipeline.start()
+    return pipeline
@@ -1,112 +1,132 @@
+import sys
+
+from startup import StartupTimer
+
+# Started before the other imports so that they are part of the startup report
+STARTUP = StartupTimer(track_imports="--startup_report" in sys.argv)
+
 import argparse
 import asyncio
 import logging
 import signal
 import traceback
 
-from commanders.mavsdk_commander import MAVSDKCommander
-from commanders.olympe_commander import OlympeCommander
-from utils import follow_loop, manual_control
-
-# Define terminal color codes
-TERMINAL_COLORS_CODE = {
-    "DEBUG": "\033[1;34m",
-    "INFO": "\033[1;32m",
-    "WARNING": "\033[1;33m",
-    "ERROR": "\033[1;31m",
-    "RESET": "\033[0m",
-}
+from commanders.registry import create_commander
+from console import PROMPT, AsyncLineReader
+from control_api import DEFAULT_CONTROL_SOCKET, ControlServer
+from follow_params import FollowParams
+from log_pipeline import DEFAULT_BINARY_LOG_FILE, setup_logging
+from metrics import DEFAULT_METRICS_PORT, MetricsServer
+from modes import CommandDispatcher, ModeSupervisor
+from profiler import DEFAULT_PROFILE_FILE, DEFAULT_TRACE_FILE, SessionProfiler
 
+FOLLOWERS = ("olympe", "mavsdk")
+DEFAULT_MAVSDK_FOLLOWER = "udp://:14552"
+MAVSDK_FOLLOWER_SERVER_PORT = 50052  # the leader's mavsdk_server uses the default port 50051
 
-class ColoredFormatter(logging.Formatter):
-    def format(self, record):
-        log_message = super().format(record)
-        log_level = record.levelname
-        color_code = TERMINAL_COLORS_CODE.get(log_level, TERMINAL_COLORS_CODE["RESET"])
-        return f"{color_code}{log_message}{TERMINAL_COLORS_CODE['RESET']}"
-
-
-# Configure the logger
+# Commanders, the follow modes (numpy, geometry) and the joystick stack are imported on first use
 logger = logging.getLogger()
-logger.setLevel(logging.DEBUG)
-
-# Create a handler for stderr
-stderr_handler = logging.StreamHandler()
-stderr_handler.setFormatter(ColoredFormatter("%(asctime)s %(levelname)-8s %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
-
-# Create a handler for the file
-file_handler = logging.FileHandler("drone-coordination.log")
-file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-8s %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
-
-# Add both handlers to the logger
-logger.addHandler(stderr_handler)
-logger.addHandler(file_handler)
+STARTUP.mark("imports")
 
 
 async def show_help():
     print("Help: Use the following commands:")
     print("/takeoff_follower - Follower drone takeoff")
     print("/follow - Start following logic")
+    print("/follow_velocity - Start following with closed-loop velocity control (PCMD)")
     print("/prepare_for_drop - Prepare follower to be dropped from the leader drone")
     print("/manual - Control follower drone with RC")
+    print("/stop - Stop the running mode and hover")
+    print("/land - Stop the running mode and land the follower")
     print("/help - Show this help message")
     print("/exit - Exit")
     print("Ctrl-C to exit")
 
 
-async def handle_command(command, leader, follower):
-    """Match the command and call the appropriate function."""
+async def handle_command(command, leader, follower, modes: ModeSupervisor, follow_params: FollowParams):
+    """
+    Match the command and call the appropriate function. Modes run in the background, supervised
+    by `modes`; the follow loop reads `follow_params`, which the control API can change.
+    """
     match command:
         case "/takeoff_follower":
             logger.debug("takeoff_follower")
             await follower.takeoff()
         case "/follow":
             logger.info("Starting follow loop...")
-            await follow_loop(leader, follower)
+            from utils import follow_loop
+
+            await modes.start("follow", lambda: follow_loop(leader, follower, params=follow_params))
+        case "/follow_velocity":
+            logger.info("Starting velocity follow loop...")
+            from utils import velocity_follow_loop
+
+            await modes.start("follow_velocity", lambda: velocity_follow_loop(leader, follower))
         case "/prepare_for_drop":
             logger.debug(("Preparing follower to be dropped from the leader drone..."))
-            await follower.prepare_for_drop()
+            await modes.start("prepare_for_drop", follower.prepare_for_drop)
         case "/manual":
             logger.debug("Starting manual control loop...")
-            await manual_control(follower)
-        case "/exit":
-            logger.warning("Exiting...")
-            raise KeyboardInterrupt()
+            from utils import manual_control
+
+            await modes.start("manual", lambda: manual_control(follower))
+        case "/stop":
+            logger.info("Stopping %s - hovering", modes.current or "idle follower")
+            await modes.stop()
+            await follower.set_pcmds(0, 0, 0, 0)
+        case "/land":
+            logger.warning("Landing follower...")
+            await modes.stop()
+            await follower.land()
         case "/help":
             await show_help()
         case _:
-            logger.error(f"Unknown command: {command}")
+            logger.error("Unknown command: %s", command)
 
 
-async def listen_for_commands(leader, follower):
+async def listen_for_commands(dispatcher: CommandDispatcher, execute_command):
+    """Read console commands and execute them through the dispatcher shared with the control API."""
+    console = AsyncLineReader()
+    console.start()
     try:
         while True:
-            command = input("Enter command (/help for list of commands): ")
-            await handle_command(command, leader, follower)
+            print(PROMPT, end="", flush=True)
+            command = await console.readline()
+            if command is None:
+                logger.warning("End of input. Exiting...")
+                return
+            command = command.strip()
+            if not command:
+                continue
+            if command == "/exit":
+                logger.warning("Exiting...")
+                return
+            try:
+                await dispatcher.submit(lambda: execute_command(command))
+            except Exception as e:
+                logger.error("\nError in command processing: %s", e)
+                traceback.print_exc()
     except KeyboardInterrupt:
         logger.warning("\nCtrl-C detected. Exiting gracefully...")
         return
-    except Exception as e:
-        logger.error(f"\nError in command processing: {e}")
-        traceback.print_exc()
-        return
 
 
 async def cleanup(leader, follower):
     """Clean up resources and disconnect from drones."""
     logger.info("Cleaning up resources...")
-    tasks = []
 
     if follower:
-        tasks.append(follower.set_pcmds(0, 0, 0, 0))
+        await asyncio.gather(follower.set_pcmds(0, 0, 0, 0), return_exceptions=True)
 
+    # Disconnecting hands the drones back cleanly: the Olympe follower stops piloting and the
+    # MAVSDK one leaves offboard mode instead of tripping the offboard-loss failsafe on exit
+    tasks = [commander.disconnect() for commander in (leader, follower) if commander]
     if tasks:
         await asyncio.gather(*tasks, return_exceptions=True)
     logger.debug("Cleanup completed.")
 
 
-# Main entry point
-async def run():
+def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Follow-me between two drones")
 
     # Require that --mavsdk_drone is used, even if the address is not specified
@@ -125,34 +145,157 @@ async def run():
         default="192.168.42.1",
     )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "--follower",
+        help="Follower drone: a Parrot through Olympe, or a MAVLink vehicle (ArduPilot, PX4) through MAVSDK offboard control (default: olympe)",
+        choices=FOLLOWERS,
+        default="olympe",
+    )
+
+    parser.add_argument(
+        "--mavsdk_follower",
+        help=f"MAVSDK connection string of the follower with --follower mavsdk (default: {DEFAULT_MAVSDK_FOLLOWER})",
+        default=DEFAULT_MAVSDK_FOLLOWER,
+    )
+
+    parser.add_argument(
+        "--pcmd_per_call",
+        help="Send every Olympe PCMD and wait for its acknowledgement instead of streaming them with Olympe's piloting loop",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--metrics_port",
+        help=f"Local port serving Prometheus metrics on /metrics, 0 to disable (default: {DEFAULT_METRICS_PORT})",
+        type=int,
+        default=DEFAULT_METRICS_PORT,
+    )
+
+    parser.add_argument(
+        "--log_binary",
+        help=f"Write every per-tick record to a compact binary log, decoded with log_pipeline.read_binary_log (default file: {DEFAULT_BINARY_LOG_FILE})",
+        nargs="?",
+        const=DEFAULT_BINARY_LOG_FILE,
+    )
+
+    parser.add_argument(
+        "--trace",
+        help=f"Record asyncio task steps, scheduling delay and blocking callbacks to a Chrome/Perfetto trace (default file: {DEFAULT_TRACE_FILE})",
+        nargs="?",
+        const=DEFAULT_TRACE_FILE,
+    )
+
+    parser.add_argument(
+        "--profile",
+        help=f"Sample the stacks of every thread and write them collapsed for flame graphs (default file: {DEFAULT_PROFILE_FILE})",
+        nargs="?",
+        const=DEFAULT_PROFILE_FILE,
+    )
+
+    parser.add_argument(
+        "--startup_report",
+        help="Print the time to the prompt, broken down by startup phase and by import",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--control_socket",
+        help=f"Unix socket of the JSON-RPC control API, empty to disable (default: {DEFAULT_CONTROL_SOCKET})",
+        default=DEFAULT_CONTROL_SOCKET,
+    )
+
+    return parser.parse_args()
+
+
+# Main entry point
+async def run(args: argparse.Namespace):
+    profiler = None
+    if args.trace or args.profile:
+        profiler = SessionProfiler(trace_file=args.trace, profile_file=args.profile)
+        profiler.start()
+    try:
+        await run_session(args)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+
+async def run_session(args: argparse.Namespace):
+    metrics_server = None
+    if args.metrics_port:
+        metrics_server = MetricsServer(port=args.metrics_port)
+        try:
+            await metrics_server.start()
+        except OSError as e:
+            logger.error("Could not serve metrics on port %s: %s", args.metrics_port, e)
+            metrics_server = None
+    STARTUP.mark("metrics server")
 
     leader = None
     follower = None
 
-    leader = MAVSDKCommander(args.mavsdk_drone)
-    logger.debug(f"Using MAVSDK commander as leader with address {args.mavsdk_drone}")
-    follower = OlympeCommander(args.olympe_drone)
-    logger.debug(f"Using Olympe commander as follower with address {args.olympe_drone}")
+    leader = create_commander("mavsdk", args.mavsdk_drone)
+    logger.debug("Using MAVSDK commander as leader with address %s", args.mavsdk_drone)
+    if args.follower == "mavsdk":
+        follower = create_commander("mavsdk", args.mavsdk_follower, server_port=MAVSDK_FOLLOWER_SERVER_PORT)
+        logger.debug("Using MAVSDK commander as follower with address %s", args.mavsdk_follower)
+    else:
+        follower = create_commander("olympe", args.olympe_drone, pcmd_streaming=not args.pcmd_per_call)
+        logger.debug("Using Olympe commander as follower with address %s", args.olympe_drone)
+    STARTUP.mark("commanders")
 
     if leader and follower:
         try:
             task = asyncio.gather(leader.connect(), follower.connect())
             await task
         except Exception as e:
-            logger.error(f"Error connecting to drones: {e}")
+            logger.error("Error connecting to drones: %s", e)
             await cleanup(leader, follower)
+            if metrics_server is not None:
+                await metrics_server.stop()
             return
+    STARTUP.mark("connection")
+
+    STARTUP.stop_tracking()
+    logger.info("Ready in %.2fs", STARTUP.elapsed)
+    if args.startup_report:
+        print(STARTUP.report())
+
+    # Console and control API share the running mode, the follow parameters and a single dispatcher
+    follow_params = FollowParams()
+    modes = ModeSupervisor()
+    dispatcher = CommandDispatcher()
+    dispatcher.start()
+
+    async def execute_command(command: str) -> None:
+        await handle_command(command, leader, follower, modes, follow_params)
+
+    control_server = None
+    if args.control_socket:
+        drones = {"leader": leader, "follower": follower}
+        control_server = ControlServer(dispatcher, execute_command, modes, follow_params, drones, args.control_socket)
+        try:
+            await control_server.start()
+        except OSError as e:
+            logger.error("Could not open the control API socket %s: %s", args.control_socket, e)
+            control_server = None
 
     try:
-        await listen_for_commands(leader, follower)
+        # Own task, so the command console and the modes it awaits show up in traces
+        await asyncio.create_task(listen_for_commands(dispatcher, execute_command), name="commands")
     finally:
+        if control_server is not None:
+            await control_server.stop()
+        await modes.stop()
+        await dispatcher.stop()
         await cleanup(leader, follower)
+        if metrics_server is not None:
+            await metrics_server.stop()
 
 
 def signal_handler(sig, frame):
     """Handle external signals like SIGTERM."""
-    logger.warning(f"\nReceived signal {sig}. Exiting gracefully...")
+    logger.warning("\nReceived signal %s. Exiting gracefully...", sig)
     # This will raise a KeyboardInterrupt in the main thread
     raise KeyboardInterrupt()
 
@@ -162,10 +305,16 @@ if __name__ == "__main__":
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
+    args = parse_args()
+    log_pipeline = setup_logging(binary_log_file=args.log_binary)
+    STARTUP.mark("arguments and logging")
+
     try:
-        asyncio.run(run())
+        asyncio.run(run(args))
     except KeyboardInterrupt:
         logger.warning("Program terminated by user.")
     except Exception as e:
-        logger.error(f"Unhandled exception: {e}")
+        logger.error("Unhandled exception: %s", e)
         traceback.print_exc()
+    finally:
+        log_pipeline.stop()
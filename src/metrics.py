@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9464  # Prometheus scrape port, 0 disables the endpoint
+
+# HDR-style histogram layout: every power of two of nanoseconds is split in 2^(SUB_BUCKET_BITS - 1)
+# linear sub-buckets, so any recorded value is known to within 1 / 2^(SUB_BUCKET_BITS - 1) (about 6%)
+SUB_BUCKET_BITS = 5
+MAX_TRACKED_NS = 1 << 40  # ~18 minutes, longer values land in the last bucket
+# Bucket boundaries exported to Prometheus (seconds)
+EXPORT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger()
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+def _bucket_index(value_ns: int) -> int:
+    shift = value_ns.bit_length() - SUB_BUCKET_BITS
+    if shift <= 0:
+        return value_ns
+    return (shift << (SUB_BUCKET_BITS - 1)) + (value_ns >> shift)
+
+
+def _bucket_lower_bound(index: int) -> int:
+    if index < 1 << SUB_BUCKET_BITS:
+        return index
+    shift = (index >> (SUB_BUCKET_BITS - 1)) - 1
+    return (index - (shift << (SUB_BUCKET_BITS - 1))) << shift
+
+
+BUCKET_COUNT = _bucket_index(MAX_TRACKED_NS - 1) + 1
+
+
+class Counter:
+    """Monotonic counter."""
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+class Histogram:
+    """
+    Latency histogram with HDR-style log-linear buckets over nanoseconds.
+
+    Recording is one integer bucket increment, cheap enough for the control paths; quantiles
+    and the Prometheus buckets are only computed when read.
+    """
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.sum_ns = 0
+
+    def record_ns(self, value_ns: int) -> None:
+        if value_ns < 0:
+            value_ns = 0
+        elif value_ns >= MAX_TRACKED_NS:
+            value_ns = MAX_TRACKED_NS - 1
+        self.counts[_bucket_index(value_ns)] += 1
+        self.count += 1
+        self.sum_ns += value_ns
+
+    def record(self, seconds: float) -> None:
+        self.record_ns(int(seconds * 1e9))
+
+    def time(self) -> "_Timer":
+        """Context manager recording the duration of its block."""
+        return _Timer(self)
+
+    def quantile(self, q: float) -> float:
+        """Value in seconds below which a fraction `q` of the samples fall (lower bound of its bucket)."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return _bucket_lower_bound(index) / 1e9
+        return _bucket_lower_bound(BUCKET_COUNT - 1) / 1e9
+
+    def cumulative_counts(self, bounds: Tuple[float, ...] = EXPORT_BUCKETS) -> List[int]:
+        """Number of samples at or below each bound (seconds), as Prometheus `le` buckets."""
+        limits = [_bucket_index(min(int(bound * 1e9), MAX_TRACKED_NS - 1)) for bound in bounds]
+        cumulative = []
+        seen = 0
+        index = 0
+        for limit in limits:
+            while index <= limit:
+                seen += self.counts[index]
+                index += 1
+            cumulative.append(seen)
+        return cumulative
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.record_ns(time.perf_counter_ns() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    """Named counters and histograms, rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        # name -> (kind, help, {label set: metric})
+        self.families: Dict[str, Tuple[str, str, Dict[LabelSet, object]]] = {}
+
+    def _get(self, kind: str, factory, name: str, help: str, labels: Dict[str, str]):
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = (kind, help, {})
+        elif family[0] != kind:
+            raise ValueError(f"Metric {name} is already registered as a {family[0]}")
+        key = tuple(sorted(labels.items()))
+        metric = family[2].get(key)
+        if metric is None:
+            metric = family[2][key] = factory()
+        return metric
+
+    def counter(self, name: str, help: str, **labels: str) -> Counter:
+        """Counter `name` with these labels, created on first use. Keep the result instead of looking it up per sample."""
+        return self._get("counter", Counter, name, help, labels)
+
+    def histogram(self, name: str, help: str, **labels: str) -> Histogram:
+        """Latency histogram `name` (seconds) with these labels, created on first use."""
+        return self._get("histogram", Histogram, name, help, labels)
+
+    def render(self) -> str:
+        lines = []
+        for name, (kind, help, metrics) in sorted(self.families.items()):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in metrics.items():
+                if kind == "counter":
+                    lines.append(f"{name}{_format_labels(labels)} {metric.value}")
+                    continue
+                for bound, count in zip(EXPORT_BUCKETS, metric.cumulative_counts()):
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {metric.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {metric.sum_ns / 1e9}")
+                lines.append(f"{name}_count{_format_labels(labels)} {metric.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: LabelSet) -> str:
+    if not labels:
+        return ""
+    escaped = (key + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"' for key, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+# Shared registry of the application
+REGISTRY = MetricsRegistry()
+
+
+class MetricsServer:
+    """Minimal HTTP server answering GET /metrics with the registry, on the application's event loop."""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = DEFAULT_METRICS_HOST, port: int = DEFAULT_METRICS_PORT):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logger.info("Metrics served on http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await reader.readline()
+            # Skip the headers, the request has no body
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request.split()
+            if len(parts) >= 2 and parts[0] == b"GET" and parts[1].split(b"?")[0] == b"/metrics":
+                status, content_type, body = "200 OK", "text/plain; version=0.0.4", self.registry.render().encode()
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", b"Not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
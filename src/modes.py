@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+MODE_STOP_TIMEOUT_S = 1.0  # longest wait for a cancelled mode to stop the drone before moving on
+
+logger = logging.getLogger()
+
+
+class ModeSupervisor:
+    """
+    Run one flight mode (follow, manual...) at a time as a background task, so the console keeps
+    accepting commands while it runs. Starting a mode cancels the current one first.
+    """
+
+    def __init__(self, stop_timeout: float = MODE_STOP_TIMEOUT_S):
+        self.stop_timeout = stop_timeout
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def current(self) -> Optional[str]:
+        """Name of the running mode, None when idle."""
+        if self.task is None or self.task.done():
+            return None
+        return self.task.get_name()
+
+    async def start(self, name: str, mode: Callable[[], Awaitable[None]]) -> None:
+        """Stop the current mode and run `mode()` in the background under `name`."""
+        await self.stop()
+        self.task = asyncio.create_task(mode(), name=name)
+        self.task.add_done_callback(self._on_done)
+        logger.info("Mode %s started", name)
+
+    async def stop(self) -> None:
+        """
+        Cancel the current mode. The modes stop the drone when cancelled: wait for that, but no
+        longer than `stop_timeout` so that a stuck link cannot hold the console.
+        """
+        task = self.task
+        if task is None or task.done():
+            return
+        task.cancel()
+        done, _ = await asyncio.wait({task}, timeout=self.stop_timeout)
+        if not done:
+            logger.warning("Mode %s did not stop within %.1fs, leaving it to finish in the background", task.get_name(), self.stop_timeout)
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            logger.info("Mode %s cancelled", task.get_name())
+        elif task.exception() is not None:
+            logger.error("Mode %s failed: %s", task.get_name(), task.exception())
+        else:
+            logger.info("Mode %s ended", task.get_name())
+
+
+class CommandDispatcher:
+    """
+    Execute the commands of every source (console, control API clients) one at a time, in arrival
+    order, so that they cannot race each other.
+    """
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._run(), name="dispatcher")
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def submit(self, action: Callable[[], Awaitable[Any]]) -> Any:
+        """Queue `action()` and return its result once executed (its exception is raised here)."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((action, future))
+        return await future
+
+    async def _run(self) -> None:
+        while True:
+            action, future = await self.queue.get()
+            if future.cancelled():
+                continue  # the submitter gave up waiting
+            try:
+                result = await action()
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Optional, Tuple
+
+from log_pipeline import PER_TICK
+from metrics import REGISTRY
+
+DEFAULT_PCMD_RATE_HZ = 30.0  # Rate at which the newest stick state is sent to the drone
+
+logger = logging.getLogger()
+
+STICK_TO_PCMD_TIME = REGISTRY.histogram("drone_joystick_to_pcmd_seconds", "Time from a stick update to the end of its PCMD send")
+PCMDS_DROPPED = REGISTRY.counter("drone_pcmd_pump_dropped_total", "Stick setpoints overwritten before they could be sent")
+PCMD_FAILURES = REGISTRY.counter("drone_pcmd_pump_failures_total", "PCMD sends that raised")
+
+
+class PcmdPump:
+    """
+    Fixed-rate, latest-value-wins sender for roll/pitch/yaw/gaz commands.
+
+    Producers (joystick callbacks, possibly on another thread) only overwrite the current
+    setpoint with `update`. The pump wakes up at `rate_hz`, and if the setpoint changed
+    since the last tick it sends the newest tuple and waits for the ack before the next one.
+    Intermediate values are dropped, so at most one command is ever waiting to be sent.
+    """
+
+    def __init__(self, commander, rate_hz: float = DEFAULT_PCMD_RATE_HZ):
+        self.commander = commander
+        self.period = 1.0 / rate_hz
+        # (setpoint, update time) stored as one tuple so a reader never sees a torn pair
+        self._pending: Optional[Tuple[Tuple[int, int, int, int], float]] = None
+        # update() runs on the joystick thread: a setpoint written between the pump's read and
+        # clear of _pending would be lost, such as the zero setpoint of a released stick
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Future] = None
+
+        # Metrics
+        self.updates = 0  # setpoints received
+        self.sent = 0  # commands sent to the drone
+        self.dropped = 0  # setpoints overwritten before they could be sent
+        self.failures = 0  # commands that raised
+        self.last_send_lag = 0.0  # seconds between the stick update and the end of its send
+        self.max_send_lag = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of setpoints waiting to be sent (0 or 1 by construction)."""
+        return 0 if self._pending is None else 1
+
+    def update(self, roll: int, pitch: int, yaw: int, gaz: int) -> None:
+        """Replace the setpoint to send on the next tick. Safe to call from any thread."""
+        with self._lock:
+            if self._pending is not None:
+                self.dropped += 1
+                PCMDS_DROPPED.inc()
+            self.updates += 1
+            self._pending = ((roll, pitch, yaw, gaz), time.monotonic())
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """
+        Start pumping. Without `loop`, the pump runs as a task of the running event loop;
+        with `loop`, it is scheduled on that (background) loop from any thread.
+        """
+        if self._task is not None and not self._task.done():
+            return
+        if loop is None:
+            self._task = asyncio.ensure_future(self.run())
+        else:
+            self._task = asyncio.run_coroutine_threadsafe(self.run(), loop)
+
+    def stop(self) -> None:
+        """Stop pumping; a setpoint still pending is discarded."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        with self._lock:
+            self._pending = None
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            with self._lock:
+                pending, self._pending = self._pending, None
+            if pending is not None:
+                setpoint, updated_at = pending
+                try:
+                    await self.commander.set_pcmds(*setpoint)
+                    self.sent += 1
+                except Exception as e:
+                    self.failures += 1
+                    PCMD_FAILURES.inc()
+                    logger.error("PCMD pump failed to send %s: %s", setpoint, e, extra=PER_TICK)
+                self.last_send_lag = time.monotonic() - updated_at
+                STICK_TO_PCMD_TIME.record(self.last_send_lag)
+                self.max_send_lag = max(self.max_send_lag, self.last_send_lag)
+
+            deadline += self.period
+            delay = deadline - loop.time()
+            if delay < 0:
+                # The send took longer than a period: restart the schedule instead of bursting
+                deadline = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def metrics(self) -> dict:
+        """Snapshot of the pump counters and latencies."""
+        return {
+            "rate_hz": 1.0 / self.period,
+            "queue_depth": self.queue_depth,
+            "updates": self.updates,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "failures": self.failures,
+            "last_send_lag_s": self.last_send_lag,
+            "max_send_lag_s": self.max_send_lag,
+        }
@@ -0,0 +1,293 @@
+"""
+Session profiler: asyncio task tracing and a sampling profiler, for analysing a flight afterwards.
+
+- The trace (--trace) records every step of every asyncio task (the time a coroutine runs before
+  awaiting again), task lifetimes, the event loop scheduling delay and the blocking callbacks. It
+  is written in the Chrome trace event format: open it in https://ui.perfetto.dev or chrome://tracing.
+- The profiler (--profile) samples the Python stacks of every thread (event loop, Olympe, gRPC,
+  joystick...) and writes them collapsed, one line per stack, for flamegraph.pl or speedscope.
+"""
+import asyncio
+import collections
+import collections.abc
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from log_pipeline import PER_TICK
+
+DEFAULT_TRACE_FILE = "drone-coordination.trace.json"
+DEFAULT_PROFILE_FILE = "drone-coordination.folded"
+SAMPLE_INTERVAL_S = 0.005  # stack sampling period of the profiler
+LAG_PROBE_INTERVAL_S = 0.05  # period of the event loop scheduling delay probe
+SLOW_CALLBACK_S = 0.05  # task steps or loop stalls longer than this are reported as blocking
+MAX_TRACE_EVENTS = 2_000_000  # recording stops past this, to bound the memory of long sessions
+
+logger = logging.getLogger()
+
+
+class _TracedCoroutine(collections.abc.Coroutine):
+    """Coroutine wrapper timing each step the task runs it for."""
+
+    __slots__ = ("coro", "tracer", "task_id", "task")
+
+    def __init__(self, coro, tracer: "TaskTracer", task_id: int):
+        self.coro = coro
+        self.tracer = tracer
+        self.task_id = task_id
+        self.task: Optional[asyncio.Task] = None
+
+    def send(self, value):
+        return self._step(self.coro.send, value)
+
+    def throw(self, *args):
+        return self._step(self.coro.throw, *args)
+
+    def close(self):
+        return self.coro.close()
+
+    def __await__(self):
+        return self.coro.__await__()
+
+    # Introspection (task reprs, Task.print_stack) sees the wrapped coroutine
+
+    @property
+    def cr_frame(self):
+        return self.coro.cr_frame
+
+    @property
+    def cr_await(self):
+        return self.coro.cr_await
+
+    @property
+    def cr_running(self):
+        return self.coro.cr_running
+
+    @property
+    def cr_code(self):
+        return self.coro.cr_code
+
+    def __getattr__(self, name):
+        # __name__ and __qualname__ cannot be class attributes of a wrapper, they name the class
+        if name in ("__name__", "__qualname__"):
+            return getattr(self.coro, name)
+        raise AttributeError(name)
+
+    def _step(self, method, *args):
+        start = time.perf_counter_ns()
+        try:
+            result = method(*args)
+        except BaseException:
+            # StopIteration included: the coroutine is done. The step is recorded first, while
+            # the task (and its name) is still known
+            self.tracer.step(self, start, time.perf_counter_ns())
+            self.tracer.task_done(self)
+            raise
+        self.tracer.step(self, start, time.perf_counter_ns())
+        return result
+
+
+class TaskTracer:
+    """
+    Record the asyncio task activity of a loop through its task factory. Events are kept as
+    tuples and only converted to the trace format when written.
+    """
+
+    def __init__(self, slow_callback: float = SLOW_CALLBACK_S, max_events: int = MAX_TRACE_EVENTS):
+        self.slow_callback_ns = int(slow_callback * 1e9)
+        self.max_events = max_events
+        self.origin_ns = time.perf_counter_ns()
+        # (kind, timestamp ns, duration ns or value, task id, detail)
+        self.events: List[Tuple[str, int, float, int, str]] = []
+        self.task_names: Dict[int, str] = {}
+        self.dropped = 0
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread = 0
+        self._previous_factory = None
+        self._next_id = 0
+        self._probe: Optional[asyncio.Task] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.loop_thread = threading.get_ident()
+        # The probe is created before the factory is installed so it does not trace itself
+        self._probe = loop.create_task(self._probe_scheduling_delay())
+        self._previous_factory = loop.get_task_factory()
+        loop.set_task_factory(self._task_factory)
+
+    def stop(self) -> None:
+        if self.loop is None:
+            return
+        self.loop.set_task_factory(self._previous_factory)
+        self._probe.cancel()
+        self.loop = None
+
+    def _task_factory(self, loop, coro, **kwargs):
+        # Python 3.11+ passes `context=` and 3.13.3+ `name=` to the factory
+        task_id = self._next_id
+        self._next_id += 1
+        traced = _TracedCoroutine(coro, self, task_id)
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, traced, **kwargs)
+        else:
+            task = asyncio.Task(traced, loop=loop, **kwargs)
+        traced.task = task
+        self._record("b", time.perf_counter_ns(), 0, task_id, getattr(coro, "__qualname__", type(coro).__name__))
+        return task
+
+    def _record(self, kind: str, timestamp_ns: int, value: float, task_id: int, detail: str) -> None:
+        if len(self.events) >= self.max_events:
+            self.dropped += 1
+            return
+        self.events.append((kind, timestamp_ns, value, task_id, detail))
+
+    def step(self, traced: _TracedCoroutine, start_ns: int, end_ns: int) -> None:
+        duration_ns = end_ns - start_ns
+        self._record("X", start_ns, duration_ns, traced.task_id, "")
+        if duration_ns > self.slow_callback_ns:
+            name = traced.task.get_name() if traced.task is not None else str(traced.task_id)
+            self._record("i", start_ns, duration_ns, traced.task_id, "slow step")
+            logger.warning("Task %s blocked the event loop for %.0fms in one step", name, duration_ns / 1e6, extra=PER_TICK)
+
+    def task_done(self, traced: _TracedCoroutine) -> None:
+        if traced.task is not None:
+            self.task_names[traced.task_id] = traced.task.get_name()
+            traced.task = None  # break the task <-> wrapper cycle
+        self._record("e", time.perf_counter_ns(), 0, traced.task_id, "")
+
+    async def _probe_scheduling_delay(self) -> None:
+        """Sleep periodically and measure how late the loop wakes up: any blocking callback, traced or not, shows up here."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LAG_PROBE_INTERVAL_S
+            await asyncio.sleep(LAG_PROBE_INTERVAL_S)
+            delay = loop.time() - expected
+            now = time.perf_counter_ns()
+            self._record("C", now, delay, -1, "")
+            if delay * 1e9 > self.slow_callback_ns:
+                self._record("i", now - int(delay * 1e9), delay * 1e9, -1, "loop stall")
+                logger.warning("Event loop stalled for %.0fms", delay * 1e3, extra=PER_TICK)
+
+    def chrome_trace(self) -> dict:
+        """The recorded events in the Chrome trace event format."""
+        pid = os.getpid()
+        tid = self.loop_thread
+        names = dict(self.task_names)
+        # Tasks still running when the trace is written
+        for task in asyncio.all_tasks(self.loop) if self.loop is not None else ():
+            coro = task.get_coro()
+            if isinstance(coro, _TracedCoroutine):
+                names.setdefault(coro.task_id, task.get_name())
+
+        def us(timestamp_ns: int) -> float:
+            return (timestamp_ns - self.origin_ns) / 1e3
+
+        trace = [
+            {"ph": "M", "name": "process_name", "pid": pid, "args": {"name": "drone-coordination"}},
+            {"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": "event loop"}},
+        ]
+        coroutines: Dict[int, str] = {}
+        for kind, timestamp, value, task_id, detail in self.events:
+            if kind == "b":
+                coroutines[task_id] = detail
+            name = names.get(task_id, "")
+            if not name or name.startswith("Task-"):
+                # Unnamed task, the coroutine says more than asyncio's default name
+                name = coroutines.get(task_id, f"Task-{task_id}")
+            if kind == "X":
+                trace.append({"ph": "X", "name": name, "cat": "step", "pid": pid, "tid": tid, "ts": us(timestamp), "dur": value / 1e3})
+            elif kind == "b":
+                trace.append({"ph": "b", "name": name, "cat": "task", "id": task_id, "pid": pid, "tid": tid, "ts": us(timestamp), "args": {"coroutine": detail}})
+            elif kind == "e":
+                trace.append({"ph": "e", "name": name, "cat": "task", "id": task_id, "pid": pid, "tid": tid, "ts": us(timestamp)})
+            elif kind == "C":
+                trace.append({"ph": "C", "name": "scheduling delay (ms)", "pid": pid, "ts": us(timestamp), "args": {"delay": value * 1e3}})
+            else:
+                args = {"duration_ms": value / 1e6}
+                if task_id >= 0:
+                    args.update(task=name, coroutine=coroutines.get(task_id, ""))
+                trace.append({"ph": "i", "name": detail, "cat": "blocking", "s": "t", "pid": pid, "tid": tid, "ts": us(timestamp), "args": args})
+        return {"traceEvents": trace, "displayTimeUnit": "ms", "otherData": {"dropped_events": self.dropped}}
+
+
+class SamplingProfiler:
+    """Wall-clock sampling of the Python stacks of every thread, from a background thread."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL_S):
+        self.interval = interval
+        self.samples: collections.Counter = collections.Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                self.samples[(thread_names.get(ident, str(ident)), tuple(stack))] += 1
+            self.sample_count += 1
+
+    def collapsed_stacks(self) -> List[str]:
+        """One `thread;outer;...;inner count` line per distinct stack."""
+        labels = {}
+        lines = []
+        for (thread_name, stack), count in self.samples.items():
+            frames = [thread_name]
+            for code in reversed(stack):
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                frames.append(label)
+            lines.append(f"{';'.join(frames)} {count}")
+        return lines
+
+
+class SessionProfiler:
+    """Trace and/or profile the session running on the current event loop, written on stop."""
+
+    def __init__(self, trace_file: Optional[str] = None, profile_file: Optional[str] = None):
+        self.trace_file = trace_file
+        self.profile_file = profile_file
+        self.tracer = TaskTracer() if trace_file else None
+        self.profiler = SamplingProfiler() if profile_file else None
+
+    def start(self) -> None:
+        if self.tracer is not None:
+            self.tracer.start(asyncio.get_running_loop())
+        if self.profiler is not None:
+            self.profiler.start()
+
+    def stop(self) -> None:
+        if self.profiler is not None:
+            self.profiler.stop()
+            with open(self.profile_file, "w") as f:
+                f.write("\n".join(self.profiler.collapsed_stacks()) + "\n")
+            logger.info("Profile of %d samples written to %s", self.profiler.sample_count, self.profile_file)
+        if self.tracer is not None:
+            trace = self.tracer.chrome_trace()
+            self.tracer.stop()
+            with open(self.trace_file, "w") as f:
+                json.dump(trace, f)
+            logger.info("Trace of %d events written to %s", len(self.tracer.events), self.trace_file)
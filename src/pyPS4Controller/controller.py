@@ -1,7 +1,105 @@
+import asyncio
+import collections
+import inspect
 import os
 import struct
 import time
 
+from pyPS4Controller.sequence_matcher import SequenceMatcher
+
+MAX_BATCH_EVENTS = 64  # events decoded per read() syscall at most
+EVENT_HISTORY_SIZE = 256  # most recent history tokens kept in Controller.event_history
+JS_EVENT_AXIS = 0x02
+
+# Value classes used to key the dispatch table: the mapping predicates only ever look at the sign of the
+# value, at the extreme axis values (triggers and arrows report exactly -32767 / 32767) or, for buttons,
+# at a value of exactly 1 (pressed). The kernel can also report -32768, which the mappings match
+# differently from -32767, so it has a class of its own
+AXIS_MIN = -32767
+AXIS_MAX = 32767
+VALUE_CLASS_REPRESENTATIVES = {-3: AXIS_MIN - 1, -2: AXIS_MIN, -1: -1, 0: 0, 1: 1, 2: 2, 3: AXIS_MAX}
+CHECKED_VALUES = (AXIS_MIN - 1, AXIS_MIN, -1, 0, 1, 2, AXIS_MAX)  # see Controller.dispatch_table_mismatches
+
+# Event mapping predicates in evaluation order, compiled into the dispatch table.
+# Joystick groups: (group predicate, history token, ((predicate, action, action takes value), ...))
+JOYSTICK_RULES = (
+    (
+        "R3_event",
+        "right_joystick",
+        (
+            ("R3_y_at_rest", "on_R3_y_at_rest", False),
+            ("R3_x_at_rest", "on_R3_x_at_rest", False),
+            ("R3_right", "on_R3_right", True),
+            ("R3_left", "on_R3_left", True),
+            ("R3_up", "on_R3_up", True),
+            ("R3_down", "on_R3_down", True),
+        ),
+    ),
+    (
+        "L3_event",
+        "left_joystick",
+        (
+            ("L3_y_at_rest", "on_L3_y_at_rest", False),
+            ("L3_x_at_rest", "on_L3_x_at_rest", False),
+            ("L3_up", "on_L3_up", True),
+            ("L3_down", "on_L3_down", True),
+            ("L3_left", "on_L3_left", True),
+            ("L3_right", "on_L3_right", True),
+        ),
+    ),
+)
+# Buttons: (predicate, history token or None, action, action takes value)
+BUTTON_RULES = (
+    ("circle_pressed", "circle", "on_circle_press", False),
+    ("circle_released", None, "on_circle_release", False),
+    ("x_pressed", "x", "on_x_press", False),
+    ("x_released", None, "on_x_release", False),
+    ("triangle_pressed", "triangle", "on_triangle_press", False),
+    ("triangle_released", None, "on_triangle_release", False),
+    ("square_pressed", "square", "on_square_press", False),
+    ("square_released", None, "on_square_release", False),
+    ("L1_pressed", "L1", "on_L1_press", False),
+    ("L1_released", None, "on_L1_release", False),
+    ("L2_pressed", "L2", "on_L2_press", True),
+    ("L2_released", None, "on_L2_release", False),
+    ("R1_pressed", "R1", "on_R1_press", False),
+    ("R1_released", None, "on_R1_release", False),
+    ("R2_pressed", "R2", "on_R2_press", True),
+    ("R2_released", None, "on_R2_release", False),
+    ("options_pressed", "options", "on_options_press", False),
+    ("options_released", None, "on_options_release", False),
+    ("left_right_arrow_released", None, "on_left_right_arrow_release", False),
+    ("up_down_arrow_released", None, "on_up_down_arrow_release", False),
+    ("left_arrow_pressed", "left", "on_left_arrow_press", False),
+    ("right_arrow_pressed", "right", "on_right_arrow_press", False),
+    ("up_arrow_pressed", "up", "on_up_arrow_press", False),
+    ("down_arrow_pressed", "down", "on_down_arrow_press", False),
+    ("playstation_button_pressed", "ps", "on_playstation_button_press", False),
+    ("playstation_button_released", None, "on_playstation_button_release", False),
+    ("share_pressed", "share", "on_share_press", False),
+    ("share_released", None, "on_share_release", False),
+    ("R3_pressed", "R3", "on_R3_press", False),
+    ("R3_released", None, "on_R3_release", False),
+    ("L3_pressed", "L3", "on_L3_press", False),
+    ("L3_released", None, "on_L3_release", False),
+)
+PRECOMPILED_BUTTON_IDS = range(16)  # other ids are compiled on first use
+
+
+def value_class(value):
+    """Dispatch key of an event value, see VALUE_CLASS_REPRESENTATIVES."""
+    if value == 0:
+        return 0
+    if value == 1:
+        return 1
+    if value < AXIS_MIN:
+        return -3
+    if value == AXIS_MIN:
+        return -2
+    if value >= AXIS_MAX:
+        return 3
+    return 2 if value > 0 else -1
+
 
 class Actions:
     """
@@ -165,6 +263,7 @@ class Controller(Actions):
         connecting_using_ds4drv=True,
         event_definition=None,
         event_format=None,
+        collapse_axis_events=False,
     ):
         """
         Initiate controller instance that is capable of listening to all events on specified input interface
@@ -174,6 +273,9 @@ class Controller(Actions):
                                                  to True. Otherwise if you are connecting directly via directly via
                                                  bluetooth/bluetoothctl, set it to False otherwise the controller
                                                  button mapping will be off.
+        :param collapse_axis_events: BOOLEAN. If True, consecutive events of the same axis and value class read in
+                                              one batch are collapsed to the latest one (only the newest stick
+                                              position matters; arrow and trigger presses are kept).
         """
         Actions.__init__(self)
         self.stop = False
@@ -201,7 +303,16 @@ class Controller(Actions):
             self.event_definition = event_definition
 
         self.event_size = struct.calcsize(self.event_format)
-        self.event_history = []
+        self.event_struct = struct.Struct(self.event_format)
+        self.collapse_axis_events = collapse_axis_events
+        # reusable read buffer: a whole batch of events is read with a single syscall and decoded in place
+        self.read_buffer = bytearray(self.event_size * MAX_BATCH_EVENTS)
+        self.read_view = memoryview(self.read_buffer)
+        self.read_buffer_fill = 0  # bytes of an incomplete event left over from the previous read
+        self.event_history = collections.deque(maxlen=EVENT_HISTORY_SIZE)
+        self._callback_tasks = set()  # coroutine callbacks still running, see _dispatch
+        self.dispatch_table = {}
+        self.compile_dispatch_table()
 
     def listen(self, timeout=30, on_connect=None, on_disconnect=None, on_sequence=None):
         """
@@ -245,169 +356,264 @@ class Controller(Actions):
 
         def read_events():
             try:
-                return _file.read(self.event_size)
+                return self._read_batch(_fd)
             except IOError:
                 print("Interface lost. Device disconnected?")
                 on_disconnect_callback()
                 exit(1)
 
-        def check_for(sub, full, start_index):
-            return [
-                start
-                for start in range(start_index, len(full) - len(sub) + 1)
-                if sub == full[start : start + len(sub)]
-            ]
-
-        def unpack():
-            __event = struct.unpack(self.event_format, event)
-            return (__event[3:], __event[2], __event[1], __event[0])
-
         wait_for_interface()
         try:
-            _file = open(self.interface, "rb")
-            event = read_events()
-            if on_sequence is None:
-                on_sequence = []
-            special_inputs_indexes = [0] * len(on_sequence)
-            while not self.stop and event:
-                (overflow, value, button_type, button_id) = unpack()
-                if button_id not in self.black_listed_buttons:
-                    self.__handle_event(
-                        button_id=button_id,
-                        button_type=button_type,
-                        value=value,
-                        overflow=overflow,
-                        debug=self.debug,
-                    )
-                for i, special_input in enumerate(on_sequence):
-                    check = check_for(
-                        special_input["inputs"],
-                        self.event_history,
-                        special_inputs_indexes[i],
-                    )
-                    if len(check) != 0:
-                        special_inputs_indexes[i] = check[0] + 1
-                        special_input["callback"]()
-                event = read_events()
+            _fd = os.open(self.interface, os.O_RDONLY)
+            batch = read_events()
+            sequence_matcher = SequenceMatcher(on_sequence or [])
+            while not self.stop and batch is not None:
+                self.__process_batch(batch, sequence_matcher)
+                batch = read_events()
         except KeyboardInterrupt:
             on_disconnect_callback()
 
-    def __handle_event(self, button_id, button_type, value, overflow, debug):
+    async def events(self, timeout=30, on_connect=None, on_disconnect=None):
+        """
+        Asynchronously iterate over raw events of self.interface, without blocking the event loop.
+        usage: async for (overflow, value, button_type, button_id) in controller.events(): ...
+        :param timeout: see event_batches()
+        :param on_connect: see event_batches()
+        :param on_disconnect: see event_batches()
+        :return: async generator of (overflow, value, button_type, button_id) tuples
+        """
+        async for batch in self.event_batches(timeout=timeout, on_connect=on_connect, on_disconnect=on_disconnect):
+            for event in batch:
+                yield event
+
+    async def event_batches(self, timeout=30, on_connect=None, on_disconnect=None):
+        """
+        Asynchronously iterate over batches of raw events of self.interface, without blocking the event loop:
+        the device file is opened in non-blocking mode and registered with the running loop, and everything
+        available is drained with one read per readiness notification.
+        :param timeout: INT, seconds. How long you want to wait for the self.interface.
+                        If self.interface does not become available in N seconds, the iteration stops.
+        :param on_connect: function object, allows to register a call back when connection is established
+        :param on_disconnect: function object, allows to register a call back when connection is lost
+        :return: async generator of lists of (overflow, value, button_type, button_id) tuples
+        """
+        print("Waiting for interface: {} to become available . . .".format(self.interface))
+        for i in range(timeout):
+            if os.path.exists(self.interface):
+                break
+            await asyncio.sleep(1)
+        else:
+            print("Timeout({} sec). Interface not available.".format(timeout))
+            return
+        print("Successfully bound to: {}.".format(self.interface))
+        self.is_connected = True
+        if on_connect is not None:
+            self._dispatch(on_connect)
+
+        loop = asyncio.get_running_loop()
+        fd = os.open(self.interface, os.O_RDONLY | os.O_NONBLOCK)
+        readable = asyncio.Event()
+        loop.add_reader(fd, readable.set)
+        try:
+            while not self.stop:
+                await readable.wait()
+                readable.clear()
+                while not self.stop:
+                    try:
+                        batch = self._read_batch(fd)
+                    except BlockingIOError:
+                        break  # drained, wait for the next readiness notification
+                    except OSError:
+                        batch = None
+                    if batch is None:
+                        print("Interface lost. Device disconnected?")
+                        self.is_connected = False
+                        if on_disconnect is not None:
+                            self._dispatch(on_disconnect)
+                        return
+                    if batch:
+                        yield batch
+        finally:
+            loop.remove_reader(fd)
+            os.close(fd)
+
+    async def listen_async(self, timeout=30, on_connect=None, on_disconnect=None, on_sequence=None):
+        """
+        Same as listen() but runs on the asyncio event loop instead of blocking it.
+        Any callback (on_* actions, on_connect, on_disconnect, sequence callbacks) may be a plain function
+        or return a coroutine, which is then scheduled as a task on the running loop.
+        :return: None
+        """
+        sequence_matcher = SequenceMatcher(on_sequence or [])
+        async for batch in self.event_batches(timeout=timeout, on_connect=on_connect, on_disconnect=on_disconnect):
+            self.__process_batch(batch, sequence_matcher)
+
+    def _read_batch(self, fd):
+        """
+        Read every event available on fd (up to MAX_BATCH_EVENTS) with a single syscall into the reusable
+        buffer, and decode the complete ones in place.
+        :return: list of (overflow, value, button_type, button_id) tuples, None at end of file
+        """
+        fill = self.read_buffer_fill
+        read = os.readv(fd, [self.read_view[fill:]])
+        if read == 0:
+            return None
+        end = fill + read
+        complete = end - end % self.event_size
+        batch = [
+            (raw[3:], raw[2], raw[1], raw[0])
+            for raw in self.event_struct.iter_unpack(self.read_view[:complete])
+        ]
+        # keep a trailing partial event for the next read
+        self.read_buffer_fill = end - complete
+        if self.read_buffer_fill:
+            self.read_buffer[: self.read_buffer_fill] = self.read_buffer[complete:end]
+        return batch
+
+    @staticmethod
+    def _event_fields(overflow, value, button_type, button_id):
+        """(button_type, button_id, value) of a raw event, as seen by the event mapping."""
+        if len(overflow) == 3:  # 3Bh2b layout: the real (value, type, id) are in the overflow
+            return overflow[1], overflow[2], overflow[0]
+        return button_type, button_id, value
+
+    def _axis_key(self, event):
+        """(axis number, value class) of a raw event, or None if it is not an axis event."""
+        button_type, button_id, value = self._event_fields(*event)
+        return (button_id, value_class(value)) if button_type == JS_EVENT_AXIS else None
+
+    def _collapse_axis_events(self, batch):
+        """
+        Drop axis events immediately followed by another event of the same axis and value class. Such
+        events reach the same action, so only the latest value matters; a press and its release on the
+        arrows or triggers are in different classes and are both kept.
+        """
+        collapsed = []
+        previous_key = None
+        for event in batch:
+            key = self._axis_key(event)
+            if key is not None and key == previous_key:
+                collapsed[-1] = event
+            else:
+                collapsed.append(event)
+            previous_key = key
+        return collapsed
+
+    def __process_batch(self, batch, sequence_matcher):
+        if self.collapse_axis_events and len(batch) > 1:
+            batch = self._collapse_axis_events(batch)
+        for event in batch:
+            self.__process_event(event, sequence_matcher)
+
+    def _dispatch(self, callback, *args):
+        """
+        Call an event callback. When it returns an awaitable, run it as a task of the running loop
+        (or to completion when no loop is running, e.g. from the blocking listen()).
+        """
+        result = callback(*args)
+        if inspect.isawaitable(result):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                asyncio.run(result)
+                return
+            task = asyncio.ensure_future(result)
+            self._callback_tasks.add(task)
+            task.add_done_callback(self._callback_tasks.discard)
+
+    def __process_event(self, event, sequence_matcher):
+        (overflow, value, button_type, button_id) = event
+        if button_id in self.black_listed_buttons:
+            return
+        token = self.__handle_event(
+            button_id=button_id,
+            button_type=button_type,
+            value=value,
+            overflow=overflow,
+            debug=self.debug,
+        )
+        if token is not None:
+            for callback in sequence_matcher.feed(token):
+                self._dispatch(callback)
+
+    def compile_dispatch_table(self):
+        """
+        Compile self.event_definition into the dispatch table, keyed by (button_type, button_id, value class).
+        Every mapping predicate is evaluated once per key here instead of once per event; keys that are not
+        precompiled (unusual ids) are compiled on first use. Call again after replacing an on_* action.
+        """
+        self.dispatch_table.clear()
+        for button_type in (1, JS_EVENT_AXIS):
+            for button_id in PRECOMPILED_BUTTON_IDS:
+                for value_key in VALUE_CLASS_REPRESENTATIVES:
+                    key = (button_type, button_id, value_key)
+                    self.dispatch_table[key] = self._compile_event(*key)
+
+    def dispatch_table_mismatches(self, values=CHECKED_VALUES):
+        """
+        Compare the dispatch table with the mapping predicates run on the actual values, for every
+        precompiled button and axis id.
+        :return: list of ((button_type, button_id, value), table entry, mapping entry) that disagree
+        """
+        mismatches = []
+        for button_type in (1, JS_EVENT_AXIS):
+            for button_id in PRECOMPILED_BUTTON_IDS:
+                for value in values:
+                    key = (button_type, button_id, value_class(value))
+                    entry = self.dispatch_table.get(key) or self._compile_event(*key)
+                    expected = self._evaluate_mapping(button_type, button_id, value)
+                    if entry != expected:
+                        mismatches.append(((button_type, button_id, value), entry, expected))
+        return mismatches
+
+    def _compile_event(self, button_type, button_id, value_key):
+        """
+        Run the mapping predicates on a representative event of the key.
+        :return: (bound action or None, history token or None, BOOLEAN action takes the event value)
+        """
+        return self._evaluate_mapping(button_type, button_id, VALUE_CLASS_REPRESENTATIVES[value_key])
+
+    def _evaluate_mapping(self, button_type, button_id, value):
         event = self.event_definition(
             button_id=button_id,
             button_type=button_type,
             value=value,
             connecting_using_ds4drv=self.connecting_using_ds4drv,
-            overflow=overflow,
-            debug=debug,
+            overflow=(value, button_type, button_id),
         )
+        for group_predicate, token, rules in JOYSTICK_RULES:
+            if getattr(event, group_predicate)():
+                for predicate, action, with_value in rules:
+                    if getattr(event, predicate)():
+                        return getattr(self, action), token, with_value
+                return None, token, False
+        for predicate, token, action, with_value in BUTTON_RULES:
+            if getattr(event, predicate)():
+                return getattr(self, action), token, with_value
+        return None, None, False
 
-        if event.R3_event():
-            self.event_history.append("right_joystick")
-            if event.R3_y_at_rest():
-                self.on_R3_y_at_rest()
-            elif event.R3_x_at_rest():
-                self.on_R3_x_at_rest()
-            elif event.R3_right():
-                self.on_R3_right(event.value)
-            elif event.R3_left():
-                self.on_R3_left(event.value)
-            elif event.R3_up():
-                self.on_R3_up(event.value)
-            elif event.R3_down():
-                self.on_R3_down(event.value)
-        elif event.L3_event():
-            self.event_history.append("left_joystick")
-            if event.L3_y_at_rest():
-                self.on_L3_y_at_rest()
-            elif event.L3_x_at_rest():
-                self.on_L3_x_at_rest()
-            elif event.L3_up():
-                self.on_L3_up(event.value)
-            elif event.L3_down():
-                self.on_L3_down(event.value)
-            elif event.L3_left():
-                self.on_L3_left(event.value)
-            elif event.L3_right():
-                self.on_L3_right(event.value)
-        elif event.circle_pressed():
-            self.event_history.append("circle")
-            self.on_circle_press()
-        elif event.circle_released():
-            self.on_circle_release()
-        elif event.x_pressed():
-            self.event_history.append("x")
-            self.on_x_press()
-        elif event.x_released():
-            self.on_x_release()
-        elif event.triangle_pressed():
-            self.event_history.append("triangle")
-            self.on_triangle_press()
-        elif event.triangle_released():
-            self.on_triangle_release()
-        elif event.square_pressed():
-            self.event_history.append("square")
-            self.on_square_press()
-        elif event.square_released():
-            self.on_square_release()
-        elif event.L1_pressed():
-            self.event_history.append("L1")
-            self.on_L1_press()
-        elif event.L1_released():
-            self.on_L1_release()
-        elif event.L2_pressed():
-            self.event_history.append("L2")
-            self.on_L2_press(event.value)
-        elif event.L2_released():
-            self.on_L2_release()
-        elif event.R1_pressed():
-            self.event_history.append("R1")
-            self.on_R1_press()
-        elif event.R1_released():
-            self.on_R1_release()
-        elif event.R2_pressed():
-            self.event_history.append("R2")
-            self.on_R2_press(event.value)
-        elif event.R2_released():
-            self.on_R2_release()
-        elif event.options_pressed():
-            self.event_history.append("options")
-            self.on_options_press()
-        elif event.options_released():
-            self.on_options_release()
-        elif event.left_right_arrow_released():
-            self.on_left_right_arrow_release()
-        elif event.up_down_arrow_released():
-            self.on_up_down_arrow_release()
-        elif event.left_arrow_pressed():
-            self.event_history.append("left")
-            self.on_left_arrow_press()
-        elif event.right_arrow_pressed():
-            self.event_history.append("right")
-            self.on_right_arrow_press()
-        elif event.up_arrow_pressed():
-            self.event_history.append("up")
-            self.on_up_arrow_press()
-        elif event.down_arrow_pressed():
-            self.event_history.append("down")
-            self.on_down_arrow_press()
-        elif event.playstation_button_pressed():
-            self.event_history.append("ps")
-            self.on_playstation_button_press()
-        elif event.playstation_button_released():
-            self.on_playstation_button_release()
-        elif event.share_pressed():
-            self.event_history.append("share")
-            self.on_share_press()
-        elif event.share_released():
-            self.on_share_release()
-        elif event.R3_pressed():
-            self.event_history.append("R3")
-            self.on_R3_press()
-        elif event.R3_released():
-            self.on_R3_release()
-        elif event.L3_pressed():
-            self.event_history.append("L3")
-            self.on_L3_press()
-        elif event.L3_released():
-            self.on_L3_release()
+    def __handle_event(self, button_id, button_type, value, overflow, debug):
+        if debug:
+            # the mapping prints the raw event
+            self.event_definition(
+                button_id=button_id,
+                button_type=button_type,
+                value=value,
+                connecting_using_ds4drv=self.connecting_using_ds4drv,
+                overflow=overflow,
+                debug=debug,
+            )
+        button_type, button_id, value = self._event_fields(overflow, value, button_type, button_id)
+        key = (button_type, button_id, value_class(value))
+        entry = self.dispatch_table.get(key)
+        if entry is None:
+            entry = self.dispatch_table[key] = self._compile_event(*key)
+        action, token, with_value = entry
+        if token is not None:
+            self.event_history.append(token)
+        if action is not None:
+            if with_value:
+                self._dispatch(action, value)
+            else:
+                self._dispatch(action)
+        return token
@@ -0,0 +1,65 @@
+import collections
+
+
+class SequenceMatcher:
+    """
+    Incremental multi-pattern matcher (Aho-Corasick automaton) for input sequences.
+
+    All the registered sequences are compiled once into a deterministic automaton over the
+    history tokens ("x", "up", "left_joystick", ...). Feeding a token is a single dict lookup,
+    whatever the number or the length of the registered sequences, and every occurrence of a
+    sequence (overlapping ones included) is reported as soon as its last input arrives.
+    """
+
+    def __init__(self, sequences):
+        """
+        :param sequences: list, same format as the on_sequence argument of Controller.listen:
+                          [{"inputs": ['up', 'up', 'down'], "callback": () -> None}, ...]
+        """
+        self.state = 0
+        goto = [{}]
+        outputs = [[]]
+        for sequence in sequences:
+            state = 0
+            for token in sequence["inputs"]:
+                if token not in goto[state]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][token] = len(goto) - 1
+                state = goto[state][token]
+            if state != 0:  # an empty sequence never matches
+                outputs[state].append(sequence["callback"])
+
+        # breadth-first construction of the failure links, folded into a complete transition table
+        alphabet = {token for edges in goto for token in edges}
+        fail = [0] * len(goto)
+        self.transitions = [dict() for _ in goto]
+        queue = collections.deque()
+        for token in alphabet:
+            target = goto[0].get(token, 0)
+            self.transitions[0][token] = target
+            if target:
+                queue.append(target)
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for token in alphabet:
+                target = goto[state].get(token)
+                if target is None:
+                    self.transitions[state][token] = self.transitions[fail[state]][token]
+                else:
+                    fail[target] = self.transitions[fail[state]][token]
+                    self.transitions[state][token] = target
+                    queue.append(target)
+        self.outputs = outputs
+
+    def feed(self, token):
+        """
+        Advance the automaton by one history token.
+        :return: list of the callbacks of every sequence ending with this token (usually empty)
+        """
+        self.state = self.transitions[self.state].get(token, 0)
+        return self.outputs[self.state]
+
+    def reset(self):
+        self.state = 0
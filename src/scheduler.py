@@ -0,0 +1,103 @@
+import asyncio
+from typing import Optional
+
+# Adaptive follow rate
+CRUISE_RATE_HZ = 1.0  # Rate when the geometry is quiet
+FAST_RATE_HZ = 20.0  # Rate when separation changes fast or the drones are close
+FAST_SEPARATION_RATE = 3.0  # m/s of separation change at which the fast rate is reached
+NEAR_MARGIN_M = 3.0  # Distance above min_dist under which the fast rate is used
+
+
+class PeriodicScheduler:
+    """
+    Drift-free periodic timer on the event loop clock.
+
+    Each tick targets an absolute deadline (start + n * period), so the time spent doing
+    the work does not add up to the period. Lateness of every wake-up (jitter) is measured,
+    and deadlines the work overran are counted as missed and skipped rather than bursted.
+    """
+
+    def __init__(self, rate_hz: float, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.period = 1.0 / rate_hz
+        self._loop = loop
+        self._deadline: Optional[float] = None  # deadline of the last tick
+
+        # Metrics
+        self.ticks = 0
+        self.missed_deadlines = 0
+        self.last_jitter = 0.0  # seconds between the deadline and the actual wake-up
+        self.max_jitter = 0.0
+        self._jitter_sum = 0.0
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        return self._loop
+
+    @property
+    def rate_hz(self) -> float:
+        return 1.0 / self.period
+
+    def set_rate(self, rate_hz: float) -> None:
+        """Change the rate; the new period applies from the last deadline."""
+        self.period = 1.0 / rate_hz
+
+    def reset(self) -> None:
+        """Restart the schedule from now (e.g. after a deliberate pause), without counting missed deadlines."""
+        self._deadline = None
+
+    async def wait_next(self) -> None:
+        """Sleep until the next deadline."""
+        now = self.loop.time()
+        if self._deadline is None:
+            self._deadline = now
+        self._deadline += self.period
+        if now > self._deadline:
+            # The work overran one or more periods: skip them, staying on the original phase
+            skipped = int((now - self._deadline) // self.period) + 1
+            self.missed_deadlines += skipped
+            self._deadline += skipped * self.period
+        await asyncio.sleep(self._deadline - now)
+
+        jitter = self.loop.time() - self._deadline
+        self.ticks += 1
+        self.last_jitter = jitter
+        self.max_jitter = max(self.max_jitter, jitter)
+        self._jitter_sum += jitter
+
+    def metrics(self) -> dict:
+        """Snapshot of the rate, tick, jitter and missed deadline counters."""
+        return {
+            "rate_hz": self.rate_hz,
+            "ticks": self.ticks,
+            "missed_deadlines": self.missed_deadlines,
+            "last_jitter_s": self.last_jitter,
+            "max_jitter_s": self.max_jitter,
+            "mean_jitter_s": self._jitter_sum / self.ticks if self.ticks else 0.0,
+        }
+
+
+def adaptive_follow_rate(
+    separation: float,
+    separation_rate: float,
+    min_dist: float,
+    cruise_rate: float = CRUISE_RATE_HZ,
+    fast_rate: float = FAST_RATE_HZ,
+) -> float:
+    """
+    Pick the follow loop rate from the current geometry.
+
+    Args:
+        separation: Current leader/follower separation (meters)
+        separation_rate: Rate of change of the separation (m/s)
+        min_dist: Minimum safe distance (meters)
+
+    Returns:
+        The fast rate near min_dist, otherwise a rate growing linearly with |separation_rate|
+        from the cruise rate up to the fast rate at FAST_SEPARATION_RATE
+    """
+    if separation < min_dist + NEAR_MARGIN_M:
+        return fast_rate
+    ratio = min(1.0, abs(separation_rate) / FAST_SEPARATION_RATE)
+    return cruise_rate + ratio * (fast_rate - cruise_rate)
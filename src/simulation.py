@@ -0,0 +1,77 @@
+import asyncio
+import math
+import selectors
+from typing import Any, Coroutine
+
+from commanders.sim_commander import Trajectory
+
+
+class VirtualTimeSelector(selectors.DefaultSelector):
+    """
+    Selector that never sleeps: when the event loop would wait for its next timer, the virtual
+    clock jumps to it instead. Real I/O (e.g. wake-ups from other threads) is still polled.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.now = 0.0
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if events:
+            return events
+        if timeout is None:
+            # Nothing scheduled: only another thread can wake the loop up
+            return super().select(None)
+        self.now += timeout
+        return []
+
+
+class VirtualClockEventLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop on a virtual clock, for faster-than-real-time simulations.
+
+    Timers fire in order and `loop.time()` advances exactly as on a real loop, but idle time
+    costs nothing: a simulated 10-minute flight only takes as long as its computations.
+    """
+
+    def __init__(self):
+        self._virtual_selector = VirtualTimeSelector()
+        super().__init__(selector=self._virtual_selector)
+
+    def time(self) -> float:
+        return self._virtual_selector.now
+
+
+def run_simulation(main: Coroutine[Any, Any, Any]) -> Any:
+    """Run a coroutine to completion on a fresh VirtualClockEventLoop (asyncio.run for simulations)."""
+    loop = VirtualClockEventLoop()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(main)
+    finally:
+        try:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
+
+def straight_line(speed: float, heading_deg: float = 0.0, altitude: float = 20.0) -> Trajectory:
+    """Constant velocity leg at `speed` m/s toward `heading_deg` (clockwise from north), `altitude` m above the start."""
+    heading = math.radians(heading_deg)
+    east, north = speed * math.sin(heading), speed * math.cos(heading)
+    return lambda t: (east * t, north * t, altitude)
+
+
+def circle(radius: float, speed: float, altitude: float = 20.0) -> Trajectory:
+    """Circle of `radius` m flown clockwise at `speed` m/s, starting at the origin heading north, `altitude` m above it."""
+    rate = speed / radius
+    return lambda t: (radius - radius * math.cos(rate * t), radius * math.sin(rate * t), altitude)
+
+
+def figure_eight(size: float, speed: float, altitude: float = 20.0) -> Trajectory:
+    """Lemniscate spanning about 2 * `size` m, flown at roughly `speed` m/s, `altitude` m above the start."""
+    rate = speed / (1.5 * size)
+    return lambda t: (size * math.sin(rate * t), size * math.sin(rate * t) * math.cos(rate * t), altitude)
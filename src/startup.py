@@ -0,0 +1,73 @@
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+STARTUP_REPORT_IMPORTS = 15  # slowest imports listed in the report
+
+
+class StartupTimer:
+    """
+    Time from the start of main.py to the command prompt, split in phases and, when
+    `track_imports` is set, by import (inclusive and self time, main thread only).
+    """
+
+    def __init__(self, track_imports: bool = False):
+        self.start = time.perf_counter()
+        self.last_mark = self.start
+        self.phases: List[Tuple[str, float]] = []
+        self.imports: Dict[str, List[float]] = {}  # module -> [inclusive seconds, self seconds]
+        self._original_import = builtins.__import__
+        self._thread = threading.get_ident()
+        self._stack: List[List[float]] = []
+        self.tracking = track_imports
+        if track_imports:
+            builtins.__import__ = self._timed_import
+
+    def mark(self, phase: str) -> None:
+        """Close the current phase under the given name."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last_mark))
+        self.last_mark = now
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def stop_tracking(self) -> None:
+        if self.tracking:
+            builtins.__import__ = self._original_import
+            self.tracking = False
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if (level == 0 and not fromlist and name in sys.modules) or threading.get_ident() != self._thread:
+            return self._original_import(name, globals, locals, fromlist, level)
+        nested = [0.0]
+        self._stack.append(nested)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][0] += elapsed
+            if level:
+                try:
+                    name = importlib.util.resolve_name("." * level + name, (globals or {}).get("__package__"))
+                except (ImportError, ValueError):
+                    pass
+            entry = self.imports.setdefault(name, [0.0, 0.0])
+            entry[0] += elapsed
+            entry[1] += elapsed - nested[0]
+
+    def report(self) -> str:
+        lines = [f"Startup: {self.elapsed * 1e3:.0f}ms to the prompt"]
+        lines.extend(f"  {phase:<24} {seconds * 1e3:8.1f}ms" for phase, seconds in self.phases)
+        if self.imports:
+            lines.append(f"Slowest imports ({STARTUP_REPORT_IMPORTS} of {len(self.imports)}): inclusive / self")
+            slowest = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)[:STARTUP_REPORT_IMPORTS]
+            lines.extend(f"  {name:<40} {total * 1e3:8.1f}ms {own * 1e3:8.1f}ms" for name, (total, own) in slowest)
+        return "\n".join(lines)
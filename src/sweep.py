@@ -0,0 +1,214 @@
+"""
+Monte Carlo sweep of the follow parameters on simulated flights.
+
+Every run draws a parameter set and a leader trajectory, flies follow_loop against simulated
+drones on a virtual clock, and scores it. Runs are spread over a process pool using every core,
+and the results are written as columns to a compressed .npz file:
+
+    python src/sweep.py --runs 5000 --output sweep.npz
+
+    >>> results = numpy.load("sweep.npz")
+    >>> best = numpy.argsort(results["rms_error"])[:10]
+"""
+import argparse
+import asyncio
+import logging
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+
+from commanders.sim_commander import SimulatedCommander
+from simulation import circle, figure_eight, run_simulation, straight_line
+from utils import follow_loop
+
+# Sampled ranges (uniform) of the follow_loop parameters
+PARAMETER_RANGES = {
+    "follow_dist": (3.0, 15.0),
+    "min_dist": (1.0, 4.0),
+    "max_dist": (20.0, 60.0),
+    "alt_offset": (0.0, 5.0),
+    "smoothing": (0.0, 0.8),
+    "interval": (0.2, 2.0),
+}
+TRAJECTORIES = ("straight_line", "circle", "figure_eight")
+LEADER_SPEED_RANGE = (2.0, 10.0)  # m/s
+DEFAULT_DURATION_S = 120.0  # simulated flight time per run
+WARMUP_S = 20.0  # time left to the follower to catch up before scoring
+SCORE_PERIOD_S = 0.5  # tracking error sampling period
+
+# Link and sensor model of the simulated drones
+LATENCY_S = 0.05
+DROPOUT = 0.02
+POSITION_NOISE_M = 0.5
+
+ORIGIN = (48.8566, 2.3522)
+METERS_PER_DEGREE = 111320.0
+
+
+def draw_run(seed: int) -> Dict[str, float]:
+    """Parameter set and scenario of one run, fully determined by `seed`."""
+    rng = random.Random(seed)
+    run = {name: rng.uniform(low, high) for name, (low, high) in PARAMETER_RANGES.items()}
+    run["max_dist"] = max(run["max_dist"], 2 * run["follow_dist"])
+    run["seed"] = seed
+    run["trajectory"] = rng.randrange(len(TRAJECTORIES))
+    run["leader_speed"] = rng.uniform(*LEADER_SPEED_RANGE)
+    run["heading"] = rng.uniform(0.0, 360.0)
+    return run
+
+
+def make_trajectory(run: Dict[str, float]):
+    kind = TRAJECTORIES[run["trajectory"]]
+    if kind == "straight_line":
+        return straight_line(run["leader_speed"], run["heading"])
+    if kind == "circle":
+        return circle(100.0, run["leader_speed"])
+    return figure_eight(100.0, run["leader_speed"])
+
+
+async def fly(run: Dict[str, float], duration: float) -> Dict[str, float]:
+    """Fly one run and score it."""
+    lat, lon = ORIGIN
+    seed = int(run["seed"])
+    leader = SimulatedCommander(
+        "leader", lat, lon, trajectory=make_trajectory(run), latency=LATENCY_S, position_noise=POSITION_NOISE_M, seed=2 * seed
+    )
+    # Follower starts hovering behind the leader at the target distance
+    follower = SimulatedCommander(
+        "follower",
+        lat - run["follow_dist"] / METERS_PER_DEGREE,
+        lon,
+        alt=20.0 + run["alt_offset"],
+        latency=LATENCY_S,
+        dropout=DROPOUT,
+        position_noise=POSITION_NOISE_M,
+        seed=2 * seed + 1,
+    )
+    task = asyncio.create_task(
+        follow_loop(
+            leader,
+            follower,
+            interval=run["interval"],
+            min_dist=run["min_dist"],
+            follow_dist=run["follow_dist"],
+            max_dist=run["max_dist"],
+            alt_offset=run["alt_offset"],
+            smoothing=run["smoothing"],
+            dry_run=False,
+            # Hold the swept interval: the adaptive rate would override it
+            adaptive_rate=False,
+        )
+    )
+
+    # Scored on the true (noise-free) horizontal separation, in the follower's tangent plane
+    squared_error = 0.0
+    max_error = 0.0
+    min_separation = math.inf
+    samples = 0
+    elapsed = 0.0
+    while elapsed < duration:
+        await asyncio.sleep(SCORE_PERIOD_S)
+        elapsed += SCORE_PERIOD_S
+        leader.advance()
+        follower.advance()
+        leader_east, leader_north, _ = follower.plane.to_enu(*leader.plane.from_enu(*leader.model.position))
+        follower_east, follower_north, _ = follower.model.position
+        separation = math.hypot(leader_east - follower_east, leader_north - follower_north)
+        min_separation = min(min_separation, separation)
+        if elapsed >= WARMUP_S:
+            error = abs(separation - run["follow_dist"])
+            squared_error += error * error
+            max_error = max(max_error, error)
+            samples += 1
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    return {
+        "rms_error": math.sqrt(squared_error / samples) if samples else math.nan,
+        "max_error": max_error,
+        "min_separation": min_separation,
+        "commands": follower.commands,
+    }
+
+
+def run_batch(seeds: List[int], duration: float) -> List[Dict[str, float]]:
+    """Worker entry point: fly the runs of `seeds` one after the other."""
+    logging.disable(logging.CRITICAL)
+    results = []
+    for seed in seeds:
+        run = draw_run(seed)
+        run.update(run_simulation(fly(run, duration)))
+        results.append(run)
+    return results
+
+
+def sweep(runs: int, seed: int = 0, duration: float = DEFAULT_DURATION_S, workers: int | None = None) -> Dict[str, np.ndarray]:
+    """
+    Fly `runs` simulated runs over a process pool.
+
+    Returns:
+        Dict of equally long columns, one row per run, ordered by seed
+
+    Raises:
+        ValueError: runs is not positive
+    """
+    if runs < 1:
+        raise ValueError(f"Expected at least one run, got {runs}")
+    workers = workers or os.cpu_count() or 1
+    seeds = list(range(seed, seed + runs))
+    # A few batches per worker keeps the pool busy until the end without paying a task per run
+    batch_size = max(1, math.ceil(runs / (workers * 4)))
+    batches = [seeds[i : i + batch_size] for i in range(0, runs, batch_size)]
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in pool.map(run_batch, batches, [duration] * len(batches)):
+            rows.extend(batch)
+
+    columns = {name: np.array([row[name] for row in rows]) for name in rows[0]}
+    columns["seed"] = columns["seed"].astype(np.int64)
+    columns["trajectory"] = columns["trajectory"].astype(np.int8)
+    columns["commands"] = columns["commands"].astype(np.int32)
+    return columns
+
+
+def positive_int(text: str) -> int:
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {text}")
+    return value
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Monte Carlo sweep of the follow parameters")
+    parser.add_argument("--runs", type=positive_int, default=1000, help="number of simulated runs")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first run")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION_S, help="simulated seconds per run")
+    parser.add_argument("--workers", type=positive_int, help="worker processes (default: one per core)")
+    parser.add_argument("--output", default="sweep.npz", help="columnar output file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    columns = sweep(args.runs, args.seed, args.duration, args.workers)
+    np.savez_compressed(args.output, trajectory_names=np.array(TRAJECTORIES), **columns)
+    print(f"{args.runs} runs in {time.perf_counter() - start:.1f}s -> {args.output}")
+
+    # Best parameter sets among the ones that never got closer than their min_dist
+    safe = np.flatnonzero(columns["min_separation"] >= columns["min_dist"])
+    best = safe[np.argsort(columns["rms_error"][safe])[:5]]
+    print(f"{len(safe)}/{args.runs} runs kept min_dist. Best tracking:")
+    for i in best:
+        parameters = ", ".join(f"{name}={columns[name][i]:.2f}" for name in PARAMETER_RANGES)
+        print(
+            f"  {parameters} | rms {columns['rms_error'][i]:.2f}m, min separation {columns['min_separation'][i]:.1f}m, "
+            f"{columns['commands'][i]} commands ({TRAJECTORIES[columns['trajectory'][i]]})"
+        )
+
+
+if __name__ == "__main__":
+    main()
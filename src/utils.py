@@ -1,22 +1,50 @@
 import asyncio
+import collections
 import logging
-from typing import Optional, Tuple
-
-from geographiclib.geodesic import Geodesic
-
-from controller import MyController
+import math
+import time
+from typing import List, Optional, Tuple
+
+from commanders.base_commander import PositionSample
+from estimator import LeaderEstimator, ned_to_enu, time_to_closest_approach
+from follow_params import (
+    DEFAULT_ALT_OFFSET_M,
+    DEFAULT_COMMAND_LATENCY_S,
+    DEFAULT_FOLLOW_DIST_M,
+    DEFAULT_MAX_DIST_M,
+    DEFAULT_MIN_DIST_M,
+    DEFAULT_SMOOTHING,
+    FollowParams,
+)
+from geometry import DEFAULT_BACKEND, GeometryBackend, make_backend, offset_position
+from log_pipeline import PER_TICK
+from metrics import REGISTRY
+from scheduler import FAST_RATE_HZ, PeriodicScheduler, adaptive_follow_rate
+from velocity_control import VelocityFollowController, wrap_angle
 
 # Configuration constants with default values
-DEFAULT_FOLLOW_DIST_M = 5.0  # Target follow distance in meters
-DEFAULT_MIN_DIST_M = 2.0  # Minimum safe distance before stopping follower
-DEFAULT_MAX_DIST_M = 30.0  # Maximum distance before limiting follower movement
-DEFAULT_ALT_OFFSET_M = 2.0  # Altitude offset from leader
 DEFAULT_RETRY_DELAY = 0.5  # Delay before retrying after communication failure
 DEFAULT_TIMEOUT = 2.0  # Timeout for position requests
+MAX_EXTRAPOLATION_S = 1.0  # Never project a position sample further than this in time
+DEFAULT_VELOCITY_RATE_HZ = 30.0  # Control rate of the closed-loop velocity follow mode
+DEFAULT_PCMD_LATENCY_S = 0.1  # Expected delay before the follower acts on a PCMD
 
 # Set up logging
 logger = logging.getLogger()
 
+# Metrics
+FETCH_TIME = REGISTRY.histogram("drone_position_fetch_seconds", "Time to fetch drone positions", call="fetch_position_samples")
+SAFE_FETCH_TIME = REGISTRY.histogram("drone_position_fetch_seconds", "Time to fetch drone positions", call="safe_get_position")
+POSITION_TIMEOUTS = REGISTRY.counter("drone_position_failures_total", "Position requests that failed", reason="timeout")
+POSITION_ERRORS = REGISTRY.counter("drone_position_failures_total", "Position requests that failed", reason="error")
+FOLLOW_COMPUTE_TIME = REGISTRY.histogram("drone_follow_compute_seconds", "Time to compute a follow command", mode="goto")
+VELOCITY_COMPUTE_TIME = REGISTRY.histogram("drone_follow_compute_seconds", "Time to compute a follow command", mode="velocity")
+FOLLOW_TICKS = REGISTRY.counter("drone_follow_ticks_total", "Follow loop iterations")
+FOLLOW_COMMAND_FAILURES = REGISTRY.counter("drone_follow_command_failures_total", "Follow commands that raised")
+STOPS_TOO_CLOSE = REGISTRY.counter("drone_follow_stops_total", "Follower stopped by the follow loop", reason="too_close")
+STOPS_CONFLICT = REGISTRY.counter("drone_follow_stops_total", "Follower stopped by the follow loop", reason="conflict")
+STOPS_NO_POSITION = REGISTRY.counter("drone_follow_stops_total", "Follower stopped by the follow loop", reason="no_position")
+
 
 class PositionData:
     """Store drone position data with validity tracking"""
@@ -34,12 +62,16 @@ class PositionData:
         return now - self.timestamp < 3.0
 
 
+_default_geometry: Optional[GeometryBackend] = None
+
+
 def compute_follow_point(
     leader_lat: float,
     leader_lon: float,
     follower_lat: float,
     follower_lon: float,
     distance: float,
+    geometry: Optional[GeometryBackend] = None,
 ) -> Tuple[float, float]:
     """
     Compute target latitude/longitude at `distance` meters from leader,
@@ -51,16 +83,89 @@ def compute_follow_point(
         follower_lat: Follower drone latitude in degrees
         follower_lon: Follower drone longitude in degrees
         distance: Target distance in meters
+        geometry: Geometry backend to use (defaults to a shared DEFAULT_BACKEND instance)
 
     Returns:
         Tuple of (target_latitude, target_longitude) in degrees
     """
-    # Use the WGS84 ellipsoid parameters
-    geod = Geodesic(6378137, 1 / 298.257223563)  # WGS84 parameters (a=semi-major axis, f=flattening)
-    inv = geod.Inverse(leader_lat, leader_lon, follower_lat, follower_lon)
-    bearing = inv["azi1"]
-    dest = geod.Direct(leader_lat, leader_lon, bearing, distance)
-    return dest["lat2"], dest["lon2"]
+    global _default_geometry
+    if geometry is None:
+        if _default_geometry is None:
+            _default_geometry = make_backend(DEFAULT_BACKEND)
+        geometry = _default_geometry
+    return geometry.follow_point(leader_lat, leader_lon, follower_lat, follower_lon, distance)
+
+
+def align_position(
+    sample: PositionSample,
+    ref_time: float,
+    velocity: Optional[Tuple[float, float, float]] = None,
+    previous: Optional[PositionSample] = None,
+) -> Tuple[float, float, float]:
+    """
+    Interpolate or extrapolate a position sample to `ref_time`.
+
+    The drone's reported NED velocity is used when available, otherwise the motion
+    between `previous` and `sample`. The projection is clamped to MAX_EXTRAPOLATION_S.
+
+    Returns:
+        Tuple of (latitude, longitude, altitude) at `ref_time`
+    """
+    dt = max(-MAX_EXTRAPOLATION_S, min(MAX_EXTRAPOLATION_S, ref_time - sample.timestamp))
+    if dt == 0.0:
+        return sample.lat, sample.lon, sample.alt
+    if velocity is not None:
+        north, east, down = velocity
+        return offset_position(sample.lat, sample.lon, sample.alt, north * dt, east * dt, down * dt)
+    if previous is not None and sample.timestamp > previous.timestamp:
+        ratio = dt / (sample.timestamp - previous.timestamp)
+        return (
+            sample.lat + (sample.lat - previous.lat) * ratio,
+            sample.lon + (sample.lon - previous.lon) * ratio,
+            sample.alt + (sample.alt - previous.alt) * ratio,
+        )
+    return sample.lat, sample.lon, sample.alt
+
+
+def remember_sample(track: collections.deque, sample: PositionSample) -> Optional[PositionSample]:
+    """
+    Record `sample` in a two-slot track (deque(maxlen=2)) and return the distinct sample that preceded it.
+    """
+    if not track or track[-1].timestamp != sample.timestamp:
+        track.append(sample)
+    return track[0] if len(track) == 2 else None
+
+
+async def fetch_position_samples(*commanders, timeout: float = DEFAULT_TIMEOUT) -> List[Optional[PositionSample]]:
+    """
+    Fetch the timestamped position of every commander concurrently, under a single deadline.
+
+    Returns:
+        One PositionSample per commander, in order, or None for each request that failed or timed out
+    """
+    start = time.perf_counter_ns()
+    tasks = [asyncio.create_task(commander.get_position_sample()) for commander in commanders]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=timeout)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        FETCH_TIME.record_ns(time.perf_counter_ns() - start)
+
+    samples = []
+    for task in tasks:
+        if task not in done:
+            POSITION_TIMEOUTS.inc()
+            logger.warning("Failed to get position: timed out after %ss", timeout, extra=PER_TICK)
+            samples.append(None)
+        elif task.exception() is not None:
+            POSITION_ERRORS.inc()
+            logger.warning("Failed to get position: %s", task.exception(), extra=PER_TICK)
+            samples.append(None)
+        else:
+            samples.append(task.result())
+    return samples
 
 
 async def safe_get_position(drone_commander, timeout: float = DEFAULT_TIMEOUT) -> Optional[Tuple[float, float, float]]:
@@ -70,12 +175,20 @@ async def safe_get_position(drone_commander, timeout: float = DEFAULT_TIMEOUT) -
     Returns:
         Tuple of (latitude, longitude, altitude) or None if request fails
     """
+    start = time.perf_counter_ns()
     try:
         position_task = asyncio.create_task(drone_commander.get_position())
         return await asyncio.wait_for(position_task, timeout=timeout)
-    except (asyncio.TimeoutError, Exception) as e:
-        logger.warning(f"Failed to get position: {e}")
+    except asyncio.TimeoutError as e:
+        POSITION_TIMEOUTS.inc()
+        logger.warning("Failed to get position: %s", e, extra=PER_TICK)
+        return None
+    except Exception as e:
+        POSITION_ERRORS.inc()
+        logger.warning("Failed to get position: %s", e, extra=PER_TICK)
         return None
+    finally:
+        SAFE_FETCH_TIME.record_ns(time.perf_counter_ns() - start)
 
 
 async def follow_loop(
@@ -86,96 +199,200 @@ async def follow_loop(
     follow_dist: float = DEFAULT_FOLLOW_DIST_M,
     max_dist: float = DEFAULT_MAX_DIST_M,
     alt_offset: float = DEFAULT_ALT_OFFSET_M,
+    geometry_backend: str = DEFAULT_BACKEND,
+    prediction: bool = True,
+    command_latency: float = DEFAULT_COMMAND_LATENCY_S,
+    adaptive_rate: bool = True,
+    max_rate: float = FAST_RATE_HZ,
+    scheduler: Optional[PeriodicScheduler] = None,
+    dry_run: bool = True,
+    smoothing: float = DEFAULT_SMOOTHING,
+    params: Optional[FollowParams] = None,
 ) -> None:
     """
     Continuously compute and send follow-me commands to maintain specified distance.
-    If drones come too close, the follower will stop moving.
+    If drones come too close, or are predicted to come too close before the next command
+    takes effect, the follower will stop moving.
 
     Args:
         leader_commander: Commander object for the leader drone (must provide get_position method)
         follower_commander: Commander object for the follower drone (must provide goto_position and set_pcmds methods)
-        interval: Update interval in seconds
+        interval: Update interval in seconds while cruising
         min_dist: Minimum safe distance before stopping follower (meters)
         follow_dist: Target follow distance (meters)
         max_dist: Maximum distance limit (meters)
         alt_offset: Height offset from leader (meters)
+        geometry_backend: "enu" (cached local tangent plane) or "geodesic" (exact ellipsoidal solution)
+        prediction: Aim at the leader position predicted for the time the command reaches the follower
+        command_latency: Expected delay before the follower acts on a command (seconds)
+        adaptive_rate: Speed the loop up to `max_rate` when the separation changes fast or nears min_dist
+        max_rate: Highest update rate used by the adaptive rate (Hz)
+        scheduler: Scheduler driving the ticks, pass one to read its rate and deadline metrics
+        dry_run: Only log the goto commands instead of sending them to the follower
+        smoothing: Weight of the previous target in the new one (0 disables smoothing)
+        params: Parameters shared with the caller, read on every tick so they can be changed while the
+            loop runs. When given, they replace the corresponding arguments above
     """
-    # Create single geodesic calculator for repeated use
-    geod = Geodesic(6378137, 1 / 298.257223563)  # WGS84 parameters
+    if params is None:
+        params = FollowParams(
+            interval=interval,
+            min_dist=min_dist,
+            follow_dist=follow_dist,
+            max_dist=max_dist,
+            alt_offset=alt_offset,
+            smoothing=smoothing,
+            prediction=prediction,
+            command_latency=command_latency,
+            adaptive_rate=adaptive_rate,
+            max_rate=max_rate,
+            dry_run=dry_run,
+        )
+
+    # Single geometry backend for the whole session, so the tangent plane anchor is reused
+    geometry = make_backend(geometry_backend)
 
     # Smoothing variables
-    target_position = PositionData()
+    target_position: Optional[PositionData] = None
+    leader_track: collections.deque = collections.deque(maxlen=2)
+    follower_track: collections.deque = collections.deque(maxlen=2)
+    leader_estimator = LeaderEstimator()
+    loop = asyncio.get_running_loop()
+
+    # Ticks target absolute deadlines, so the work done in a tick does not stretch the period
+    if scheduler is None:
+        scheduler = PeriodicScheduler(1.0 / params.interval)
+    else:
+        scheduler.set_rate(1.0 / params.interval)
+    previous_separation: Optional[Tuple[float, float]] = None  # (ref_time, separation)
 
     try:
         consecutive_failures = 0
 
         while True:
-            # Retrieve positions with timeout handling
-            leader_position = await safe_get_position(leader_commander)
-            follower_position = await safe_get_position(follower_commander)
+            # Retrieve both positions concurrently, bounded by a single timeout
+            leader_sample, follower_sample = await fetch_position_samples(leader_commander, follower_commander)
+            FOLLOW_TICKS.inc()
 
             # Check if both position fetches were successful
-            if leader_position is None or follower_position is None:
+            if leader_sample is None or follower_sample is None:
                 consecutive_failures += 1
                 if consecutive_failures >= 3:
                     logger.warning("Multiple consecutive position failures - stopping follower")
+                    STOPS_NO_POSITION.inc()
                     await follower_commander.set_pcmds(0, 0, 0, 0)
                     await asyncio.sleep(DEFAULT_RETRY_DELAY)
+                    scheduler.reset()
                     continue
                 else:
                     await asyncio.sleep(DEFAULT_RETRY_DELAY)
+                    scheduler.reset()
                     continue
 
             consecutive_failures = 0
-            lead_lat, lead_lon, lead_alt = leader_position
-            foll_lat, foll_lon, foll_alt = follower_position
+            compute_start = time.perf_counter_ns()
+
+            # Bring both samples to the same instant so the geometry never mixes measurement times
+            ref_time = max(leader_sample.timestamp, follower_sample.timestamp)
+            previous_leader = remember_sample(leader_track, leader_sample)
+            previous_follower = remember_sample(follower_track, follower_sample)
+            leader_velocity = leader_commander.get_velocity()
+            follower_velocity = follower_commander.get_velocity()
+            lead_lat, lead_lon, lead_alt = align_position(leader_sample, ref_time, leader_velocity, previous_leader)
+            foll_lat, foll_lon, foll_alt = align_position(follower_sample, ref_time, follower_velocity, previous_follower)
+            leader_estimator.update(leader_sample.timestamp, leader_sample.lat, leader_sample.lon, leader_sample.alt, leader_velocity)
 
             # Compute separation distance
-            geodesic_result = geod.Inverse(lead_lat, lead_lon, foll_lat, foll_lon)
-            separation_distance = geodesic_result["s12"]
-            bearing = geodesic_result["azi1"]
-
-            # Check if drones are too close
+            separation_distance, bearing = geometry.separation_and_bearing(lead_lat, lead_lon, foll_lat, foll_lon)
+
+            # Tick faster while the separation changes fast or gets close to min_dist
+            min_dist = params.min_dist
+            cruise_rate = 1.0 / params.interval
+            rate = cruise_rate
+            separation_rate = 0.0
+            if params.adaptive_rate:
+                if previous_separation is not None and ref_time > previous_separation[0]:
+                    separation_rate = (separation_distance - previous_separation[1]) / (ref_time - previous_separation[0])
+                rate = adaptive_follow_rate(separation_distance, separation_rate, min_dist, cruise_rate, max(cruise_rate, params.max_rate))
+                previous_separation = (ref_time, separation_distance)
+            if abs(rate - scheduler.rate_hz) > 1e-6:
+                logger.debug("Follow rate %.1fHz -> %.1fHz (separation rate: %.1fm/s)", scheduler.rate_hz, rate, separation_rate, extra=PER_TICK)
+                scheduler.set_rate(rate)
+
+            # Closest horizontal approach if both drones keep their current velocity
+            (lead_east, lead_north, _), (lead_v_east, lead_v_north, _) = leader_estimator.predict_enu(ref_time)
+            foll_east, foll_north, _ = leader_estimator.plane.to_enu(foll_lat, foll_lon, foll_alt)
+            foll_v_east, foll_v_north, _ = ned_to_enu(follower_velocity) if follower_velocity is not None else (0.0, 0.0, 0.0)
+            time_to_cpa, cpa_distance = time_to_closest_approach(
+                (foll_east - lead_east, foll_north - lead_north),
+                (foll_v_east - lead_v_east, foll_v_north - lead_v_north),
+            )
+
+            # Check if drones are too close, or will be before the next command takes effect
             if separation_distance < min_dist:
-                logger.info(f"Too close ({separation_distance:.1f}m < {min_dist}m) - stopping follower")
+                logger.info("Too close (%.1fm < %sm) - stopping follower", separation_distance, min_dist, extra=PER_TICK)
+                STOPS_TOO_CLOSE.inc()
                 await follower_commander.set_pcmds(0, 0, 0, 0)
-                await asyncio.sleep(interval)
+                await scheduler.wait_next()
+                continue
+            if cpa_distance < min_dist and time_to_cpa <= scheduler.period + params.command_latency:
+                logger.info("Conflict predicted in %.1fs (%.1fm < %sm) - stopping follower", time_to_cpa, cpa_distance, min_dist, extra=PER_TICK)
+                STOPS_CONFLICT.inc()
+                await follower_commander.set_pcmds(0, 0, 0, 0)
+                await scheduler.wait_next()
                 continue
 
             # Determine follow distance based on current separation
+            follow_dist, max_dist = params.follow_dist, params.max_dist
             actual_follow_dist = min(follow_dist, max(0, separation_distance - min_dist))
             if separation_distance > max_dist:
-                logger.warning(f"Exceeded maximum distance ({separation_distance:.1f}m > {max_dist}m)")
+                logger.warning("Exceeded maximum distance (%.1fm > %sm)", separation_distance, max_dist, extra=PER_TICK)
                 # Use maximum allowed distance to prevent further separation
                 actual_follow_dist = max(0, separation_distance - max_dist / 2)
 
-            # Compute target follow point and desired altitude
-            tgt_lat, tgt_lon = compute_follow_point(lead_lat, lead_lon, foll_lat, foll_lon, actual_follow_dist)
-            tgt_alt = lead_alt + alt_offset
-
-            # Apply simple smoothing (weight: 30% previous target, 70% new target)
-            if target_position.is_valid:
-                smooth_lat = 0.3 * target_position.lat + 0.7 * tgt_lat
-                smooth_lon = 0.3 * target_position.lon + 0.7 * tgt_lon
-                smooth_alt = 0.3 * target_position.alt + 0.7 * tgt_alt
+            # Compute target follow point and desired altitude, against the leader position expected
+            # when the command takes effect
+            if params.prediction:
+                aim_lat, aim_lon, aim_alt = leader_estimator.predict(loop.time() + params.command_latency)
+                _, aim_bearing = geometry.separation_and_bearing(aim_lat, aim_lon, foll_lat, foll_lon)
+            else:
+                aim_lat, aim_lon, aim_alt, aim_bearing = lead_lat, lead_lon, lead_alt, bearing
+            tgt_lat, tgt_lon = geometry.destination(aim_lat, aim_lon, aim_bearing, actual_follow_dist)
+            tgt_alt = aim_alt + params.alt_offset
+
+            # Apply simple smoothing (weight: `smoothing` previous target, the rest new target)
+            smoothing = params.smoothing
+            if target_position is not None and target_position.is_valid:
+                smooth_lat = smoothing * target_position.lat + (1 - smoothing) * tgt_lat
+                smooth_lon = smoothing * target_position.lon + (1 - smoothing) * tgt_lon
+                smooth_alt = smoothing * target_position.alt + (1 - smoothing) * tgt_alt
             else:
                 smooth_lat, smooth_lon, smooth_alt = tgt_lat, tgt_lon, tgt_alt
 
             # Update target position for next iteration
             target_position = PositionData(smooth_lat, smooth_lon, smooth_alt)
-
-            logger.info(f"Moving follower to {smooth_lat:.6f}, {smooth_lon:.6f}, alt {smooth_alt:.1f}m (separation: {separation_distance:.1f}m, bearing: {bearing:.1f}°)")
+            FOLLOW_COMPUTE_TIME.record_ns(time.perf_counter_ns() - compute_start)
+
+            logger.info(
+                "Moving follower to %.6f, %.6f, alt %.1fm (separation: %.1fm, bearing: %.1f°)",
+                smooth_lat,
+                smooth_lon,
+                smooth_alt,
+                separation_distance,
+                bearing,
+                extra=PER_TICK,
+            )
 
             # Send command
             try:
-                # await follower_commander.goto_position(
-                #     smooth_lat, smooth_lon, smooth_alt
-                # )
-                logger.info(f"Simulating goto command with coordinates {smooth_lat:.6f}, {smooth_lon:.6f}, alt {smooth_alt:.1f}m")
+                if params.dry_run:
+                    logger.info("Simulating goto command with coordinates %.6f, %.6f, alt %.1fm", smooth_lat, smooth_lon, smooth_alt, extra=PER_TICK)
+                else:
+                    await follower_commander.goto_position(smooth_lat, smooth_lon, smooth_alt)
             except Exception as cmd_error:
-                logger.error(f"Failed to send goto command: {cmd_error}")
+                FOLLOW_COMMAND_FAILURES.inc()
+                logger.error("Failed to send goto command: %s", cmd_error)
 
-            await asyncio.sleep(interval)
+            await scheduler.wait_next()
 
     except asyncio.CancelledError:
         logger.info("Follow loop cancelled - stopping follower")
@@ -184,22 +401,156 @@ async def follow_loop(
         logger.info("Follow loop interrupted - stopping follower")
         await follower_commander.set_pcmds(0, 0, 0, 0)
     except Exception as e:
-        logger.error(f"Error in follow loop: {e}")
+        logger.error("Error in follow loop: %s", e)
         try:
             await follower_commander.set_pcmds(0, 0, 0, 0)
         except Exception as stop_error:
-            logger.error(f"Error stopping follower after exception: {stop_error}")
+            logger.error("Error stopping follower after exception: %s", stop_error)
+    finally:
+        logger.debug("Follow scheduler metrics: %s", scheduler.metrics())
+
+
+async def velocity_follow_loop(
+    leader_commander,
+    follower_commander,
+    rate_hz: float = DEFAULT_VELOCITY_RATE_HZ,
+    min_dist: float = DEFAULT_MIN_DIST_M,
+    follow_dist: float = DEFAULT_FOLLOW_DIST_M,
+    alt_offset: float = DEFAULT_ALT_OFFSET_M,
+    command_latency: float = DEFAULT_PCMD_LATENCY_S,
+    scheduler: Optional[PeriodicScheduler] = None,
+) -> None:
+    """
+    Follow the leader by streaming PCMDs from a closed-loop velocity controller, instead of
+    making the follower re-plan a moveTo every tick. The follower holds `follow_dist` from the
+    leader position predicted `command_latency` ahead, `alt_offset` above it, facing it.
+    If drones come too close, the follower will stop moving.
+
+    Args:
+        leader_commander: Commander object for the leader drone (must provide get_position_sample method)
+        follower_commander: Commander object for the follower drone (must provide set_pcmds, get_velocity and get_attitude methods)
+        rate_hz: Control rate (Hz)
+        min_dist: Minimum safe distance before stopping follower (meters)
+        follow_dist: Target follow distance (meters)
+        alt_offset: Height offset from leader (meters)
+        command_latency: Expected delay before the follower acts on a PCMD (seconds)
+        scheduler: Scheduler driving the ticks, pass one to read its rate and deadline metrics
+    """
+    controller = VelocityFollowController()
+    leader_estimator = LeaderEstimator()
+    follower_track: collections.deque = collections.deque(maxlen=2)
+    loop = asyncio.get_running_loop()
+    if scheduler is None:
+        scheduler = PeriodicScheduler(rate_hz)
+    else:
+        scheduler.set_rate(rate_hz)
+    last_tick: Optional[float] = None
+
+    async def stop_follower() -> None:
+        nonlocal last_tick
+        await follower_commander.set_pcmds(0, 0, 0, 0)
+        controller.reset()
+        last_tick = None
+
+    try:
+        consecutive_failures = 0
+
+        while True:
+            leader_sample, follower_sample = await fetch_position_samples(leader_commander, follower_commander)
+            attitude = follower_commander.get_attitude()
+            FOLLOW_TICKS.inc()
+
+            if leader_sample is None or follower_sample is None or attitude is None:
+                consecutive_failures += 1
+                if consecutive_failures >= 3:
+                    logger.warning("Multiple consecutive position or attitude failures - stopping follower")
+                    STOPS_NO_POSITION.inc()
+                    await stop_follower()
+                await asyncio.sleep(DEFAULT_RETRY_DELAY)
+                scheduler.reset()
+                continue
+
+            consecutive_failures = 0
+            compute_start = time.perf_counter_ns()
+            now = loop.time()
+            dt = 0.0 if last_tick is None else now - last_tick
+            last_tick = now
+
+            leader_estimator.update(
+                leader_sample.timestamp, leader_sample.lat, leader_sample.lon, leader_sample.alt, leader_commander.get_velocity()
+            )
+            previous_follower = remember_sample(follower_track, follower_sample)
+            follower_velocity = follower_commander.get_velocity()
+            foll_lat, foll_lon, foll_alt = align_position(follower_sample, now, follower_velocity, previous_follower)
+
+            # Everything below is in the estimator's (east, north, up) plane
+            foll_east, foll_north, foll_up = leader_estimator.plane.to_enu(foll_lat, foll_lon, foll_alt)
+            (lead_east, lead_north, _), _ = leader_estimator.predict_enu(now)
+            separation_distance = math.hypot(foll_east - lead_east, foll_north - lead_north)
+            if separation_distance < min_dist:
+                logger.info("Too close (%.1fm < %sm) - stopping follower", separation_distance, min_dist, extra=PER_TICK)
+                STOPS_TOO_CLOSE.inc()
+                await stop_follower()
+                await scheduler.wait_next()
+                continue
+
+            # Target on the line from the predicted leader position toward the follower
+            (aim_east, aim_north, aim_up), leader_velocity = leader_estimator.predict_enu(now + command_latency)
+            away_east, away_north = foll_east - aim_east, foll_north - aim_north
+            away = math.hypot(away_east, away_north)
+            if away > 1e-6:
+                tgt_east = aim_east + away_east / away * follow_dist
+                tgt_north = aim_north + away_north / away * follow_dist
+            else:
+                tgt_east, tgt_north = foll_east, foll_north
+            position_error = (tgt_east - foll_east, tgt_north - foll_north, aim_up + alt_offset - foll_up)
+
+            _, _, yaw = attitude
+            heading_error = wrap_angle(math.atan2(-away_east, -away_north) - yaw)
+            roll, pitch, yaw_rate, gaz = controller.update(
+                position_error,
+                leader_velocity,
+                ned_to_enu(follower_velocity) if follower_velocity is not None else None,
+                yaw,
+                heading_error,
+                dt,
+            )
+            VELOCITY_COMPUTE_TIME.record_ns(time.perf_counter_ns() - compute_start)
+            await follower_commander.set_pcmds(roll, pitch, yaw_rate, gaz)
+
+            await scheduler.wait_next()
+
+    except asyncio.CancelledError:
+        logger.info("Velocity follow loop cancelled - stopping follower")
+        await follower_commander.set_pcmds(0, 0, 0, 0)
+    except KeyboardInterrupt:
+        logger.info("Velocity follow loop interrupted - stopping follower")
+        await follower_commander.set_pcmds(0, 0, 0, 0)
+    except Exception as e:
+        logger.error("Error in velocity follow loop: %s", e)
+        try:
+            await follower_commander.set_pcmds(0, 0, 0, 0)
+        except Exception as stop_error:
+            logger.error("Error stopping follower after exception: %s", stop_error)
+    finally:
+        logger.debug("Velocity follow scheduler metrics: %s", scheduler.metrics())
 
 
 async def manual_control(follower) -> None:
     """Continuously read PS4 controller commands and send them to the drone."""
+    # The joystick stack is only loaded when manual control starts
+    from controller import MyController
+
+    controller = None
     try:
-        controller = MyController(drone=follower, interface="/dev/input/js1", connecting_using_ds4drv=False)
+        controller = MyController(
+            drone=follower, interface="/dev/input/js1", connecting_using_ds4drv=False, collapse_axis_events=True
+        )
         print("Manual control loop started")
         print("SQUARE -> Engage dropping procedure")
         print("CIRCLE -> Landing")
         print("CROSS -> Takeoff")
-        controller.listen()
+        await controller.listen_async()
     except asyncio.CancelledError:
         logger.warning("Manual control loop cancelled – stopping both drones by sending pcmds")
         await follower.set_pcmds(0, 0, 0, 0)
@@ -207,5 +558,9 @@ async def manual_control(follower) -> None:
         logger.warning("Manual control loop interrupted – stopping both drones by sending pcmds")
         await follower.set_pcmds(0, 0, 0, 0)
     except Exception as e:
-        logger.error(f"Error in manual control loop: {e}")
+        logger.error("Error in manual control loop: %s", e)
         await follower.set_pcmds(0, 0, 0, 0)
+    finally:
+        if controller is not None:
+            logger.debug("PCMD pump metrics: %s", controller.pcmd_pump.metrics())
+            controller.close()
@@ -0,0 +1,126 @@
+import math
+from typing import Optional, Tuple
+
+# Closed-loop follow gains and limits (Parrot Anafi defaults)
+POSITION_GAIN = 0.8  # 1/s, horizontal speed requested per meter of position error
+MAX_HORIZONTAL_SPEED_M_S = 8.0  # Cap on the requested horizontal speed
+TILT_PER_SPEED = 8.0  # PCMD % of roll/pitch needed to hold 1 m/s (feed-forward)
+VELOCITY_GAINS = (10.0, 2.0, 0.5)  # (kp, ki, kd) from velocity error (m/s) to roll/pitch %
+MAX_TILT_PCMD = 80  # Roll/pitch clamp in %
+ALTITUDE_GAINS = (1.0, 0.1, 0.0)  # (kp, ki, kd) from altitude error (m) to vertical speed (m/s)
+MAX_VERTICAL_SPEED_M_S = 2.0  # Vertical speed reached with gaz at 100% (drone max vertical speed setting)
+YAW_GAINS = (60.0, 0.0, 5.0)  # (kp, ki, kd) from heading error (rad) to yaw rate %
+MAX_YAW_PCMD = 50  # Yaw rate clamp in %
+
+Vector = Tuple[float, float, float]
+
+
+class PID:
+    """
+    PID controller with an optional feed-forward term, output clamping and anti-windup.
+
+    The integral only accumulates while the output is not saturated, or while the error
+    pulls the output back out of saturation (conditional integration).
+    """
+
+    def __init__(self, kp: float, ki: float = 0.0, kd: float = 0.0, output_limit: float = math.inf):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.output_limit = output_limit
+        self.integral = 0.0
+        self.previous_error: Optional[float] = None
+
+    def reset(self) -> None:
+        self.integral = 0.0
+        self.previous_error = None
+
+    def update(self, error: float, dt: float, feed_forward: float = 0.0) -> float:
+        derivative = 0.0
+        if self.previous_error is not None and dt > 0:
+            derivative = (error - self.previous_error) / dt
+        self.previous_error = error
+
+        integral = self.integral + error * dt
+        unclamped = feed_forward + self.kp * error + self.ki * integral + self.kd * derivative
+        output = max(-self.output_limit, min(self.output_limit, unclamped))
+        if output == unclamped or (unclamped > output) != (error > 0):
+            self.integral = integral
+        return output
+
+
+class VelocityFollowController:
+    """
+    Turns the follower's position error into PCMD percentages.
+
+    The horizontal error (ENU) and the predicted leader velocity give a velocity setpoint, which
+    a PID per world axis converts into tilt; the tilt is then rotated into the follower body frame
+    (roll right, pitch forward) using its yaw. Altitude is held with gaz and yaw keeps the
+    follower facing the leader.
+    """
+
+    def __init__(self, position_gain: float = POSITION_GAIN, max_speed: float = MAX_HORIZONTAL_SPEED_M_S):
+        self.position_gain = position_gain
+        self.max_speed = max_speed
+        self.east = PID(*VELOCITY_GAINS, output_limit=MAX_TILT_PCMD)
+        self.north = PID(*VELOCITY_GAINS, output_limit=MAX_TILT_PCMD)
+        self.altitude = PID(*ALTITUDE_GAINS, output_limit=MAX_VERTICAL_SPEED_M_S)
+        self.heading = PID(*YAW_GAINS, output_limit=MAX_YAW_PCMD)
+
+    def reset(self) -> None:
+        """Forget the integral and derivative state, e.g. after the follower was stopped."""
+        for pid in (self.east, self.north, self.altitude, self.heading):
+            pid.reset()
+
+    def update(
+        self,
+        position_error: Vector,
+        leader_velocity: Vector,
+        follower_velocity: Optional[Vector],
+        yaw: float,
+        heading_error: float,
+        dt: float,
+    ) -> Tuple[int, int, int, int]:
+        """
+        Args:
+            position_error: Target minus follower position, (east, north, up) in meters
+            leader_velocity: Predicted leader velocity, (east, north, up) in m/s, used as feed-forward
+            follower_velocity: Measured follower velocity, (east, north, up) in m/s, or None if unknown
+            yaw: Follower heading in radians, clockwise from north
+            heading_error: Heading change needed to face the leader, in radians within [-pi, pi]
+            dt: Time since the previous update in seconds
+
+        Returns:
+            Tuple of (roll, pitch, yaw, gaz) percentages for set_pcmds
+        """
+        error_east, error_north, error_up = position_error
+        # Velocity setpoint, limited to max_speed
+        want_east = leader_velocity[0] + self.position_gain * error_east
+        want_north = leader_velocity[1] + self.position_gain * error_north
+        speed = math.hypot(want_east, want_north)
+        if speed > self.max_speed:
+            want_east *= self.max_speed / speed
+            want_north *= self.max_speed / speed
+
+        have_east, have_north, _ = follower_velocity if follower_velocity is not None else (want_east, want_north, 0.0)
+        tilt_east = self.east.update(want_east - have_east, dt, want_east * TILT_PER_SPEED)
+        tilt_north = self.north.update(want_north - have_north, dt, want_north * TILT_PER_SPEED)
+
+        # World tilt to body frame
+        sin_yaw, cos_yaw = math.sin(yaw), math.cos(yaw)
+        pitch = tilt_north * cos_yaw + tilt_east * sin_yaw
+        roll = tilt_east * cos_yaw - tilt_north * sin_yaw
+
+        climb = self.altitude.update(error_up, dt, leader_velocity[2])
+        gaz = climb / MAX_VERTICAL_SPEED_M_S * 100
+        yaw_rate = self.heading.update(heading_error, dt)
+        return _pcmd(roll), _pcmd(pitch), _pcmd(yaw_rate), _pcmd(gaz)
+
+
+def _pcmd(value: float) -> int:
+    return int(round(max(-100.0, min(100.0, value))))
+
+
+def wrap_angle(angle: float) -> float:
+    """Wrap an angle in radians to [-pi, pi]."""
+    return (angle + math.pi) % (2 * math.pi) - math.pi